@@ -1,10 +1,23 @@
 from django.shortcuts import get_object_or_404, render
+from django.utils.functional import SimpleLazyObject
+
+from main.cache import ARTICLES_LISTING
+from main.page_cache import add_surrogate_keys, cache_anonymous_page, surrogate_key
+from main.view_counts import record_view
+from main.visitors import visitor_stats
 
 from .models import Article, Category
 
 
 def get_categories():
-    """Вспомогательная функция для получения категорий с количеством статей"""
+    """
+    Вспомогательная функция для получения категорий с количеством статей.
+    Возвращает ленивый объект: при попадании в кеш сайдбара запросов нет.
+    """
+    return SimpleLazyObject(_categories_with_counts)
+
+
+def _categories_with_counts():
     categories = Category.objects.all()
     for category in categories:
         category.articles_count = Article.objects.filter(
@@ -22,6 +35,7 @@ def get_popular_articles(limit=5):
     ).order_by('-create_at')[:limit]
 
 
+@cache_anonymous_page(ARTICLES_LISTING)
 def article_list(request):
     """Список статей"""
     articles = Article.objects.filter(public=True).order_by('-create_at')
@@ -37,6 +51,7 @@ def article_list(request):
     return render(request, 'articles/article_list.html', context)
 
 
+@cache_anonymous_page(ARTICLES_LISTING)
 def articles_by_category(request, category_slug):
     """Статьи по категории"""
     category = get_object_or_404(Category, slug=category_slug)
@@ -56,6 +71,12 @@ def articles_by_category(request, category_slug):
     return render(request, 'articles/article_list.html', context)
 
 
+def _count_article_view(request, slug):
+    """Учитывает просмотр статьи, отданной из кеша"""
+    record_view(Article, slug, request)
+
+
+@cache_anonymous_page(ARTICLES_LISTING, on_hit=_count_article_view)
 def article_detail(request, slug):
     """Детальная страница статьи"""
     article = get_object_or_404(
@@ -63,9 +84,10 @@ def article_detail(request, slug):
         slug=slug
     )
     
-    # Увеличиваем счетчик просмотров
-    article.views += 1
-    article.save(update_fields=['views'])
+    add_surrogate_keys(request, surrogate_key(article))
+    
+    # Учитываем просмотр; в базу счетчик попадает пачкой (main/view_counts.py)
+    record_view(Article, article.slug, request)
     
     categories = get_categories()
     popular_articles = get_popular_articles()
@@ -75,5 +97,6 @@ def article_detail(request, slug):
         'categories': categories,
         'selected_category': article.category if article.category else None,
         'popular_articles': popular_articles,
+        'visitors': visitor_stats(article),
     }
     return render(request, 'articles/article_detail.html', context)
@@ -0,0 +1,175 @@
+# categories/catalog.py
+"""
+Каталог активных разделов и категорий в памяти процесса.
+
+Дерево CategorySection → Category читается из базы двумя запросами и
+хранится в процессе как неизменяемые узлы с индексами по id и slug;
+поиск раздела или категории - обращение к словарю.
+
+Актуальность проверяется по версии группы CATEGORIES (main/cache.py) не
+чаще раза в CATEGORY_CATALOG_CHECK_INTERVAL секунд. Сигналы сохранения
+разделов и категорий (main/signals.py) после фиксации транзакции
+увеличивают версию и сбрасывают каталог текущего процесса, остальные
+процессы перечитают его при следующей проверке.
+
+Узлы общие для всех запросов: изменять их нельзя, данные конкретного
+запроса (например, счетчики фасетов) хранятся в отдельных объектах.
+
+Настройки:
+
+    CATEGORY_CATALOG_CHECK_INTERVAL = 5  # как часто сверять версию, секунды
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+
+from main.cache import CATEGORIES, bump_version, get_version
+
+from .models import Category, CategorySection
+
+
+class CategoryNode:
+    """Активная категория"""
+    __slots__ = ('id', 'name', 'slug', 'description', 'short_description', 'section_id', 'section')
+
+    def __init__(self, category, section):
+        self.id = category.id
+        self.name = category.name
+        self.slug = category.slug
+        self.description = category.description
+        self.short_description = category.short_description
+        self.section_id = category.section_id
+        self.section = section
+
+    @property
+    def pk(self):
+        return self.id
+
+    def __repr__(self):
+        return f'<CategoryNode: {self.slug}>'
+
+    def __str__(self):
+        return f'{self.section.name} → {self.name}'
+
+
+class SectionNode:
+    """Активный раздел с активными категориями, отсортированными по названию"""
+    __slots__ = ('id', 'name', 'slug', 'icon', 'description', 'short_description', 'categories')
+
+    def __init__(self, section):
+        self.id = section.id
+        self.name = section.name
+        self.slug = section.slug
+        self.icon = section.icon
+        self.description = section.description
+        self.short_description = section.short_description
+        self.categories = ()
+
+    @property
+    def pk(self):
+        return self.id
+
+    @property
+    def categories_list(self):
+        return self.categories
+
+    def __repr__(self):
+        return f'<SectionNode: {self.slug}>'
+
+    def __str__(self):
+        return self.name
+
+
+class CategoryCatalog:
+    """Дерево активных разделов и категорий с индексами по id и slug"""
+    __slots__ = ('version', 'sections', 'sections_by_id', 'sections_by_slug', 'categories_by_id', 'categories_by_slug')
+
+    def __init__(self, version, sections):
+        self.version = version
+        self.sections = tuple(sections)
+        self.sections_by_id = {section.id: section for section in self.sections}
+        self.sections_by_slug = {section.slug: section for section in self.sections}
+        self.categories_by_id = {
+            category.id: category for section in self.sections for category in section.categories
+        }
+        self.categories_by_slug = {category.slug: category for category in self.categories_by_id.values()}
+
+    def section(self, pk):
+        """Раздел по id (число или строка из запроса) или None"""
+        try:
+            return self.sections_by_id.get(int(pk))
+        except (TypeError, ValueError):
+            return None
+
+    def category(self, pk):
+        """Категория по id (число или строка из запроса) или None"""
+        try:
+            return self.categories_by_id.get(int(pk))
+        except (TypeError, ValueError):
+            return None
+
+    def section_by_slug(self, slug):
+        return self.sections_by_slug.get(slug)
+
+    def category_by_slug(self, slug):
+        return self.categories_by_slug.get(slug)
+
+    def sections_with_categories(self):
+        """Разделы, в которых есть хотя бы одна активная категория"""
+        return [section for section in self.sections if section.categories]
+
+
+def build_catalog(version=None):
+    """Читает дерево из базы (два запроса)"""
+    sections = [
+        SectionNode(section)
+        for section in CategorySection.objects.filter(is_active=True).order_by('name')
+    ]
+    by_id = {section.id: section for section in sections}
+    children = {section.id: [] for section in sections}
+    categories = Category.objects.filter(is_active=True, section_id__in=list(by_id)).order_by('name')
+    for category in categories:
+        children[category.section_id].append(CategoryNode(category, by_id[category.section_id]))
+    for section in sections:
+        section.categories = tuple(children[section.id])
+    return CategoryCatalog(version, sections)
+
+
+_catalog = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def get_catalog():
+    """Каталог текущего процесса; перечитывается после изменения разделов или категорий"""
+    global _catalog, _checked_at
+    now = time.monotonic()
+    interval = getattr(settings, 'CATEGORY_CATALOG_CHECK_INTERVAL', 5)
+    catalog = _catalog
+    if catalog is not None and now - _checked_at < interval:
+        return catalog
+
+    version = get_version(CATEGORIES)
+    if catalog is None or catalog.version != version:
+        with _lock:
+            if _catalog is None or _catalog.version != version:
+                _catalog = build_catalog(version)
+            catalog = _catalog
+    _checked_at = now
+    return catalog
+
+
+def _reset():
+    global _catalog
+    bump_version(CATEGORIES)
+    _catalog = None
+
+
+def invalidate_catalog():
+    """
+    Сбрасывает каталог во всех процессах (в текущем - сразу) после фиксации
+    транзакции: иначе другой процесс успел бы перечитать старые данные под новой версией.
+    """
+    transaction.on_commit(_reset)
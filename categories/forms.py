@@ -0,0 +1,18 @@
+from django import forms
+
+from .catalog import get_catalog
+
+
+class SectionChoiceField(forms.ChoiceField):
+    """Выбор активного раздела из каталога в памяти; в cleaned_data - узел раздела"""
+
+    def __init__(self, *, empty_label='---------', **kwargs):
+        self.catalog = get_catalog()
+        choices = [('', empty_label)] + [(section.id, section.name) for section in self.catalog.sections]
+        super().__init__(choices=choices, **kwargs)
+
+    def clean(self, value):
+        value = super().clean(value)
+        if value in self.empty_values:
+            return None
+        return self.catalog.section(value)
@@ -1,3 +1,35 @@
 from django.contrib import admin
+from django.urls import NoReverseMatch, reverse
+from django.utils.html import format_html
 
-# Register your models here.
+from .models import ViewAnomaly
+
+
+@admin.action(description="Отметить как накрутку")
+def confirm_anomalies(modeladmin, request, queryset):
+    updated = queryset.update(status=ViewAnomaly.Status.CONFIRMED)
+    modeladmin.message_user(request, f"Отмечено как накрутка: {updated}")
+
+
+@admin.action(description="Отметить как норму")
+def dismiss_anomalies(modeladmin, request, queryset):
+    updated = queryset.update(status=ViewAnomaly.Status.DISMISSED)
+    modeladmin.message_user(request, f"Отмечено как норма: {updated}")
+
+
+@admin.register(ViewAnomaly)
+class ViewAnomalyAdmin(admin.ModelAdmin):
+    list_display = ('day', 'object_link', 'views', 'baseline', 'score', 'status', 'created_at')
+    list_filter = ('status', 'model', 'day')
+    readonly_fields = ('model', 'object_id', 'day', 'views', 'baseline', 'score', 'created_at')
+    actions = [confirm_anomalies, dismiss_anomalies]
+
+    @admin.display(description="Объект")
+    def object_link(self, obj):
+        """Ссылка на объект в админке (без запроса к его таблице)"""
+        app_label, model_name = obj.model.split('.')
+        try:
+            url = reverse(f'admin:{app_label}_{model_name}_change', args=(obj.object_id,))
+        except NoReverseMatch:
+            return f'{obj.model}#{obj.object_id}'
+        return format_html('<a href="{}">{}#{}</a>', url, obj.model, obj.object_id)
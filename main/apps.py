@@ -1,6 +1,18 @@
 from django.apps import AppConfig
+from django.core.signals import request_started
+from django.db.models.signals import post_migrate
 
 
 class MainConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'main'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .search import install_all
+        from .spelling import warm_vocabulary
+
+        # Таблицы поискового индекса создаются вместе со схемой, а не в запросах
+        post_migrate.connect(install_all, sender=self, dispatch_uid='main:search_install')
+        # Словарь исправления запросов начинает строиться с первым запросом процесса
+        request_started.connect(warm_vocabulary, dispatch_uid='spelling:warm')
@@ -0,0 +1,298 @@
+# main/autocomplete.py
+"""
+Подсказки для фильтров и поиска: категории, города, специальности и
+частые слова названий задач, услуг и вакансий.
+
+Каждый вид подсказок - отдельный индекс префиксов в памяти процесса:
+отсортированный массив ключей (название и каждое его слово с начала)
+и bisect по нему. Для префиксов из одной-двух букв диапазон слишком
+широкий, поэтому лучшие подсказки для них считаются при построении.
+Вес подсказки - частота использования: число публичных объектов в
+категории, городе или специальности, число названий со словом.
+
+Индекс вида перестраивается сам по себе, когда меняется его источник:
+каталог категорий (categories/catalog.py), справочник городов
+(regions/gazetteer.py), версия списка вакансий в кеше (main/cache.py) или
+словарь исправления запросов (main/spelling.py). Веса категорий и городов
+зависят от списков задач и услуг, которые меняются часто, поэтому при
+смене их версий пересчитываются только веса и лучшие подсказки коротких
+префиксов, без пересборки ключей. Индекс слов не строится, пока в
+процессе нет словаря.
+
+Источники сверяются не чаще раза в AUTOCOMPLETE_CHECK_INTERVAL секунд, и
+сверяются только версии и отметки времени. Устаревший индекс обновляется
+в фоновом потоке, а до тех пор подсказки берутся из прежнего; синхронно
+строится только индекс, которого в процессе еще нет.
+
+Настройки:
+
+    AUTOCOMPLETE_CHECK_INTERVAL = 60   # как часто сверять источники, секунды
+    AUTOCOMPLETE_MIN_TERM_COUNT = 2    # слово названия должно встречаться хотя бы столько раз
+    AUTOCOMPLETE_BACKGROUND = True     # перестраивать индексы в фоновом потоке
+"""
+import copy
+import heapq
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from functools import partial
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Count
+
+from categories.catalog import get_catalog
+from regions.gazetteer import get_gazetteer
+from services.models import PUBLIC_SERVICES, Service
+from tasks.models import PUBLIC_TASKS, Task
+from vacancies.models import PUBLIC_VACANCIES, Specialty, Vacancy
+
+from .cache import SEARCH_VOCABULARY, SERVICES_LISTING, TASKS_LISTING, VACANCIES_LISTING, get_versions
+from .facets import facet_table
+from .search import STOP_WORDS
+from .spelling import corrections_ready, get_vocabulary, loaded_vocabulary
+
+logger = logging.getLogger(__name__)
+
+KINDS = ('category', 'city', 'specialty', 'term')
+
+# Сколько подсказок можно запросить за раз и сколько хранится для коротких префиксов
+MAX_LIMIT = 20
+SHORT_PREFIX = 2
+
+
+def _normalize(text):
+    return ' '.join((text or '').lower().replace('ё', 'е').split())
+
+
+def _keys(label):
+    """Название целиком и с начала каждого следующего слова"""
+    words = _normalize(label).split(' ')
+    return {' '.join(words[i:]) for i in range(len(words)) if words[i]}
+
+
+class Suggestion:
+    """Подсказка: вид, текст, вес и данные для фильтра"""
+    __slots__ = ('kind', 'label', 'weight', 'data')
+
+    def __init__(self, kind, label, weight, **data):
+        self.kind = kind
+        self.label = label
+        self.weight = weight
+        self.data = data
+
+    def __repr__(self):
+        return f'<Suggestion {self.kind}: {self.label}>'
+
+    def as_json(self):
+        return {'kind': self.kind, 'label': self.label, 'count': self.weight, **self.data}
+
+
+class PrefixIndex:
+    """Подсказки одного вида, отсортированные по ключам"""
+    __slots__ = ('stamp', 'weights_stamp', 'suggestions', 'keys', 'positions', 'groups', 'top')
+
+    def __init__(self, stamp, suggestions, weights_stamp=None):
+        self.stamp = stamp
+        pairs = sorted((key, position) for position, item in enumerate(suggestions) for key in _keys(item.label))
+        self.keys = [key for key, _ in pairs]
+        self.positions = [position for _, position in pairs]
+
+        self.groups = {}
+        for key, position in pairs:
+            for length in range(1, min(SHORT_PREFIX, len(key)) + 1):
+                self.groups.setdefault(key[:length], set()).add(position)
+        self._weigh(suggestions, weights_stamp)
+
+    def _weigh(self, suggestions, weights_stamp):
+        self.suggestions = suggestions
+        self.weights_stamp = weights_stamp
+        self.top = {
+            prefix: heapq.nlargest(MAX_LIMIT, (suggestions[position] for position in positions), key=_rank)
+            for prefix, positions in self.groups.items()
+        }
+
+    def reweighed(self, weights, weights_stamp):
+        """Копия индекса с весами weights ({id: вес}); ключи не пересчитываются"""
+        index = copy.copy(self)
+        index._weigh([
+            Suggestion(item.kind, item.label, weights.get(item.data['id'], 0), **item.data)
+            for item in self.suggestions
+        ], weights_stamp)
+        return index
+
+    def search(self, prefix, limit):
+        if len(prefix) <= SHORT_PREFIX:
+            return self.top.get(prefix, [])[:limit]
+        start = bisect_left(self.keys, prefix)
+        end = bisect_left(self.keys, prefix + '\uffff', start)
+        positions = set(self.positions[start:end])
+        return heapq.nlargest(limit, (self.suggestions[position] for position in positions), key=_rank)
+
+
+def _rank(suggestion):
+    return suggestion.weight, suggestion.label
+
+
+def _listing_counts():
+    """Таблицы фасетов публичных задач и услуг (те же ключи кеша, что у сайдбаров)"""
+    return (
+        facet_table(Task.objects.filter(PUBLIC_TASKS), TASKS_LISTING, ''),
+        facet_table(Service.objects.filter(PUBLIC_SERVICES), SERVICES_LISTING, None, ''),
+    )
+
+
+def category_weights():
+    counts = Counter()
+    for facets in _listing_counts():
+        counts.update(facets.category_counts())
+    return counts
+
+
+def city_weights():
+    counts = Counter()
+    for facets in _listing_counts():
+        counts.update(facets.city_counts())
+    return counts
+
+
+def category_suggestions():
+    counts = category_weights()
+    return [
+        Suggestion('category', category.name, counts[category.id], id=category.id, slug=category.slug,
+                   section=section.slug, section_name=section.name)
+        for section in get_catalog().sections
+        for category in section.categories
+    ]
+
+
+def city_suggestions():
+    counts = city_weights()
+    return [
+        Suggestion('city', city.name, counts[city.id], id=city.id, region=city.region.name)
+        for city in get_gazetteer().cities_by_id.values()
+    ]
+
+
+def specialty_suggestions():
+    counts = dict(
+        Vacancy.objects.filter(PUBLIC_VACANCIES).order_by()
+        .values_list('specialty_id').annotate(total=Count('pk'))
+    )
+    return [
+        Suggestion('specialty', name, counts.get(pk, 0), id=pk, slug=slug)
+        for pk, name, slug in Specialty.objects.values_list('pk', 'name', 'slug')
+    ]
+
+
+def term_suggestions():
+    minimum = getattr(settings, 'AUTOCOMPLETE_MIN_TERM_COUNT', 2)
+    return [
+        Suggestion('term', word, count)
+        for word, count in get_vocabulary().frequencies.items()
+        if count >= minimum and word not in STOP_WORDS and not word.isdigit()
+    ]
+
+
+def _stamps():
+    """
+    Отметки источников каждого вида: (подсказок, весов). Индекс перестраивается,
+    когда изменилась отметка подсказок, и пересчитывает веса - когда отметка весов
+    """
+    versions = get_versions([TASKS_LISTING, SERVICES_LISTING, VACANCIES_LISTING, SEARCH_VOCABULARY])
+    listings = (versions[TASKS_LISTING], versions[SERVICES_LISTING])
+    return {
+        'category': (get_catalog().version, listings),
+        'city': (get_gazetteer().etag, listings),
+        'specialty': (versions[VACANCIES_LISTING], None),
+        # Словарь не строится ради проверки: сверяются версия и время уже построенного
+        'term': ((versions[SEARCH_VOCABULARY], loaded_vocabulary().built_at), None),
+    }
+
+
+BUILDERS = {
+    'category': category_suggestions,
+    'city': city_suggestions,
+    'specialty': specialty_suggestions,
+    'term': term_suggestions,
+}
+
+WEIGHTS = {
+    'category': category_weights,
+    'city': city_weights,
+}
+
+_indexes = {}
+_checked_at = 0.0
+# Виды, индекс которых сейчас строится
+_building = set()
+_lock = threading.Lock()
+
+
+def _build(kind, stamp, weights_stamp):
+    return PrefixIndex(stamp, BUILDERS[kind](), weights_stamp)
+
+
+def _reweigh(kind, index, weights_stamp):
+    return index.reweighed(WEIGHTS[kind](), weights_stamp)
+
+
+def _update(kind, task, background):
+    try:
+        _indexes[kind] = task()
+    except Exception:
+        logger.exception('Не удалось построить индекс подсказок %s', kind)
+    finally:
+        with _lock:
+            _building.discard(kind)
+        if background:
+            # Соединения фонового потока больше не понадобятся
+            connections.close_all()
+
+
+def get_indexes():
+    """
+    Индексы текущего процесса по видам. Изменившиеся перестраиваются в фоне,
+    до тех пор отдаются прежние; вида, индекс которого строится впервые, нет
+    """
+    global _checked_at
+    now = time.monotonic()
+    interval = getattr(settings, 'AUTOCOMPLETE_CHECK_INTERVAL', 60)
+    if len(_indexes) == len(KINDS) and now - _checked_at < interval:
+        return _indexes
+
+    background = getattr(settings, 'AUTOCOMPLETE_BACKGROUND', True)
+    for kind, (stamp, weights_stamp) in _stamps().items():
+        # Из пустого словаря индекс слов не строится: ждем первую сборку словаря
+        if kind == 'term' and not corrections_ready():
+            continue
+        index = _indexes.get(kind)
+        if index is None or index.stamp != stamp:
+            task = partial(_build, kind, stamp, weights_stamp)
+        elif index.weights_stamp != weights_stamp:
+            task = partial(_reweigh, kind, index, weights_stamp)
+        else:
+            continue
+        with _lock:
+            if kind in _building:
+                continue
+            _building.add(kind)
+        if index is not None and background:
+            threading.Thread(target=_update, args=(kind, task, True), daemon=True).start()
+        else:
+            _update(kind, task, False)
+    _checked_at = now
+    return _indexes
+
+
+def suggest(query, kinds=KINDS, limit=10):
+    """Лучшие по весу подсказки для начала строки query среди видов kinds"""
+    prefix = _normalize(query)
+    if not prefix:
+        return []
+    limit = max(1, min(limit, MAX_LIMIT))
+    indexes = get_indexes()
+    found = [item for kind in kinds if kind in indexes for item in indexes[kind].search(prefix, limit)]
+    return heapq.nlargest(limit, found, key=_rank)
@@ -0,0 +1,79 @@
+# main/cache.py
+"""
+Версионированные ключи кеша.
+
+Вместо удаления закешированных данных увеличивается номер версии группы:
+новые запросы сразу читают ключ с новой версией, а старые записи
+истекают сами по таймауту.
+"""
+import time
+
+from django.core.cache import cache
+
+VERSION_TIMEOUT = None  # Номера версий храним без ограничения по времени
+
+# Группы кеша фрагментов страниц
+TASKS_LISTING = 'listing:tasks'
+SERVICES_LISTING = 'listing:services'
+VACANCIES_LISTING = 'listing:vacancies'
+ARTICLES_LISTING = 'listing:articles'
+CATALOG = 'catalog'  # Разделы, категории и города из сайдбаров
+CATEGORIES = 'categories'  # Каталог категорий в памяти процессов (categories/catalog.py)
+REGIONS = 'regions'  # Справочник регионов и городов в памяти процессов (regions/gazetteer.py)
+COMPLAINTS = 'complaints'  # Счетчики панели модерации
+SEARCH_VOCABULARY = 'search:vocabulary'  # Словарь исправления запросов (main/spelling.py)
+
+
+def _version_key(name):
+    return f'cache_version:{name}'
+
+
+def _initial_version():
+    # Если ключ версии вытеснен из кеша, новая версия не должна совпасть
+    # ни с одной из выданных ранее - поэтому стартуем от текущего времени
+    return int(time.time() * 1000)
+
+
+def get_version(name):
+    """Текущая версия группы кеша"""
+    key = _version_key(name)
+    version = cache.get(key)
+    if version is None:
+        version = _initial_version()
+        if not cache.add(key, version, VERSION_TIMEOUT):
+            # Версию успел записать параллельный запрос
+            version = cache.get(key, version)
+    return version
+
+
+def get_versions(names):
+    """Текущие версии нескольких групп одним обращением к кешу: {группа: версия}"""
+    keys = {_version_key(name): name for name in names}
+    found = cache.get_many(keys)
+    versions = {keys[key]: version for key, version in found.items()}
+    for name in names:
+        if name not in versions:
+            versions[name] = get_version(name)
+    return versions
+
+
+def bump_version(name):
+    """Инвалидирует группу кеша, увеличивая ее версию"""
+    key = _version_key(name)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = _initial_version()
+        cache.set(key, version, VERSION_TIMEOUT)
+        return version
+
+
+def versioned_key(name, *parts):
+    """Ключ кеша с учетом текущей версии группы"""
+    suffix = ':'.join(str(part) for part in parts)
+    key = f'{name}:v{get_version(name)}'
+    return f'{key}:{suffix}' if suffix else key
+
+
+def inbox_cache_name(user_id):
+    return f'inbox:{user_id}'
@@ -0,0 +1,173 @@
+# main/counters.py
+"""
+Денормализованные счетчики дочерних строк: Vacancy.responses_count и
+Service.orders_count.
+
+Счетчик - поле родителя, равное числу подходящих дочерних строк (или числу
+разных значений поля distinct среди них). Сигналы post_save (создание) и
+post_delete дочерней модели меняют поле через UPDATE ... SET f = f ± 1 -
+без чтения и записи объекта целиком, поэтому параллельные запросы не
+теряют приращений. Представления создают дочерние строки внутри
+transaction.atomic(): вставка и приращение фиксируются или откатываются
+вместе.
+
+Счетчик с distinct меняется только тогда, когда строка добавляет новое
+значение: если у родителя уже есть строка с тем же значением (например,
+заказчик уже писал автору услуги), хватает одной проверки exists(). Иначе
+строка родителя блокируется (select_for_update), проверка повторяется - она
+видит строки параллельных транзакций, зафиксированные до снятия
+блокировки, - и счетчик увеличивается на 1. При удалении (при каскадном
+удалении сигналы приходят, когда удалены уже все строки) значение для
+одного родителя пересчитывается подзапросом под той же блокировкой.
+
+Поле счетчика выводится в списках, поэтому после фиксации транзакции
+сбрасываются группы кеша invalidate (main/cache.py) и закешированные
+страницы родителя (main/page_cache.py).
+
+Условие счетчика задано дважды: Q-фильтром для пересчета в базе и
+функцией when для одного объекта в сигнале. Расхождения (и правки в
+обход сигналов: bulk_create, update, SQL) находит и исправляет команда:
+
+    python manage.py reconcile_counters
+    python manage.py reconcile_counters --dry-run
+"""
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from django.db.models.signals import post_delete, post_save
+
+from .cache import bump_version
+from .page_cache import purge_surrogate_keys, surrogate_key
+
+
+class DenormalizedCounter:
+    """Поле field родителя = число строк child, ссылающихся на него через fk"""
+
+    def __init__(self, field, child, fk, condition=None, when=None, distinct=None, invalidate=()):
+        self.field = field
+        self.child = child
+        self.fk = fk
+        self.parent = child._meta.get_field(fk).related_model
+        self.condition = condition or Q()
+        self.when = when
+        self.distinct = distinct
+        self.invalidate = tuple(invalidate)
+
+    def __str__(self):
+        return f'{self.parent._meta.label}.{self.field}'
+
+    @property
+    def fk_attname(self):
+        return self.child._meta.get_field(self.fk).attname
+
+    def rows(self):
+        return self.child._default_manager.filter(self.condition)
+
+    def source(self):
+        """Подзапрос с правильным значением счетчика для OuterRef('pk') родителя"""
+        total = Count(self.distinct, distinct=True) if self.distinct else Count('pk')
+        return Coalesce(Subquery(
+            self.rows().filter(**{self.fk: OuterRef('pk')}).order_by()
+            .values(self.fk).annotate(total=total).values('total'),
+            output_field=IntegerField(),
+        ), 0)
+
+    def counts(self, parent_ids):
+        """Правильные значения счетчика родителей parent_ids"""
+        total = Count(self.distinct, distinct=True) if self.distinct else Count('pk')
+        return dict(
+            self.rows().filter(**{f'{self.fk}__in': parent_ids}).order_by()
+            .values_list(self.fk).annotate(total=total)
+        )
+
+    def _matches(self, instance):
+        if self.when is None:
+            return True
+        try:
+            return self.when(instance)
+        except ObjectDoesNotExist:
+            # Родитель удаляется вместе с дочерними строками - считать нечего
+            return False
+
+    def purge(self, parent_ids):
+        """Сбрасывает кеш списков и страниц, где выводится счетчик родителей"""
+        for name in self.invalidate:
+            bump_version(name)
+        purge_surrogate_keys(*(surrogate_key(self.parent(pk=pk)) for pk in parent_ids))
+
+    def _seen(self, instance, parent_id):
+        """Есть ли у родителя другая подходящая строка с тем же значением distinct"""
+        value = getattr(instance, self.child._meta.get_field(self.distinct).attname)
+        return (
+            self.rows().filter(**{self.fk_attname: parent_id, self.distinct: value})
+            .exclude(pk=instance.pk).exists()
+        )
+
+    def _change(self, instance, delta):
+        if not self._matches(instance):
+            return
+        parent_id = getattr(instance, self.fk_attname)
+        parent = self.parent._default_manager.filter(pk=parent_id)
+        if not self.distinct:
+            # Не уходим ниже нуля, даже если счетчик уже разошелся с данными
+            parent.update(**{self.field: Greatest(F(self.field) + delta, 0)})
+        elif delta > 0:
+            if self._seen(instance, parent_id):
+                return
+            with transaction.atomic():
+                list(parent.select_for_update().values_list('pk'))
+                # После блокировки видна строка параллельной транзакции с тем же значением
+                if self._seen(instance, parent_id):
+                    return
+                parent.update(**{self.field: F(self.field) + 1})
+        else:
+            with transaction.atomic():
+                list(parent.select_for_update().values_list('pk'))
+                parent.update(**{self.field: self.source()})
+        transaction.on_commit(lambda: self.purge([parent_id]))
+
+    def on_save(self, sender, instance, created, raw=False, **kwargs):
+        if created and not raw:
+            self._change(instance, 1)
+
+    def on_delete(self, sender, instance, **kwargs):
+        self._change(instance, -1)
+
+
+COUNTERS = []
+
+
+def register(field, child, fk, **options):
+    """Подключает счетчик к сигналам дочерней модели"""
+    counter = DenormalizedCounter(field, child, fk, **options)
+    COUNTERS.append(counter)
+    post_save.connect(counter.on_save, sender=child, weak=False, dispatch_uid=f'counter:{counter}:save')
+    post_delete.connect(counter.on_delete, sender=child, weak=False, dispatch_uid=f'counter:{counter}:delete')
+    return counter
+
+
+def reconcile(counter, batch_size=1000, fix=True):
+    """
+    Сверяет счетчик со строками-источниками пачками по batch_size родителей.
+    Возвращает [(id родителя, было, стало)] для расхождений; с fix исправляет их.
+    """
+    drift = []
+    manager = counter.parent._default_manager
+    last_pk = None
+    while True:
+        chunk = manager.order_by('pk')
+        if last_pk is not None:
+            chunk = chunk.filter(pk__gt=last_pk)
+        stored = dict(chunk.values_list('pk', counter.field)[:batch_size])
+        if not stored:
+            break
+        last_pk = max(stored)
+        actual = counter.counts(list(stored))
+        wrong = [(pk, value, actual.get(pk, 0)) for pk, value in stored.items() if value != actual.get(pk, 0)]
+        if wrong and fix:
+            # Значение считается в том же UPDATE, чтобы не затереть параллельные приращения
+            manager.filter(pk__in=[pk for pk, _, _ in wrong]).update(**{counter.field: counter.source()})
+            counter.purge([pk for pk, _, _ in wrong])
+        drift.extend(wrong)
+    return drift
@@ -0,0 +1,126 @@
+# main/facets.py
+"""
+Счетчики фасетов для сайдбаров списков задач и услуг.
+
+Один запрос с GROUP BY (раздел, категория, город) по публичной выборке
+без фильтров сайдбара дает таблицу, из которой в памяти считаются:
+число результатов по каждому разделу и категории (с учетом выбранного
+города) и по каждому городу (с учетом выбранного раздела или категории).
+
+Таблица не зависит от выбранных раздела, категории и города, поэтому
+кешируется одна на группу списка (main/cache.py) и набор остальных
+фильтров (например, автора услуг) и сбрасывается вместе со списком.
+
+Настройки:
+
+    FACET_CACHE_TIMEOUT = 600  # время жизни таблицы фасетов, секунды
+"""
+import hashlib
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+from categories.catalog import get_catalog
+from regions.gazetteer import get_gazetteer
+
+from .cache import versioned_key
+
+
+class FacetNode:
+    """
+    Узел каталога категорий или справочника городов со счетчиком текущего
+    запроса. Узлы общие для всех запросов, поэтому сами не изменяются.
+    """
+    __slots__ = ('node', 'facet_count', 'categories_list')
+
+    def __init__(self, node, facet_count, categories_list=()):
+        self.node = node
+        self.facet_count = facet_count
+        self.categories_list = categories_list
+
+    def __getattr__(self, name):
+        return getattr(self.node, name)
+
+
+class FacetTable:
+    """Количество результатов по сочетаниям (раздел, категория, город)"""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def category_counts(self, city_id=None):
+        counts = Counter()
+        for _, category_id, row_city_id, total in self.rows:
+            if city_id is None or row_city_id == city_id:
+                counts[category_id] += total
+        return counts
+
+    def section_counts(self, city_id=None):
+        counts = Counter()
+        for section_id, _, row_city_id, total in self.rows:
+            if city_id is None or row_city_id == city_id:
+                counts[section_id] += total
+        return counts
+
+    def city_counts(self, section_id=None, category_id=None):
+        counts = Counter()
+        for row_section_id, row_category_id, city_id, total in self.rows:
+            if city_id is None:
+                continue
+            if category_id is not None and row_category_id != category_id:
+                continue
+            if section_id is not None and row_section_id != section_id:
+                continue
+            counts[city_id] += total
+        return counts
+
+
+def facet_table(queryset, cache_name, *filters):
+    """
+    Таблица фасетов для queryset - выборки без фильтров по разделу, категории и городу.
+    filters - значения остальных фильтров, от которых зависит выборка (часть ключа кеша).
+    """
+    digest = hashlib.md5(repr(filters).encode('utf-8')).hexdigest()
+    key = versioned_key(cache_name, 'facets', digest)
+    rows = cache.get(key)
+    if rows is None:
+        rows = list(
+            queryset.order_by()
+            .values_list('category__section_id', 'category_id', 'city_id')
+            .annotate(total=Count('pk'))
+        )
+        cache.set(key, rows, getattr(settings, 'FACET_CACHE_TIMEOUT', 600))
+    return FacetTable(rows)
+
+
+def build_sidebar(facets, selected_section=None, selected_category=None, selected_city=None):
+    """
+    Разделы и категории каталога со счетчиками (FacetNode) и города с результатами
+    для текущего выбора (или все активные, если таких нет): (sections, cities).
+    selected_section - slug раздела; selected_category - категория каталога.
+    """
+    catalog = get_catalog()
+    city_id = selected_city.pk if selected_city else None
+    section_counts = facets.section_counts(city_id)
+    category_counts = facets.category_counts(city_id)
+    sections = [
+        FacetNode(
+            section,
+            section_counts[section.id],
+            [FacetNode(category, category_counts[category.id]) for category in section.categories],
+        )
+        for section in catalog.sections
+    ]
+
+    section = catalog.section_by_slug(selected_section) if selected_section else None
+    city_counts = facets.city_counts(
+        section_id=section.id if section else None,
+        category_id=selected_category.id if selected_category else None,
+    )
+    # Города берутся из справочника в памяти (regions/gazetteer.py)
+    all_cities = get_gazetteer().cities_by_id
+    cities = [all_cities[pk] for pk in city_counts if pk in all_cities] or list(all_cities.values())
+    cities.sort(key=lambda city: city.name)
+    return sections, [FacetNode(city, city_counts[city.id]) for city in cities]
@@ -0,0 +1,140 @@
+# main/inbox.py
+"""
+Денормализованные счетчики непрочитанных сообщений (UnreadCounter).
+
+Счетчик увеличивается при отправке сообщения и уменьшается при удалении
+непрочитанного (сигналы в main/signals.py), а обнуляется, когда получатель
+открывает диалог (вызовы из представлений).
+Навбар читает только строки UnreadCounter одного пользователя.
+"""
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+from .cache import bump_version, inbox_cache_name
+from .models import UnreadCounter
+
+PREVIEW_LENGTH = 300
+
+
+def _register(lookup, defaults, message):
+    """Увеличивает счетчик диалога на одно сообщение, создавая его при необходимости"""
+    last_message = {
+        'last_message_text': message.content[:PREVIEW_LENGTH],
+        'last_message_at': message.created_at,
+    }
+    updated = UnreadCounter.objects.filter(**lookup).update(
+        unread_count=F('unread_count') + 1,
+        **last_message,
+    )
+    if not updated:
+        try:
+            with transaction.atomic():
+                UnreadCounter.objects.create(**lookup, **defaults, **last_message, unread_count=1)
+        except IntegrityError:
+            # Параллельный запрос успел создать строку - просто увеличиваем ее
+            UnreadCounter.objects.filter(**lookup).update(
+                unread_count=F('unread_count') + 1,
+                **last_message,
+            )
+    bump_version(inbox_cache_name(lookup['user_id']))
+
+
+def _unregister(lookup):
+    """Уменьшает счетчик диалога на одно удаленное непрочитанное сообщение"""
+    updated = UnreadCounter.objects.filter(**lookup, unread_count__gt=0).update(
+        unread_count=Greatest(F('unread_count') - 1, 0),
+    )
+    if updated:
+        bump_version(inbox_cache_name(lookup['user_id']))
+
+
+def task_message_recipients(task_response, sender_id):
+    """Участники отклика, которым адресовано сообщение"""
+    participants = {task_response.task.author_id, task_response.candidate_id}
+    participants.discard(sender_id)
+    return participants
+
+
+def register_task_message(message):
+    """Учитывает новое сообщение в отклике на задачу"""
+    task_response = message.task_response
+    for user_id in task_message_recipients(task_response, message.sender_id):
+        _register(
+            {'user_id': user_id, 'task_response': task_response},
+            {'kind': UnreadCounter.Kind.TASK, 'other_user_id': message.sender_id},
+            message,
+        )
+
+
+def register_service_message(message):
+    """Учитывает новое сообщение по услуге"""
+    if message.recipient_id == message.sender_id:
+        return
+    _register(
+        {'user_id': message.recipient_id, 'service_id': message.service_id, 'other_user_id': message.sender_id},
+        {'kind': UnreadCounter.Kind.SERVICE},
+        message,
+    )
+
+
+def unregister_task_message(message):
+    """Убирает из счетчиков удаленное непрочитанное сообщение в отклике на задачу"""
+    try:
+        task_response = message.task_response
+    except ObjectDoesNotExist:
+        # Отклик удаляется вместе с сообщениями, его счетчики - тоже
+        return
+    for user_id in task_message_recipients(task_response, message.sender_id):
+        _unregister({'user_id': user_id, 'task_response_id': message.task_response_id})
+
+
+def unregister_service_message(message):
+    """Убирает из счетчиков удаленное непрочитанное сообщение по услуге"""
+    if message.recipient_id == message.sender_id:
+        return
+    _unregister({
+        'user_id': message.recipient_id, 'service_id': message.service_id, 'other_user_id': message.sender_id,
+    })
+
+
+def mark_task_response_read(user, task_response):
+    """Обнуляет счетчик после прочтения переписки по отклику"""
+    updated = UnreadCounter.objects.filter(
+        user=user,
+        task_response=task_response,
+        unread_count__gt=0,
+    ).update(unread_count=0)
+    if updated:
+        bump_version(inbox_cache_name(user.pk))
+
+
+def mark_service_read(user, service):
+    """Обнуляет счетчики всех диалогов пользователя по услуге"""
+    updated = UnreadCounter.objects.filter(
+        user=user,
+        service=service,
+        unread_count__gt=0,
+    ).update(unread_count=0)
+    if updated:
+        bump_version(inbox_cache_name(user.pk))
+
+
+def get_inbox(user, limit=10):
+    """Последние диалоги с непрочитанными сообщениями и их общее количество"""
+    counters = list(
+        UnreadCounter.objects.filter(
+            user=user,
+            unread_count__gt=0,
+        ).select_related(
+            'other_user',
+            'task_response__task',
+            'service',
+        ).order_by('-last_message_at')[:limit]
+    )
+    if len(counters) < limit:
+        total = len(counters)
+    else:
+        total = UnreadCounter.objects.filter(user=user, unread_count__gt=0).count()
+    return counters, total
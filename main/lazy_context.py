@@ -0,0 +1,34 @@
+# main/lazy_context.py
+"""
+Ленивые значения для context processors.
+
+Значение вычисляется только тогда, когда шаблон действительно к нему
+обращается. Если включен QueryStatsMiddleware, для каждого запроса
+запоминается, какие ключи были предложены и какие реально прочитаны -
+это попадает в JSONL-лог (поля context_used/context_unused).
+"""
+from django.utils.functional import SimpleLazyObject
+
+from .middleware import get_current_stats
+
+
+def lazy_context(loader, keys):
+    """
+    Возвращает словарь {ключ: ленивое значение}.
+    loader() вызывается не более одного раза и должен вернуть словарь со всеми keys.
+    """
+    stats = get_current_stats()
+    if stats is not None:
+        stats.context_offered.update(keys)
+    loaded = {}
+
+    def make_value(key):
+        def evaluate():
+            if stats is not None:
+                stats.context_used.add(key)
+            if not loaded:
+                loaded.update(loader())
+            return loaded[key]
+        return SimpleLazyObject(evaluate)
+
+    return {key: make_value(key) for key in keys}
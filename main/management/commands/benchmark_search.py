@@ -0,0 +1,91 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Q
+
+from main.search import search_ids
+from vacancies.models import PUBLIC_VACANCIES, Vacancy
+
+from .querystats_report import percentile
+
+PAGE_SIZE = 15
+TARGET_ROWS = 100000
+
+
+def sample_queries(vacancies, count):
+    """Запросы из данных: слово названия, два слова, начало слова и место работы"""
+    queries = []
+    for title, location in vacancies.order_by("?").values_list("title", "location")[:count]:
+        words = [word for word in title.split() if len(word) > 3]
+        if not words:
+            continue
+        queries.append(words[0])
+        if len(words) > 1:
+            queries.append(f"{words[0]} {words[1]}")
+        queries.append(words[-1][:5])
+        if location:
+            queries.append(location.split(",")[0])
+    return list(dict.fromkeys(queries))
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает поиск вакансий по индексу (main/search.py) с прежним icontains по названию, "
+        "описанию и месту работы: первая страница и число результатов на текущих данных"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=10, help="Замеров на запрос")
+        parser.add_argument("--samples", type=int, default=5, help="Вакансий, из которых берутся запросы")
+        parser.add_argument("--query", action="append", default=[], help="Свой запрос (можно несколько раз)")
+
+    def handle(self, *args, **options):
+        vacancies = Vacancy.objects.filter(PUBLIC_VACANCIES)
+        total = vacancies.count()
+        if not total:
+            raise CommandError("Нет публичных вакансий: сгенерируйте данные (manage.py generate_marketplace)")
+        self.stdout.write(f"{connection.vendor}: публичных вакансий {total}")
+        if total < TARGET_ROWS:
+            self.stdout.write(self.style.WARNING(
+                f"Меньше {TARGET_ROWS}: для замера на полном объеме запустите generate_marketplace без --scale"
+            ))
+
+        queries = options["query"] or sample_queries(vacancies, options["samples"])
+        self.stdout.write(
+            f"{'Запрос':<32} {'icontains':>9} {'p50':>8} {'p95':>8} {'индекс':>7} {'p50':>8} {'p95':>8} {'ускорение':>10}"
+        )
+        for query in queries:
+            legacy = vacancies.filter(
+                Q(title__icontains=query) | Q(description__icontains=query) | Q(location__icontains=query)
+            ).order_by("-created_at", "-pk")
+            legacy_found, legacy_times = self.measure(options["repeat"], lambda: self.legacy_page(legacy))
+            found, times = self.measure(options["repeat"], lambda: self.indexed_page(query))
+            speedup = legacy_times[0] / times[0] if times[0] else 0
+            self.stdout.write(
+                f"{query[:32]:<32} {legacy_found:>9} {legacy_times[0]:>8} {legacy_times[1]:>8}"
+                f" {found:>7} {times[0]:>8} {times[1]:>8} {speedup:>9.1f}x"
+            )
+        limit = getattr(settings, "SEARCH_MAX_RESULTS", 500)
+        self.stdout.write(f"Индекс возвращает не больше {limit} самых релевантных id (SEARCH_MAX_RESULTS)")
+
+    def measure(self, repeat, run):
+        """Результат последнего прогона и (p50, p95) в миллисекундах"""
+        timings = []
+        result = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = run()
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        return result, (round(percentile(timings, 0.5), 3), round(percentile(timings, 0.95), 3))
+
+    def legacy_page(self, queryset):
+        list(queryset[:PAGE_SIZE + 1])
+        return queryset.count()
+
+    def indexed_page(self, query):
+        ids = search_ids(Vacancy, query)
+        Vacancy.objects.in_bulk(ids[:PAGE_SIZE])
+        return len(ids)
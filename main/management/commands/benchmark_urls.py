@@ -0,0 +1,251 @@
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+
+from articles.models import Article, Category as ArticleCategory
+from pages.models import Page
+from regions.models import Region
+from categories.models import CategorySection
+from services.models import Service
+from tasks.models import Task, TaskResponse
+from users.models import CustomUser, UserComplaint
+from vacancies.models import Vacancy, VacancyResponse
+
+from .querystats_report import percentile
+
+ROLES = ("anonymous", "author", "candidate", "staff")
+
+# Представления, которые меняют состояние по GET и сбивают остальные замеры
+EXCLUDED = {"users:logout", "users:mark_notification_read"}
+
+# Параметры строки запроса для AJAX-представлений
+QUERY_STRINGS = {
+    "cities_by_region": lambda samples: {"region_id": samples["region_id"]},
+    "get_categories_by_section": lambda samples: {"section_id": samples["section_id"]},
+    "autocomplete": lambda samples: {"q": "ре"},
+}
+
+
+def iter_patterns(patterns, namespace=None):
+    """(имя представления, имена параметров) для всех именованных маршрутов"""
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            inner = pattern.namespace or namespace
+            if pattern.namespace and namespace:
+                inner = f"{namespace}:{pattern.namespace}"
+            yield from iter_patterns(pattern.url_patterns, inner)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            name = f"{namespace}:{pattern.name}" if namespace else pattern.name
+            yield name, list(pattern.pattern.regex.groupindex)
+
+
+class Command(BaseCommand):
+    help = (
+        "Прогоняет все маршруты config/urls.py через тестовый клиент от имени гостя, автора, "
+        "кандидата и персонала и сравнивает p50/p95/p99 и число запросов с базовой линией"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=20, help="Замеров на маршрут и роль")
+        parser.add_argument("--warmup", type=int, default=2, help="Прогревочных запросов (не учитываются)")
+        parser.add_argument("--roles", nargs="+", choices=ROLES, default=list(ROLES))
+        parser.add_argument("--only", nargs="+", default=[], help="Только указанные представления (namespace:name)")
+        parser.add_argument("--cold", action="store_true", help="Очищать кеш перед каждым запросом")
+        parser.add_argument("--host", help="HTTP_HOST запросов (по умолчанию из ALLOWED_HOSTS)")
+        parser.add_argument("--save-baseline", metavar="FILE", help="Сохранить результаты как базовую линию")
+        parser.add_argument("--baseline", metavar="FILE", help="Сравнить с сохраненной базовой линией")
+        parser.add_argument("--tolerance", type=float, default=0.2, help="Допустимый рост p95 (доля)")
+        parser.add_argument("--fail-on-regression", action="store_true", help="Код ошибки при регрессии")
+
+    def handle(self, *args, **options):
+        samples = self.find_samples()
+        users = self.find_users(samples)
+        host = options["host"] or self.default_host()
+
+        results = {}
+        for view_name, params in iter_patterns(get_resolver().url_patterns):
+            if view_name.startswith("admin:") or view_name in EXCLUDED:
+                continue
+            if options["only"] and view_name not in options["only"]:
+                continue
+            url = self.build_url(view_name, params, samples)
+            if url is None:
+                self.stderr.write(f"Пропущен {view_name}: нет данных для параметров {params}")
+                continue
+            for role in options["roles"]:
+                if role != "anonymous" and users.get(role) is None:
+                    continue
+                # Исключение в представлении фиксируется кодом 500, а не прерывает прогон
+                client = Client(raise_request_exception=False, HTTP_HOST=host)
+                if role != "anonymous":
+                    client.force_login(users[role])
+                results[f"{view_name} [{role}]"] = self.measure(client, url, options)
+
+        self.report(results)
+
+        if options["save_baseline"]:
+            with open(options["save_baseline"], "w", encoding="utf-8") as fh:
+                json.dump(results, fh, ensure_ascii=False, indent=2, sort_keys=True)
+            self.stdout.write(f"Базовая линия сохранена в {options['save_baseline']}")
+
+        if options["baseline"]:
+            regressions = self.compare(results, options["baseline"], options["tolerance"])
+            if regressions and options["fail_on_regression"]:
+                raise CommandError(f"Регрессий: {regressions}")
+
+    @staticmethod
+    def default_host():
+        for host in settings.ALLOWED_HOSTS:
+            if host not in ("*", "") and not host.startswith("."):
+                return host
+        return "localhost"
+
+    def find_samples(self):
+        """Образцы объектов для подстановки в параметры маршрутов"""
+        task = (
+            Task.objects.filter(is_active=True, is_moderated=True, status=Task.Status.OPEN)
+            .annotate(responses_total=Count("responses"))
+            .filter(responses_total__gt=0)
+            .order_by("-responses_total", "-pk")
+            .first()
+        ) or Task.objects.order_by("-pk").first()
+        task_response = TaskResponse.objects.filter(task=task).order_by("pk").first() if task else None
+        author = task.author if task else None
+        service = (
+            Service.objects.filter(author=author, is_active=True, is_moderated=True).first()
+            or Service.objects.filter(is_active=True, is_moderated=True).first()
+        )
+        vacancy = (
+            Vacancy.objects.filter(author=author, is_active=True, is_moderated=True).first()
+            or Vacancy.objects.filter(is_active=True, is_moderated=True).first()
+        )
+        article = Article.objects.filter(public=True).first()
+        page = Page.objects.first()
+        return {
+            "task": task,
+            "task_response": task_response,
+            "author": author,
+            "service": service,
+            "vacancy": vacancy,
+            "vacancy_response": VacancyResponse.objects.filter(vacancy=vacancy).first() if vacancy else None,
+            "article": article,
+            "article_category": ArticleCategory.objects.first(),
+            "page": page,
+            "complaint": UserComplaint.objects.first(),
+            "region_id": Region.objects.values_list("pk", flat=True).first(),
+            "section_id": CategorySection.objects.values_list("pk", flat=True).first(),
+        }
+
+    @staticmethod
+    def find_users(samples):
+        task_response = samples["task_response"]
+        return {
+            "author": samples["author"],
+            "candidate": task_response.candidate if task_response else None,
+            "staff": CustomUser.objects.filter(is_staff=True, is_active=True).first(),
+        }
+
+    @staticmethod
+    def build_url(view_name, params, samples):
+        """URL маршрута с параметрами из образцов или None, если подставить нечего"""
+        namespace = view_name.split(":")[0]
+        slug_sources = {
+            "tasks": "task", "services": "service", "vacancies": "vacancy",
+            "articles": "article", "pages": "page",
+        }
+        kwargs = {}
+        for param in params:
+            if param == "slug":
+                obj = samples.get(slug_sources.get(namespace))
+                value = obj.slug if obj else None
+            elif param == "category_slug":
+                value = samples["article_category"].slug if samples["article_category"] else None
+            elif param == "response_id":
+                obj = samples["task_response"] if namespace == "tasks" else samples["vacancy_response"]
+                value = obj.pk if obj else None
+            elif param == "user_id":
+                value = samples["author"].pk if samples["author"] else None
+            elif param == "username":
+                value = samples["author"].username if samples["author"] else None
+            elif param == "complaint_id":
+                value = samples["complaint"].pk if samples["complaint"] else None
+            else:
+                value = None
+            if value is None:
+                return None
+            kwargs[param] = value
+
+        url = reverse(view_name, kwargs=kwargs)
+        query = QUERY_STRINGS.get(view_name.split(":")[-1])
+        if query:
+            values = query(samples)
+            if None in values.values():
+                return None
+            url += "?" + "&".join(f"{key}={value}" for key, value in values.items())
+        return url
+
+    def measure(self, client, url, options):
+        for _ in range(options["warmup"]):
+            client.get(url)
+        timings, queries, status = [], [], None
+        for _ in range(options["repeat"]):
+            if options["cold"]:
+                cache.clear()
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                response = client.get(url)
+                timings.append((time.perf_counter() - start) * 1000)
+            queries.append(len(captured))
+            status = response.status_code
+        timings.sort()
+        return {
+            "url": url,
+            "status": status,
+            "p50": round(percentile(timings, 0.5), 2),
+            "p95": round(percentile(timings, 0.95), 2),
+            "p99": round(percentile(timings, 0.99), 2),
+            "queries": max(queries),
+        }
+
+    def report(self, results):
+        self.stdout.write(f"{'Представление [роль]':<58} {'код':>4} {'p50':>8} {'p95':>8} {'p99':>8} {'SQL':>5}")
+        for key, row in sorted(results.items(), key=lambda item: -item[1]["p95"]):
+            self.stdout.write(
+                f"{key:<58} {row['status']:>4} {row['p50']:>8} {row['p95']:>8} {row['p99']:>8} {row['queries']:>5}"
+            )
+
+    def compare(self, results, path, tolerance):
+        """Печатает изменения относительно базовой линии, возвращает число регрессий"""
+        try:
+            with open(path, encoding="utf-8") as fh:
+                baseline = json.load(fh)
+        except (OSError, ValueError) as exc:
+            raise CommandError(f"Не удалось прочитать базовую линию {path}: {exc}")
+
+        regressions = 0
+        self.stdout.write("")
+        self.stdout.write(f"Сравнение с {path} (допуск p95 {tolerance:.0%})")
+        for key, row in sorted(results.items()):
+            base = baseline.get(key)
+            if base is None:
+                self.stdout.write(f"{key}: нет в базовой линии")
+                continue
+            slower = row["p95"] > base["p95"] * (1 + tolerance)
+            more_queries = row["queries"] > base["queries"]
+            if not (slower or more_queries):
+                continue
+            regressions += 1
+            self.stdout.write(self.style.ERROR(
+                f"{key}: p95 {base['p95']} -> {row['p95']} мс, SQL {base['queries']} -> {row['queries']}"
+            ))
+        if not regressions:
+            self.stdout.write(self.style.SUCCESS("Регрессий нет"))
+        return regressions
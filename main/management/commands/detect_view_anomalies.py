@@ -0,0 +1,19 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+
+from main.view_anomalies import detect_anomalies
+
+
+class Command(BaseCommand):
+    help = "Ищет всплески просмотров за день и отправляет их на проверку модератору (main/view_anomalies.py)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--day", type=datetime.date.fromisoformat,
+            help="День в формате ГГГГ-ММ-ДД (по умолчанию - вчера)",
+        )
+
+    def handle(self, *args, **options):
+        created = detect_anomalies(options["day"])
+        self.stdout.write(f"Найдено всплесков: {created}")
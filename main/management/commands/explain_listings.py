@@ -0,0 +1,134 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+
+from services.models import PUBLIC_SERVICES, Service
+from tasks.models import PUBLIC_TASKS, Task
+from vacancies.models import PUBLIC_VACANCIES, Vacancy
+
+from .querystats_report import percentile
+
+PAGE_SIZE = 16  # 15 записей страницы + одна для проверки следующей
+
+
+class Rollback(Exception):
+    """Откатывает транзакцию, в которой индексы были временно удалены"""
+
+
+def most_common(queryset, field):
+    """Самое частое значение поля в публичной выборке (самый тяжелый фильтр)"""
+    row = (
+        queryset.exclude(**{f"{field}__isnull": True})
+        .values(field).annotate(total=Count("pk")).order_by("-total").first()
+    )
+    return row[field] if row else None
+
+
+def listing_cases():
+    """(название, модель, queryset, индекс, который должен использоваться) как в списках"""
+    tasks = Task.objects.filter(PUBLIC_TASKS)
+    services = Service.objects.filter(PUBLIC_SERVICES)
+    vacancies = Vacancy.objects.filter(PUBLIC_VACANCIES)
+    newest = ("-created_at", "-pk")
+
+    cases = [
+        ("tasks", Task, tasks.order_by(*newest), "task_public_created_idx"),
+        ("services", Service, services.order_by(*newest), "service_public_created_idx"),
+        ("vacancies", Vacancy, vacancies.order_by(*newest), "vacancy_public_created_idx"),
+        ("vacancies ?sort=salary", Vacancy, vacancies.order_by("salary", "pk"), "vacancy_public_salary_idx"),
+        ("vacancies ?sort=-salary", Vacancy, vacancies.order_by("-salary", "-pk"), "vacancy_public_salary_idx"),
+    ]
+    filters = [
+        ("tasks ?category", Task, tasks, "category_id", "task_public_category_idx"),
+        ("tasks ?city", Task, tasks, "city_id", "task_public_city_idx"),
+        ("services ?category", Service, services, "category_id", "service_public_category_idx"),
+        ("services ?city", Service, services, "city_id", "service_public_city_idx"),
+        ("services ?author", Service, services, "author_id", "service_public_author_idx"),
+        ("vacancies ?specialty", Vacancy, vacancies, "specialty_id", "vacancy_public_specialty_idx"),
+        ("vacancies ?author", Vacancy, vacancies, "author_id", "vacancy_public_author_idx"),
+    ]
+    for name, model, queryset, field, index in filters:
+        value = most_common(queryset, field)
+        if value is not None:
+            cases.append((name, model, queryset.filter(**{field: value}).order_by(*newest), index))
+    return cases
+
+
+class Command(BaseCommand):
+    help = (
+        "Планы и время запросов публичных списков задач, услуг и вакансий на текущих данных. "
+        "С --compare те же запросы повторяются без частичных индексов (удаляются в откатываемой транзакции)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=20, help="Замеров на запрос")
+        parser.add_argument("--compare", action="store_true", help="Сравнить с планом без новых индексов")
+        parser.add_argument("--verbose-plans", action="store_true", help="Печатать планы целиком")
+        parser.add_argument("--check", action="store_true", help="Код ошибки, если индекс не используется")
+
+    def handle(self, *args, **options):
+        cases = listing_cases()
+        with_indexes = self.run_cases(cases, options)
+
+        without_indexes = None
+        if options["compare"]:
+            without_indexes = {}
+            try:
+                with transaction.atomic(), connection.cursor() as cursor:
+                    for model in {case[1] for case in cases}:
+                        for index in model._meta.indexes:
+                            if index.condition is not None:
+                                cursor.execute(f"DROP INDEX {connection.ops.quote_name(index.name)}")
+                    without_indexes = self.run_cases(cases, options)
+                    raise Rollback
+            except Rollback:
+                pass
+
+        self.report(cases, with_indexes, without_indexes)
+
+        missed = [name for name, _, _, index in cases if index not in with_indexes[name]["plan"]]
+        if missed:
+            self.stdout.write(self.style.WARNING(f"Индекс не используется: {', '.join(missed)}"))
+            if connection.vendor != "postgresql":
+                self.stdout.write(
+                    f"{connection.vendor}: условие частичного индекса со списком значений (статусы задач) "
+                    "не совпадает с запросом, где Django передает значения параметрами; проверяйте на PostgreSQL"
+                )
+            if options["check"]:
+                raise CommandError(f"Запросов без индекса: {len(missed)}")
+
+    def run_cases(self, cases, options):
+        results = {}
+        for name, _, queryset, _ in cases:
+            plan = queryset[:PAGE_SIZE].explain()
+            timings = []
+            for _ in range(options["repeat"]):
+                start = time.perf_counter()
+                list(queryset[:PAGE_SIZE])
+                timings.append((time.perf_counter() - start) * 1000)
+            timings.sort()
+            results[name] = {
+                "plan": plan,
+                "p50": round(percentile(timings, 0.5), 3),
+                "p95": round(percentile(timings, 0.95), 3),
+            }
+            if options["verbose_plans"]:
+                self.stdout.write(f"-- {name}\n{plan}\n")
+        return results
+
+    def report(self, cases, with_indexes, without_indexes):
+        header = f"{'Список':<26} {'индекс':<30} {'p50':>8} {'p95':>8}"
+        if without_indexes is not None:
+            header += f" {'без: p50':>9} {'p95':>8} {'ускорение':>10}"
+        self.stdout.write(header)
+        for name, _, _, index in cases:
+            row = with_indexes[name]
+            used = index if index in row["plan"] else "-"
+            line = f"{name:<26} {used:<30} {row['p50']:>8} {row['p95']:>8}"
+            if without_indexes is not None:
+                base = without_indexes[name]
+                speedup = base["p50"] / row["p50"] if row["p50"] else 0
+                line += f" {base['p50']:>9} {base['p95']:>8} {speedup:>9.1f}x"
+            self.stdout.write(line)
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from main.view_counts import flush_views
+
+
+class Command(BaseCommand):
+    help = "Переносит накопленные в кеше просмотры задач, услуг, вакансий и статей в базу (main/view_counts.py)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval", type=float, default=0,
+            help="Повторять каждые N секунд (по умолчанию - один раз)",
+        )
+        parser.add_argument("--grace", type=float, help="Ожидание запоздавших приращений, секунды")
+
+    def handle(self, *args, **options):
+        while True:
+            flushed = flush_views(grace=options["grace"])
+            self.stdout.write(f"Записано просмотров: {flushed}")
+            if not options["interval"]:
+                break
+            time.sleep(options["interval"])
@@ -0,0 +1,541 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from slugify import slugify
+
+from categories.models import Category, CategorySection
+from main.cache import (
+    ARTICLES_LISTING, CATALOG, SERVICES_LISTING, TASKS_LISTING, VACANCIES_LISTING,
+    bump_version,
+)
+from main.context_processors import FOOTER_CACHE
+from regions.models import City, Region
+from services.models import Service, ServiceMessage
+from tasks.models import Message, Review, Task, TaskResponse
+from users.models import CustomUser, UserBan, UserComplaint, UserWarning
+from vacancies.models import FavoriteVacancy, Specialty, Vacancy, VacancyResponse
+
+REGIONS = {
+    "Республика Крым": [
+        "Симферополь", "Ялта", "Евпатория", "Керчь", "Феодосия", "Алушта", "Джанкой",
+        "Бахчисарай", "Саки", "Судак", "Армянск", "Красноперекопск", "Белогорск", "Алупка",
+    ],
+    "Севастополь": ["Севастополь", "Инкерман", "Балаклава"],
+    "Краснодарский край": ["Краснодар", "Сочи", "Новороссийск", "Анапа", "Геленджик", "Армавир", "Туапсе"],
+    "Ростовская область": ["Ростов-на-Дону", "Таганрог", "Шахты", "Волгодонск", "Новочеркасск"],
+    "Москва": ["Москва", "Зеленоград"],
+}
+
+# Раздел -> (иконка, категории, типичные заголовки задач и услуг)
+SECTIONS = {
+    "Ремонт и строительство": (
+        "bi-hammer",
+        ["Сантехника", "Электрика", "Отделочные работы", "Сборка мебели", "Мелкий ремонт"],
+        ["Заменить смеситель", "Установить розетки", "Поклеить обои", "Собрать шкаф",
+         "Починить кран", "Положить плитку в ванной", "Повесить люстру", "Установить унитаз"],
+    ),
+    "Курьеры и доставка": (
+        "bi-truck",
+        ["Курьерские услуги", "Грузоперевозки", "Доставка продуктов"],
+        ["Доставить документы", "Забрать посылку", "Привезти продукты", "Перевезти вещи",
+         "Помочь с переездом", "Отвезти мебель на дачу"],
+    ),
+    "Уборка и помощь по хозяйству": (
+        "bi-house",
+        ["Уборка квартир", "Мытье окон", "Выгул собак", "Няни и сиделки"],
+        ["Генеральная уборка квартиры", "Помыть окна", "Выгулять собаку", "Уборка после ремонта",
+         "Посидеть с ребенком", "Погладить белье"],
+    ),
+    "Компьютерная помощь": (
+        "bi-laptop",
+        ["Ремонт компьютеров", "Настройка сетей", "Установка программ"],
+        ["Настроить роутер", "Установить Windows", "Починить ноутбук", "Настроить принтер",
+         "Восстановить данные с флешки", "Почистить компьютер от вирусов"],
+    ),
+    "Репетиторы и обучение": (
+        "bi-book",
+        ["Математика", "Русский язык", "Иностранные языки", "Физика"],
+        ["Репетитор по математике", "Подготовка к ЕГЭ по русскому", "Уроки английского",
+         "Занятия по физике", "Подготовка к ОГЭ", "Разговорный английский для взрослых"],
+    ),
+    "Дизайн и IT": (
+        "bi-palette",
+        ["Веб-разработка", "Графический дизайн", "Интернет-реклама"],
+        ["Сделать логотип", "Разработать сайт", "Настроить рекламу", "Сверстать лендинг",
+         "Доработать интернет-магазин", "Нарисовать баннер"],
+    ),
+}
+
+SPECIALTIES = [
+    "Продавец-консультант", "Официант", "Повар", "Водитель", "Программист", "Бухгалтер",
+    "Администратор", "Горничная", "Курьер", "Менеджер по продажам", "Бармен", "Охранник",
+]
+
+SENTENCES = [
+    "Нужно сделать аккуратно и в срок.",
+    "Все материалы есть, нужен только специалист.",
+    "Оплата сразу после выполнения.",
+    "Желательно с опытом и отзывами.",
+    "Можно начать в ближайшие выходные.",
+    "Подробности обсудим в сообщениях.",
+    "Работа на несколько часов.",
+    "Инструмент свой, материалы закупим вместе.",
+    "Рассмотрю предложения с фото выполненных работ.",
+    "Район центр, есть парковка.",
+]
+
+MESSAGES = [
+    "Здравствуйте! Готов выполнить.", "Когда удобно начать?", "Сколько будет стоить?",
+    "Могу завтра после обеда.", "Договорились, жду.", "Пришлите, пожалуйста, фото.",
+    "Спасибо, все отлично!", "Уточните адрес.", "Буду через час.", "Хорошо, подходит.",
+]
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """Отключает auto_now/auto_now_add, чтобы даты можно было задать явно"""
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, "auto_now", False) or getattr(field, "auto_now_add", False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = "Генерирует синтетические данные маркетплейса для нагрузочного тестирования"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=5000)
+        parser.add_argument("--staff", type=int, default=5, help="Сколько из пользователей сделать персоналом")
+        parser.add_argument("--tasks", type=int, default=100000)
+        parser.add_argument("--services", type=int, default=100000)
+        parser.add_argument("--vacancies", type=int, default=100000)
+        parser.add_argument("--messages", type=int, default=2000000, help="Сообщения по откликам на задачи")
+        parser.add_argument("--service-messages", type=int, default=1000000)
+        parser.add_argument("--scale", type=float, default=1.0, help="Множитель для всех количеств")
+        parser.add_argument("--days", type=int, default=365, help="Глубина истории в днях")
+        parser.add_argument("--chunk-size", type=int, default=5000, help="Размер пачки для bulk_create")
+        parser.add_argument("--prefix", default="gen", help="Префикс логинов и слагов сгенерированных данных")
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options["seed"])
+        self.chunk_size = options["chunk_size"]
+        self.prefix = options["prefix"]
+        self.now = timezone.now()
+        self.days = options["days"]
+        scale = options["scale"]
+
+        def scaled(name):
+            return max(1, int(options[name] * scale))
+
+        if CustomUser.objects.filter(username__startswith=f"{self.prefix}_").exists():
+            raise CommandError(f"Данные с префиксом «{self.prefix}» уже есть, укажите другой --prefix")
+
+        with explicit_timestamps(
+            CustomUser, Task, TaskResponse, Message, Review, Service, ServiceMessage,
+            Vacancy, VacancyResponse, FavoriteVacancy, UserWarning, UserBan, UserComplaint,
+        ):
+            self.step("Регионы и города", self.create_geography)
+            self.step("Разделы и категории", self.create_catalog)
+            self.step("Пользователи", self.create_users, scaled("users"), options["staff"])
+            self.step("Задачи", self.create_tasks, scaled("tasks"))
+            self.step("Отклики на задачи", self.create_task_responses)
+            self.step("Сообщения по откликам", self.create_messages, scaled("messages"))
+            self.step("Отзывы", self.create_reviews)
+            self.step("Услуги", self.create_services, scaled("services"))
+            self.step("Сообщения по услугам", self.create_service_messages, scaled("service_messages"))
+            self.step("Вакансии", self.create_vacancies, scaled("vacancies"))
+            self.step("Отклики и избранное", self.create_vacancy_responses)
+            self.step("Предупреждения, баны и жалобы", self.create_moderation)
+
+        # bulk_create не вызывает сигналы - пересчитываем счетчики и сбрасываем кеши
+        call_command("rebuild_unread_counters", stdout=self.stdout)
+        call_command("reconcile_counters", show=0, stdout=self.stdout)
+        call_command("rebuild_search_index", stdout=self.stdout)
+        for name in (FOOTER_CACHE, CATALOG, TASKS_LISTING, SERVICES_LISTING, VACANCIES_LISTING, ARTICLES_LISTING):
+            bump_version(name)
+        self.stdout.write(self.style.SUCCESS("Готово"))
+
+    # Вспомогательные методы
+
+    def step(self, title, func, *args):
+        start = time.perf_counter()
+        created = func(*args)
+        self.stdout.write(f"{title}: {created} ({time.perf_counter() - start:.1f} с)")
+
+    def bulk(self, model, objects):
+        """bulk_create по пачкам из генератора, без накопления всех объектов в памяти"""
+        objects = iter(objects)
+        total = 0
+        while True:
+            chunk = list(islice(objects, self.chunk_size))
+            if not chunk:
+                return total
+            model.objects.bulk_create(chunk, batch_size=self.chunk_size)
+            total += len(chunk)
+
+    def past(self, after=None):
+        """Случайный момент в прошлом (не раньше after)"""
+        start = after or self.now - timedelta(days=self.days)
+        span = max(1, int((self.now - start).total_seconds()))
+        return start + timedelta(seconds=self.rng.randrange(span))
+
+    def later(self, moment, max_hours=72):
+        return min(self.now, moment + timedelta(minutes=self.rng.randrange(1, max_hours * 60)))
+
+    def text(self, first, sentences=3):
+        return " ".join([first + "."] + self.rng.sample(SENTENCES, sentences))
+
+    def price(self):
+        if self.rng.random() < 0.2:
+            return None
+        return Decimal(self.rng.choice([500, 800, 1000, 1500, 2000, 3000, 5000, 10000, 25000]))
+
+    def generated(self, model, field="slug"):
+        return model.objects.filter(**{f"{field}__startswith": f"{self.prefix}-"})
+
+    # Справочники
+
+    def create_geography(self):
+        self.cities = []
+        for region_name, city_names in REGIONS.items():
+            region, _ = Region.objects.get_or_create(slug=slugify(region_name), defaults={"name": region_name})
+            for city_name in city_names:
+                city, _ = City.objects.get_or_create(
+                    region=region, slug=slugify(city_name), defaults={"name": city_name}
+                )
+                self.cities.append(city.pk)
+        return len(self.cities)
+
+    def create_catalog(self):
+        self.categories = []
+        for section_name, (icon, category_names, phrases) in SECTIONS.items():
+            section, _ = CategorySection.objects.get_or_create(
+                slug=slugify(section_name), defaults={"name": section_name, "icon": icon}
+            )
+            for category_name in category_names:
+                category, _ = Category.objects.get_or_create(
+                    slug=slugify(category_name), defaults={"name": category_name, "section": section}
+                )
+                self.categories.append((category.pk, phrases))
+        self.specialties = []
+        for name in SPECIALTIES:
+            specialty, _ = Specialty.objects.get_or_create(slug=slugify(name), defaults={"name": name})
+            self.specialties.append(specialty.pk)
+        return len(self.categories) + len(self.specialties)
+
+    def create_users(self, count, staff):
+        password = make_password("password")
+
+        def users():
+            for index in range(count):
+                joined = self.past()
+                yield CustomUser(
+                    username=f"{self.prefix}_{index}",
+                    email=f"{self.prefix}_{index}@example.com",
+                    password=password,
+                    first_name=self.rng.choice(["Иван", "Анна", "Петр", "Мария", "Олег", "Елена", ""]),
+                    is_staff=index < staff,
+                    date_joined=joined,
+                    last_login=self.later(joined, max_hours=24 * 30),
+                )
+
+        created = self.bulk(CustomUser, users())
+        generated = CustomUser.objects.filter(username__startswith=f"{self.prefix}_")
+        self.users = list(generated.order_by("pk").values_list("pk", flat=True))
+        self.staff_ids = list(generated.filter(is_staff=True).values_list("pk", flat=True)) or self.users[:1]
+        return created
+
+    # Задачи
+
+    def create_tasks(self, count):
+        statuses = [
+            (Task.Status.OPEN, 70), (Task.Status.IN_PROGRESS, 8), (Task.Status.AWAITING_CONFIRMATION, 2),
+            (Task.Status.COMPLETED, 15), (Task.Status.CLOSED, 5),
+        ]
+        status_values = [status for status, _ in statuses]
+        status_weights = [weight for _, weight in statuses]
+
+        def tasks():
+            for index in range(count):
+                category_id, phrases = self.rng.choice(self.categories)
+                title = self.rng.choice(phrases)
+                created = self.past()
+                location_type = self.rng.choice(Task.LocationType.values)
+                yield Task(
+                    title=title,
+                    slug=f"{self.prefix}-{index}-{slugify(title)}"[:50],
+                    description=self.text(title),
+                    author_id=self.rng.choice(self.users),
+                    category_id=category_id,
+                    location_type=location_type,
+                    city_id=None if location_type == Task.LocationType.REMOTE else self.rng.choice(self.cities),
+                    price=self.price(),
+                    payment_period=self.rng.choice(Task.PaymentPeriod.values),
+                    status=self.rng.choices(status_values, status_weights)[0],
+                    is_active=self.rng.random() < 0.95,
+                    is_moderated=self.rng.random() < 0.9,
+                    views=self.rng.randrange(500),
+                    created_at=created,
+                    updated_at=created,
+                )
+
+        return self.bulk(Task, tasks())
+
+    def create_task_responses(self):
+        taken = {Task.Status.IN_PROGRESS, Task.Status.AWAITING_CONFIRMATION, Task.Status.COMPLETED}
+        tasks = self.generated(Task).values_list("pk", "author_id", "status", "created_at")
+
+        def responses():
+            for task_id, author_id, status, created in tasks.iterator(chunk_size=self.chunk_size):
+                count = self.rng.choices([0, 1, 2, 3, 4, 6], [25, 25, 20, 15, 10, 5])[0]
+                if status in taken:
+                    count = max(count, 1)
+                candidates = {self.rng.choice(self.users) for _ in range(count)} - {author_id}
+                for position, candidate_id in enumerate(candidates):
+                    moment = self.later(created)
+                    if status in taken:
+                        response_status = (
+                            TaskResponse.Status.ACCEPTED if position == 0 else TaskResponse.Status.REJECTED
+                        )
+                    else:
+                        response_status = self.rng.choice(
+                            [TaskResponse.Status.PENDING, TaskResponse.Status.PENDING, TaskResponse.Status.REJECTED]
+                        )
+                    yield TaskResponse(
+                        task_id=task_id,
+                        candidate_id=candidate_id,
+                        message=self.rng.choice(MESSAGES),
+                        status=response_status,
+                        created_at=moment,
+                        updated_at=moment,
+                    )
+
+        return self.bulk(TaskResponse, responses())
+
+    def create_messages(self, count):
+        responses = list(
+            TaskResponse.objects.filter(task__slug__startswith=f"{self.prefix}-")
+            .values_list("pk", "task__author_id", "candidate_id", "created_at")
+        )
+        if not responses:
+            return 0
+        per_response = max(1, count // len(responses))
+
+        def messages():
+            remaining = count
+            for response_id, author_id, candidate_id, created in responses:
+                if remaining <= 0:
+                    return
+                size = min(remaining, self.rng.randint(1, per_response * 2))
+                remaining -= size
+                moment = created
+                for position in range(size):
+                    moment = self.later(moment, max_hours=12)
+                    yield Message(
+                        task_response_id=response_id,
+                        sender_id=candidate_id if position % 2 == 0 else author_id,
+                        content=self.rng.choice(MESSAGES),
+                        # Непрочитанными остаются последние сообщения части диалогов
+                        is_read=position < size - 2 or self.rng.random() < 0.7,
+                        created_at=moment,
+                    )
+
+        return self.bulk(Message, messages())
+
+    def create_reviews(self):
+        accepted = TaskResponse.objects.filter(
+            task__slug__startswith=f"{self.prefix}-",
+            task__status=Task.Status.COMPLETED,
+            status=TaskResponse.Status.ACCEPTED,
+        ).values_list("task_id", "task__author_id", "candidate_id", "updated_at")
+
+        def reviews():
+            for task_id, author_id, candidate_id, moment in accepted.iterator(chunk_size=self.chunk_size):
+                for reviewer_id, reviewed_id in ((author_id, candidate_id), (candidate_id, author_id)):
+                    if self.rng.random() < 0.3:
+                        continue
+                    yield Review(
+                        task_id=task_id,
+                        reviewer_id=reviewer_id,
+                        reviewed_user_id=reviewed_id,
+                        rating=self.rng.choices([1, 2, 3, 4, 5], [3, 4, 10, 33, 50])[0],
+                        comment=self.rng.choice(MESSAGES),
+                        created_at=self.later(moment),
+                    )
+
+        return self.bulk(Review, reviews())
+
+    # Услуги
+
+    def create_services(self, count):
+        def services():
+            for index in range(count):
+                category_id, phrases = self.rng.choice(self.categories)
+                title = self.rng.choice(phrases)
+                created = self.past()
+                location_type = self.rng.choice(Service.LocationType.values)
+                yield Service(
+                    title=title,
+                    slug=f"{self.prefix}-{index}-{slugify(title)}"[:50],
+                    description=self.text(title, sentences=4),
+                    author_id=self.rng.choice(self.users),
+                    category_id=category_id,
+                    location_type=location_type,
+                    city_id=None if location_type == Service.LocationType.REMOTE else self.rng.choice(self.cities),
+                    price=self.price(),
+                    payment_period=self.rng.choice(Service.PaymentPeriod.values),
+                    is_active=self.rng.random() < 0.95,
+                    is_moderated=self.rng.random() < 0.9,
+                    views=self.rng.randrange(1000),
+                    created_at=created,
+                    updated_at=created,
+                )
+
+        return self.bulk(Service, services())
+
+    def create_service_messages(self, count):
+        services = list(self.generated(Service).values_list("pk", "author_id", "created_at"))
+        if not services:
+            return 0
+
+        def messages():
+            remaining = count
+            while remaining > 0:
+                service_id, author_id, created = self.rng.choice(services)
+                client_id = self.rng.choice(self.users)
+                if client_id == author_id:
+                    continue
+                size = min(remaining, self.rng.randint(1, 20))
+                remaining -= size
+                moment = self.past(after=created)
+                for position in range(size):
+                    moment = self.later(moment, max_hours=12)
+                    from_client = position % 2 == 0
+                    yield ServiceMessage(
+                        service_id=service_id,
+                        sender_id=client_id if from_client else author_id,
+                        recipient_id=author_id if from_client else client_id,
+                        content=self.rng.choice(MESSAGES),
+                        is_read=position < size - 2 or self.rng.random() < 0.7,
+                        created_at=moment,
+                    )
+
+        return self.bulk(ServiceMessage, messages())
+
+    # Вакансии
+
+    def create_vacancies(self, count):
+        specialty_names = dict(Specialty.objects.filter(pk__in=self.specialties).values_list("pk", "name"))
+
+        def vacancies():
+            for index in range(count):
+                specialty_id = self.rng.choice(self.specialties)
+                title = specialty_names[specialty_id]
+                created = self.past()
+                yield Vacancy(
+                    title=title,
+                    slug=f"{self.prefix}-{index}-{slugify(title)}",
+                    description=self.text(f"Требуется {title.lower()}", sentences=4),
+                    author_id=self.rng.choice(self.users),
+                    specialty_id=specialty_id,
+                    experience=self.rng.choice(Vacancy.EXPERIENCE_CHOICES)[0],
+                    employment_type=self.rng.choice(Vacancy.EMPLOYMENT_TYPE_CHOICES)[0],
+                    work_nature=self.rng.choice(Vacancy.WORK_NATURE_CHOICES)[0],
+                    salary=Decimal(self.rng.randrange(25, 200) * 1000),
+                    city_id=self.rng.choice(self.cities),
+                    is_active=self.rng.random() < 0.95,
+                    is_moderated=self.rng.random() < 0.9,
+                    views=self.rng.randrange(2000),
+                    created_at=created,
+                    updated_at=created,
+                )
+
+        return self.bulk(Vacancy, vacancies())
+
+    def create_vacancy_responses(self):
+        vacancies = self.generated(Vacancy).values_list("pk", "author_id", "created_at")
+
+        def responses():
+            for vacancy_id, author_id, created in vacancies.iterator(chunk_size=self.chunk_size):
+                count = self.rng.choices([0, 1, 2, 3, 5], [40, 25, 15, 12, 8])[0]
+                for applicant_id in {self.rng.choice(self.users) for _ in range(count)} - {author_id}:
+                    yield VacancyResponse(
+                        vacancy_id=vacancy_id,
+                        applicant_id=applicant_id,
+                        cover_letter=self.rng.choice(MESSAGES),
+                        is_read=self.rng.random() < 0.6,
+                        created_at=self.later(created),
+                    )
+
+        created = self.bulk(VacancyResponse, responses())
+
+        vacancy_ids = list(self.generated(Vacancy).values_list("pk", flat=True)[:10000])
+
+        def favorites():
+            for user_id in self.users:
+                for vacancy_id in set(self.rng.sample(vacancy_ids, min(len(vacancy_ids), self.rng.randrange(4)))):
+                    yield FavoriteVacancy(user_id=user_id, vacancy_id=vacancy_id, created_at=self.past())
+
+        return created + self.bulk(FavoriteVacancy, favorites())
+
+    # Модерация
+
+    def create_moderation(self):
+        def warnings():
+            for user_id in self.rng.sample(self.users, len(self.users) // 100):
+                yield UserWarning(
+                    user_id=user_id,
+                    admin_id=self.rng.choice(self.staff_ids),
+                    reason="Нарушение правил площадки",
+                    is_read=self.rng.random() < 0.5,
+                    created_at=self.past(),
+                )
+
+        def bans():
+            for user_id in self.rng.sample(self.users, len(self.users) // 200):
+                created = self.past()
+                # Половина банов временные и уже истекли
+                ban_until = None if self.rng.random() < 0.5 else self.later(created, max_hours=24 * 7)
+                yield UserBan(
+                    user_id=user_id,
+                    admin_id=self.rng.choice(self.staff_ids),
+                    reason="Мошенничество",
+                    ban_until=ban_until,
+                    created_at=created,
+                )
+
+        def complaints():
+            for _ in range(len(self.users) // 50):
+                complainant_id, reported_id = self.rng.sample(self.users, 2)
+                created = self.past()
+                status = self.rng.choice(UserComplaint.Status.values)
+                yield UserComplaint(
+                    complainant_id=complainant_id,
+                    reported_user_id=reported_id,
+                    complaint_type=self.rng.choice(UserComplaint.ComplaintType.values),
+                    description="Не вышел на связь после предоплаты",
+                    status=status,
+                    admin_id=None if status == UserComplaint.Status.PENDING else self.rng.choice(self.staff_ids),
+                    is_read_by_complainant=self.rng.random() < 0.5,
+                    created_at=created,
+                    updated_at=created,
+                )
+
+        return self.bulk(UserWarning, warnings()) + self.bulk(UserBan, bans()) + self.bulk(UserComplaint, complaints())
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from main.visitors import delete_old_days, merge_sketches
+
+
+class Command(BaseCommand):
+    help = "Объединяет дневные скетчи посетителей в недельные и общие (main/visitors.py)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval", type=float, default=0,
+            help="Повторять каждые N секунд (по умолчанию - один раз)",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            merged = merge_sketches()
+            deleted = delete_old_days()
+            self.stdout.write(f"Объединено дневных скетчей: {merged}, удалено старых: {deleted}")
+            if not options["interval"]:
+                break
+            time.sleep(options["interval"])
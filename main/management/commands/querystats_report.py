@@ -0,0 +1,111 @@
+import json
+import math
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+def percentile(values, fraction):
+    """Перцентиль по отсортированному списку (ближайший ранг)"""
+    if not values:
+        return 0
+    # Ранг - ceil(fraction * n); погрешность float (0.07 * 100 = 7.000000000000001) не должна сдвигать ранг
+    index = min(len(values) - 1, max(0, math.ceil(fraction * len(values) - 1e-9) - 1))
+    return values[index]
+
+
+class Command(BaseCommand):
+    help = "Сводка по JSONL-логу QueryStatsMiddleware: запросы и время по представлениям"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "files",
+            nargs="*",
+            help="JSONL-файлы (по умолчанию QUERY_STATS_LOG_FILE)",
+        )
+        parser.add_argument(
+            "--sort",
+            choices=["queries", "db_ms", "template_ms", "total_ms", "hits"],
+            default="queries",
+            help="Поле для сортировки (p95)",
+        )
+        parser.add_argument(
+            "--context",
+            action="store_true",
+            help="Показать, какие ключи context processors читает каждый шаблон",
+        )
+
+    def handle(self, *args, **options):
+        files = options["files"] or [getattr(settings, "QUERY_STATS_LOG_FILE", None)]
+        if not files[0]:
+            raise CommandError("Не указан файл и не задан QUERY_STATS_LOG_FILE")
+
+        rows = defaultdict(lambda: defaultdict(list))
+        # шаблон -> ключ -> [сколько раз предложен, сколько раз прочитан]
+        context_usage = defaultdict(lambda: defaultdict(lambda: [0, 0]))
+        for path in files:
+            try:
+                with open(path, encoding="utf-8") as fh:
+                    for line in fh:
+                        try:
+                            record = json.loads(line)
+                        except ValueError:
+                            continue
+                        view = record.get("view") or record.get("path")
+                        for field in ("queries", "db_ms", "template_ms", "total_ms"):
+                            rows[view][field].append(record.get(field, 0))
+                        template = record.get("template") or "-"
+                        for key in record.get("context_used", []):
+                            context_usage[template][key][0] += 1
+                            context_usage[template][key][1] += 1
+                        for key in record.get("context_unused", []):
+                            context_usage[template][key][0] += 1
+            except OSError as exc:
+                raise CommandError(f"Не удалось прочитать {path}: {exc}")
+
+        if options["context"]:
+            self.report_context(context_usage)
+            return
+
+        budgets = getattr(settings, "QUERY_BUDGETS", {})
+        default_budget = getattr(settings, "QUERY_BUDGET_DEFAULT", None)
+
+        summary = []
+        for view, fields in rows.items():
+            item = {"view": view, "hits": len(fields["queries"])}
+            for field, values in fields.items():
+                values.sort()
+                item[field] = percentile(values, 0.5)
+                item[f"{field}_p95"] = percentile(values, 0.95)
+            item["budget"] = budgets.get(view, default_budget)
+            summary.append(item)
+
+        sort_key = options["sort"]
+        sort_field = sort_key if sort_key == "hits" else f"{sort_key}_p95"
+        summary.sort(key=lambda item: item[sort_field], reverse=True)
+
+        self.stdout.write(
+            f"{'view':<45} {'hits':>6} {'q p50':>6} {'q p95':>6} {'budget':>6} "
+            f"{'db p95':>9} {'tpl p95':>9} {'total p95':>10}"
+        )
+        for item in summary:
+            budget = item["budget"]
+            line = (
+                f"{str(item['view'])[:45]:<45} {item['hits']:>6} {item['queries']:>6} "
+                f"{item['queries_p95']:>6} {budget if budget is not None else '-':>6} "
+                f"{item['db_ms_p95']:>9.1f} {item['template_ms_p95']:>9.1f} {item['total_ms_p95']:>10.1f}"
+            )
+            if budget is not None and item["queries_p95"] > budget:
+                line = self.style.WARNING(line)
+            self.stdout.write(line)
+
+    def report_context(self, context_usage):
+        """Доля рендеров шаблона, в которых ключ контекста был прочитан"""
+        for template in sorted(context_usage):
+            self.stdout.write(self.style.MIGRATE_HEADING(template))
+            for key, (offered, used) in sorted(context_usage[template].items()):
+                line = f"  {key:<35} {used:>6}/{offered:<6} {used * 100 // offered:>3}%"
+                if not used:
+                    line = self.style.WARNING(line + "  не используется")
+                self.stdout.write(line)
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from main.cache import SEARCH_VOCABULARY, bump_version
+from main.search import rebuild_index, registered_models
+
+
+class Command(BaseCommand):
+    help = "Перестраивает полнотекстовый поисковый индекс задач, услуг и вакансий (main/search.py)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Размер пачки при записи в индекс")
+
+    def handle(self, *args, **options):
+        for model in registered_models():
+            total = rebuild_index(model, chunk_size=options["chunk_size"])
+            self.stdout.write(f"{model._meta.verbose_name_plural}: проиндексировано {total}")
+        # Словарь исправления запросов перестраивается в процессах при следующем обращении
+        bump_version(SEARCH_VOCABULARY)
+        self.stdout.write(self.style.SUCCESS("Готово"))
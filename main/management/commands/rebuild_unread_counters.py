@@ -0,0 +1,96 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Max, OuterRef, Subquery
+
+from main.inbox import PREVIEW_LENGTH, task_message_recipients
+from main.models import UnreadCounter
+from services.models import ServiceMessage
+from tasks.models import Message, TaskResponse
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает счетчики непрочитанных сообщений (UnreadCounter) по таблицам сообщений"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Размер пачки для bulk_create")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        counters = list(self.task_counters()) + list(self.service_counters())
+
+        with transaction.atomic():
+            UnreadCounter.objects.all().delete()
+            UnreadCounter.objects.bulk_create(counters, batch_size=batch_size)
+
+        self.stdout.write(self.style.SUCCESS(f"Создано счетчиков: {len(counters)}"))
+
+    def task_counters(self):
+        """Счетчики по откликам на задачи"""
+        last_message = Message.objects.filter(
+            task_response=OuterRef("task_response"),
+            sender=OuterRef("sender"),
+            is_read=False,
+        ).order_by("-created_at")
+        groups = Message.objects.filter(is_read=False).values(
+            "task_response", "sender"
+        ).annotate(
+            unread=Count("id"),
+            last_at=Max("created_at"),
+            last_text=Subquery(last_message.values("content")[:1]),
+        ).order_by()
+
+        responses = TaskResponse.objects.select_related("task").in_bulk(
+            {group["task_response"] for group in groups}
+        )
+        counters = {}
+        for group in groups:
+            task_response = responses[group["task_response"]]
+            for user_id in task_message_recipients(task_response, group["sender"]):
+                key = (user_id, task_response.pk)
+                counter = counters.get(key)
+                if counter is None:
+                    counters[key] = UnreadCounter(
+                        user_id=user_id,
+                        kind=UnreadCounter.Kind.TASK,
+                        task_response=task_response,
+                        other_user_id=group["sender"],
+                        unread_count=group["unread"],
+                        last_message_text=(group["last_text"] or "")[:PREVIEW_LENGTH],
+                        last_message_at=group["last_at"],
+                    )
+                    continue
+                counter.unread_count += group["unread"]
+                if group["last_at"] > counter.last_message_at:
+                    counter.other_user_id = group["sender"]
+                    counter.last_message_text = (group["last_text"] or "")[:PREVIEW_LENGTH]
+                    counter.last_message_at = group["last_at"]
+        return counters.values()
+
+    def service_counters(self):
+        """Счетчики по диалогам об услугах"""
+        last_message = ServiceMessage.objects.filter(
+            service=OuterRef("service"),
+            sender=OuterRef("sender"),
+            recipient=OuterRef("recipient"),
+            is_read=False,
+        ).order_by("-created_at")
+        groups = ServiceMessage.objects.filter(is_read=False).values(
+            "recipient", "service", "sender"
+        ).annotate(
+            unread=Count("id"),
+            last_at=Max("created_at"),
+            last_text=Subquery(last_message.values("content")[:1]),
+        ).order_by()
+
+        for group in groups:
+            if group["recipient"] == group["sender"]:
+                continue
+            yield UnreadCounter(
+                user_id=group["recipient"],
+                kind=UnreadCounter.Kind.SERVICE,
+                service_id=group["service"],
+                other_user_id=group["sender"],
+                unread_count=group["unread"],
+                last_message_text=(group["last_text"] or "")[:PREVIEW_LENGTH],
+                last_message_at=group["last_at"],
+            )
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from main.counters import COUNTERS, reconcile
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает денормализованные счетчики по таблицам-источникам и сообщает о расхождениях (main/counters.py)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Сколько родительских строк сверять за раз")
+        parser.add_argument("--dry-run", action="store_true", help="Только сообщить о расхождениях, не исправлять")
+        parser.add_argument("--show", type=int, default=10, help="Сколько расхождений показать по каждому счетчику")
+
+    def handle(self, *args, **options):
+        for counter in COUNTERS:
+            drift = reconcile(counter, batch_size=options["batch_size"], fix=not options["dry_run"])
+            if not drift:
+                self.stdout.write(f"{counter}: расхождений нет")
+                continue
+            total = sum(abs(actual - stored) for _, stored, actual in drift)
+            action = "найдено" if options["dry_run"] else "исправлено"
+            self.stdout.write(self.style.WARNING(f"{counter}: {action} расхождений {len(drift)}, на {total} всего"))
+            for pk, stored, actual in drift[:options["show"]]:
+                self.stdout.write(f"  id={pk}: {stored} -> {actual}")
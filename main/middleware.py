@@ -0,0 +1,210 @@
+# main/middleware.py
+"""
+Инструментирование запросов: количество SQL, время БД и шаблонов, бюджеты запросов.
+
+Подключение (settings.py), как можно выше в MIDDLEWARE, чтобы учитывались
+сессия, пользователь и BanCheckMiddleware:
+
+    MIDDLEWARE = [
+        'django.middleware.security.SecurityMiddleware',
+        'main.middleware.QueryStatsMiddleware',
+        ...
+    ]
+
+Настройки (все необязательные):
+
+    QUERY_STATS_ENABLED = DEBUG          # включить сбор статистики
+    QUERY_STATS_LOG_FILE = None          # путь к JSONL-файлу, None - не писать
+    QUERY_STATS_LOG_MAX_BYTES = 10 * 1024 * 1024
+    QUERY_STATS_LOG_BACKUP_COUNT = 5
+    QUERY_STATS_SLOWEST = 5              # сколько самых медленных запросов сохранять
+    QUERY_STATS_STAFF_HEADERS = True     # заголовки X-Query-Count/Server-Timing для персонала
+    QUERY_BUDGETS = {'tasks:task_list': 25}  # бюджет запросов по имени представления
+    QUERY_BUDGET_DEFAULT = None          # бюджет для остальных представлений
+    QUERY_BUDGET_ACTION = 'log'          # 'log' или 'raise'
+"""
+import json
+import logging
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+from heapq import nlargest
+from logging.handlers import RotatingFileHandler
+
+from django.conf import settings
+from django.db import connections
+from django.template.base import Template
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+stats_logger = logging.getLogger('main.querystats')
+
+# Статистика текущего запроса (None вне QueryStatsMiddleware)
+_current_stats = ContextVar('query_stats', default=None)
+_original_template_render = Template.render
+
+
+class QueryBudgetExceeded(Exception):
+    """Представление выполнило больше SQL-запросов, чем разрешено бюджетом"""
+
+
+class RequestStats:
+    """Счетчики одного HTTP-запроса. Экземпляр используется как execute_wrapper."""
+    __slots__ = (
+        'queries', 'db_time', 'template_time', 'template_name', 'statements',
+        'context_offered', 'context_used', '_template_depth',
+    )
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_name = None
+        self.statements = []
+        # Ключи ленивых context processors: предложенные и прочитанные шаблоном
+        self.context_offered = set()
+        self.context_used = set()
+        self._template_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.queries += 1
+            self.db_time += duration
+            self.statements.append((duration, sql))
+
+    def slowest(self, limit):
+        """Самые медленные запросы (время в мс, SQL)"""
+        return [
+            {'ms': round(duration * 1000, 3), 'sql': sql}
+            for duration, sql in nlargest(limit, self.statements, key=lambda item: item[0])
+        ]
+
+
+def get_current_stats():
+    """Статистика текущего запроса или None, если сбор выключен"""
+    return _current_stats.get()
+
+
+def _timed_template_render(self, context):
+    """Template.render с учетом времени рендеринга (только внешний шаблон)"""
+    stats = _current_stats.get()
+    if stats is None:
+        return _original_template_render(self, context)
+
+    stats._template_depth += 1
+    start = time.perf_counter()
+    try:
+        return _original_template_render(self, context)
+    finally:
+        stats._template_depth -= 1
+        if not stats._template_depth:
+            stats.template_time += time.perf_counter() - start
+            if stats.template_name is None:
+                stats.template_name = self.name
+
+
+def install_template_timer():
+    """Подменяет Template.render один раз за процесс"""
+    if Template.render is not _timed_template_render:
+        Template.render = _timed_template_render
+
+
+def _configure_stats_log():
+    """Настраивает ротируемый JSONL-лог, если задан QUERY_STATS_LOG_FILE"""
+    log_file = getattr(settings, 'QUERY_STATS_LOG_FILE', None)
+    if not log_file or stats_logger.handlers:
+        return
+    handler = RotatingFileHandler(
+        log_file,
+        maxBytes=getattr(settings, 'QUERY_STATS_LOG_MAX_BYTES', 10 * 1024 * 1024),
+        backupCount=getattr(settings, 'QUERY_STATS_LOG_BACKUP_COUNT', 5),
+        encoding='utf-8',
+    )
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    stats_logger.addHandler(handler)
+    stats_logger.setLevel(logging.INFO)
+    stats_logger.propagate = False
+
+
+class QueryStatsMiddleware:
+    """
+    Middleware для сбора статистики SQL-запросов и времени рендеринга по каждому представлению.
+    Пишет JSONL-лог, отдает заголовки персоналу и проверяет бюджеты запросов.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'QUERY_STATS_ENABLED', settings.DEBUG)
+        self.slowest_limit = getattr(settings, 'QUERY_STATS_SLOWEST', 5)
+        self.staff_headers = getattr(settings, 'QUERY_STATS_STAFF_HEADERS', True)
+        self.budgets = getattr(settings, 'QUERY_BUDGETS', {})
+        self.default_budget = getattr(settings, 'QUERY_BUDGET_DEFAULT', None)
+        self.budget_action = getattr(settings, 'QUERY_BUDGET_ACTION', 'log')
+        if self.enabled:
+            install_template_timer()
+            _configure_stats_log()
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+
+        stats = RequestStats()
+        token = _current_stats.set(stats)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(stats))
+                response = self.get_response(request)
+        finally:
+            _current_stats.reset(token)
+        total_time = time.perf_counter() - start
+
+        match = getattr(request, 'resolver_match', None)
+        view_name = match.view_name if match else None
+        record = {
+            'ts': timezone.now().isoformat(),
+            'view': view_name,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': stats.queries,
+            'db_ms': round(stats.db_time * 1000, 3),
+            'template_ms': round(stats.template_time * 1000, 3),
+            'total_ms': round(total_time * 1000, 3),
+            'template': stats.template_name,
+            'slowest': stats.slowest(self.slowest_limit),
+            'context_used': sorted(stats.context_used),
+            'context_unused': sorted(stats.context_offered - stats.context_used),
+        }
+        if stats_logger.handlers:
+            stats_logger.info(json.dumps(record, ensure_ascii=False))
+
+        if self.staff_headers and self._is_staff(request):
+            response['X-Query-Count'] = str(stats.queries)
+            response['Server-Timing'] = (
+                f'db;dur={record["db_ms"]};desc="{stats.queries} queries", '
+                f'tpl;dur={record["template_ms"]}, '
+                f'total;dur={record["total_ms"]}'
+            )
+
+        self._check_budget(view_name, request.path, stats)
+        return response
+
+    @staticmethod
+    def _is_staff(request):
+        user = getattr(request, 'user', None)
+        return bool(user is not None and user.is_authenticated and user.is_staff)
+
+    def _check_budget(self, view_name, path, stats):
+        """Сравнивает количество запросов с бюджетом представления"""
+        budget = self.budgets.get(view_name, self.default_budget)
+        if budget is None or stats.queries <= budget:
+            return
+        message = f'{view_name or path}: {stats.queries} SQL-запросов при бюджете {budget}'
+        if self.budget_action == 'raise':
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
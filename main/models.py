@@ -1,3 +1,172 @@
+from django.conf import settings
 from django.db import models
+from django.urls import reverse
 
-# Create your models here.
+
+class UnreadCounter(models.Model):
+    """Счетчик непрочитанных сообщений пользователя в одном диалоге (для навбара)"""
+    class Kind(models.TextChoices):
+        TASK = "task", "Задача"
+        SERVICE = "service", "Услуга"
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="unread_counters",
+        verbose_name="Получатель",
+    )
+    kind = models.CharField(
+        max_length=10,
+        choices=Kind.choices,
+        verbose_name="Тип диалога",
+    )
+    task_response = models.ForeignKey(
+        "tasks.TaskResponse",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="unread_counters",
+        verbose_name="Отклик",
+    )
+    service = models.ForeignKey(
+        "services.Service",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="unread_counters",
+        verbose_name="Услуга",
+    )
+    other_user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name="Собеседник",
+    )
+    unread_count = models.PositiveIntegerField(default=0, verbose_name="Непрочитанных")
+    last_message_text = models.CharField(max_length=300, blank=True, verbose_name="Последнее сообщение")
+    last_message_at = models.DateTimeField(verbose_name="Время последнего сообщения")
+
+    class Meta:
+        verbose_name = "Счетчик непрочитанных"
+        verbose_name_plural = "Счетчики непрочитанных"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "task_response"],
+                name="unique_unread_counter_task_response",
+            ),
+            models.UniqueConstraint(
+                fields=["user", "service", "other_user"],
+                name="unique_unread_counter_service_dialog",
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["user", "-last_message_at"],
+                condition=models.Q(unread_count__gt=0),
+                name="unread_counter_inbox_idx",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.user} ← {self.other_user}: {self.unread_count}"
+
+    def get_absolute_url(self) -> str:
+        if self.kind == self.Kind.TASK:
+            return reverse("tasks:response_detail", args=(self.task_response_id,))
+        return f"{reverse('services:service_messages', args=(self.service.slug,))}?user_id={self.other_user_id}"
+
+
+class VisitorSketch(models.Model):
+    """
+    HyperLogLog-скетч уникальных посетителей страницы объекта за день,
+    неделю или все время (main/visitors.py)
+    """
+    class Kind(models.TextChoices):
+        DAY = "day", "День"
+        WEEK = "week", "Неделя"
+        TOTAL = "total", "Все время"
+
+    model = models.CharField(max_length=100, verbose_name="Модель")
+    object_id = models.PositiveBigIntegerField(verbose_name="ID объекта")
+    kind = models.CharField(max_length=5, choices=Kind.choices, verbose_name="Период")
+    # День - 2026-10-17, неделя ISO - 2026-W42, все время - пустая строка
+    period = models.CharField(max_length=10, blank=True, verbose_name="Дата или неделя")
+    registers = models.BinaryField(verbose_name="Регистры")
+    estimate = models.PositiveIntegerField(default=0, verbose_name="Уникальных посетителей")
+    # Дневной скетч изменился и еще не добавлен в недельный и общий
+    dirty = models.BooleanField(default=False, verbose_name="Не объединен")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Обновлен")
+
+    class Meta:
+        verbose_name = "Скетч посетителей"
+        verbose_name_plural = "Скетчи посетителей"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["model", "object_id", "kind", "period"],
+                name="unique_visitor_sketch",
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["kind"],
+                condition=models.Q(dirty=True),
+                name="visitor_sketch_dirty_idx",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.model}#{self.object_id} {self.kind} {self.period}: {self.estimate}"
+
+
+class ViewSeries(models.Model):
+    """Просмотры страницы объекта по дням месяца (main/view_series.py)"""
+    model = models.CharField(max_length=100, verbose_name="Модель")
+    object_id = models.PositiveBigIntegerField(verbose_name="ID объекта")
+    # Первое число месяца
+    month = models.DateField(verbose_name="Месяц")
+    # 31 счетчик uint32 little-endian, по одному на день месяца
+    days = models.BinaryField(verbose_name="Просмотры по дням")
+
+    class Meta:
+        verbose_name = "Просмотры по дням"
+        verbose_name_plural = "Просмотры по дням"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["model", "object_id", "month"],
+                name="unique_view_series",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.model}#{self.object_id} {self.month:%Y-%m}"
+
+
+class ViewAnomaly(models.Model):
+    """Подозрительный всплеск просмотров объекта за день (main/view_anomalies.py)"""
+    class Status(models.TextChoices):
+        NEW = "new", "Не проверен"
+        CONFIRMED = "confirmed", "Накрутка"
+        DISMISSED = "dismissed", "Норма"
+
+    model = models.CharField(max_length=100, verbose_name="Модель")
+    object_id = models.PositiveBigIntegerField(verbose_name="ID объекта")
+    day = models.DateField(verbose_name="День")
+    views = models.PositiveIntegerField(verbose_name="Просмотров за день")
+    baseline = models.FloatField(verbose_name="Обычно в день")
+    score = models.FloatField(verbose_name="Отклонение")
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.NEW, verbose_name="Статус")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Найден")
+
+    class Meta:
+        verbose_name = "Всплеск просмотров"
+        verbose_name_plural = "Всплески просмотров"
+        ordering = ["-day", "-score"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["model", "object_id", "day"],
+                name="unique_view_anomaly",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.model}#{self.object_id} {self.day}: {self.views}"
@@ -0,0 +1,150 @@
+# main/page_cache.py
+"""
+Кеш целых страниц для анонимных посетителей с инвалидацией по суррогатным ключам.
+
+Каждая запись помечается ключами (task:<id>, category:<id>, listing:tasks, ...).
+Ключ - это группа версионированного кеша (см. main/cache.py): при записи
+страницы запоминаются версии ее ключей, при чтении они сверяются с текущими.
+Чтобы сбросить все страницы с ключом, достаточно увеличить его версию
+(purge_surrogate_keys), что и делают сигналы моделей и действия админки.
+
+Использование:
+
+    @cache_anonymous_page(TASKS_LISTING, CATALOG)
+    def task_list(request): ...
+
+    @cache_anonymous_page(on_hit=count_task_view)
+    def task_detail(request, slug):
+        ...
+        add_surrogate_keys(request, f'task:{task.pk}')
+
+Настройки:
+
+    PAGE_CACHE_ENABLED = True
+    PAGE_CACHE_TIMEOUT = 300
+"""
+import hashlib
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from .cache import bump_version, get_versions
+
+# Параметры, которые не влияют на содержимое страницы
+IGNORED_PARAMS = frozenset({'fbclid', 'gclid', 'yclid', '_openstat', 'from'})
+IGNORED_PREFIXES = ('utm_',)
+
+
+def normalized_url(request):
+    """Путь и отсортированная строка запроса без пустых и рекламных параметров"""
+    params = sorted(
+        (name, value)
+        for name, values in request.GET.lists()
+        if name not in IGNORED_PARAMS and not name.startswith(IGNORED_PREFIXES)
+        for value in values
+        if value
+    )
+    query = urlencode(params)
+    return f'{request.path}?{query}' if query else request.path
+
+
+def page_cache_key(request):
+    digest = hashlib.md5(normalized_url(request).encode('utf-8')).hexdigest()
+    return f'page:{digest}'
+
+
+def surrogate_key(instance):
+    """Суррогатный ключ объекта: task:<id>, category:<id>, ..."""
+    return f'{instance._meta.model_name}:{instance.pk}'
+
+
+def add_surrogate_keys(request, *keys):
+    """Помечает кешируемую страницу дополнительными ключами (внутри представления)"""
+    tags = getattr(request, '_surrogate_keys', None)
+    if tags is None or not keys:
+        return
+    tags.update(get_versions([key for key in keys if key not in tags]))
+
+
+def purge_surrogate_keys(*keys):
+    """Сбрасывает все закешированные страницы с указанными ключами"""
+    for key in keys:
+        bump_version(key)
+
+
+def _cacheable_request(request):
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    if request.user.is_authenticated:
+        return False
+    # Страницу с сообщениями (messages framework) нельзя ни отдавать из кеша, ни сохранять
+    return not len(get_messages(request))
+
+
+def skip_page_cache(request):
+    """Не сохранять страницу этого запроса: ее содержимое временное"""
+    request._skip_page_cache = True
+
+
+def _cacheable_response(request, response):
+    return (
+        response.status_code == 200
+        and not getattr(request, '_skip_page_cache', False)
+        and not response.streaming
+        and not response.cookies
+        # {% csrf_token %} в шаблоне - страница привязана к cookie посетителя
+        and not request.META.get('CSRF_COOKIE_NEEDS_UPDATE')
+    )
+
+
+def _get_fresh(key):
+    """Запись из кеша, если версии всех ее ключей не изменились"""
+    entry = cache.get(key)
+    if entry is None:
+        return None
+    if get_versions(list(entry['tags'])) != entry['tags']:
+        return None
+    return entry
+
+
+def cache_anonymous_page(*tags, on_hit=None):
+    """
+    Декоратор представления: кеширует страницу для анонимных GET-запросов.
+    on_hit(request, *args, **kwargs) вызывается при отдаче из кеша
+    (например, чтобы учесть просмотр).
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if not getattr(settings, 'PAGE_CACHE_ENABLED', True) or not _cacheable_request(request):
+                return view_func(request, *args, **kwargs)
+
+            key = page_cache_key(request)
+            entry = _get_fresh(key)
+            if entry is not None:
+                if on_hit is not None:
+                    on_hit(request, *args, **kwargs)
+                response = HttpResponse(entry['content'], content_type=entry['content_type'])
+                response['Surrogate-Key'] = ' '.join(entry['tags'])
+                response['X-Page-Cache'] = 'HIT'
+                return response
+
+            # Версии снимаются до рендеринга: изменение во время рендеринга
+            # сделает запись устаревшей, а не закрепит старое содержимое
+            request._surrogate_keys = get_versions(tags)
+            response = view_func(request, *args, **kwargs)
+            if _cacheable_response(request, response):
+                cache.set(key, {
+                    'content': response.content,
+                    'content_type': response['Content-Type'],
+                    'tags': request._surrogate_keys,
+                }, getattr(settings, 'PAGE_CACHE_TIMEOUT', 300))
+                response['Surrogate-Key'] = ' '.join(request._surrogate_keys)
+                response['X-Page-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
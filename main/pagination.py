@@ -0,0 +1,333 @@
+# main/pagination.py
+"""
+Постраничный вывод по ключу (keyset/cursor pagination).
+
+Вместо OFFSET следующая страница выбирается условием по ключу сортировки
+последней показанной записи: (created_at, id) < (последний created_at, последний id).
+Стоимость любой страницы одинакова, COUNT(*) не нужен.
+
+Курсор - подписанный непрозрачный токен (django.core.signing) с направлением,
+полями сортировки и значениями ключа. Подделанный или устаревший курсор
+(например, после смены сортировки) просто открывает первую страницу.
+
+Старые ссылки вида ?page=N поддерживаются: граница страницы один раз
+находится через OFFSET, дальше навигация идет по курсорам.
+
+Результаты поиска идут не по дате, а по релевантности: их листает
+RankedPaginator с курсором-позицией в списке найденных id.
+
+Там, где остается OFFSET-пагинация и нужны итоги «Найдено N» / «страница N из M»,
+используются cached_count() и CachedCountPaginator: количество берется из кеша
+по ключу от SQL выборки (т.е. от набора фильтров), устаревшее значение отдается
+сразу и пересчитывается в фоне, а на больших таблицах PostgreSQL вместо
+COUNT(*) используется оценка планировщика.
+
+Настройки:
+
+    COUNT_CACHE_TIMEOUT = 300          # через сколько секунд значение пересчитывается
+    COUNT_CACHE_STALE_TIMEOUT = 3600   # сколько секунд можно отдавать устаревшее значение
+    COUNT_ESTIMATE_THRESHOLD = 100000  # с какой оценки планировщика не считать точно
+    COUNT_CACHE_BACKGROUND = True      # пересчитывать в фоновом потоке
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections.abc import Sequence
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from .cache import versioned_key
+
+logger = logging.getLogger(__name__)
+
+CURSOR_SALT = 'main.pagination'
+
+
+def _serialize(value):
+    if value is None or isinstance(value, (bool, int, str)):
+        return value
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+class KeysetPage(Sequence):
+    """Страница выборки; в шаблонах ведет себя как django.core.paginator.Page без номеров"""
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f'<KeysetPage: {len(self.object_list)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if not self._has_next:
+            return None
+        return self.paginator.make_cursor('next', self.object_list[-1])
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous:
+            return None
+        return self.paginator.make_cursor('prev', self.object_list[0])
+
+
+class KeysetPaginator:
+    """
+    Пагинатор по ключу сортировки. ordering - поля как в order_by();
+    последним должен идти уникальный ключ (обычно '-pk'), чтобы порядок был строгим.
+    """
+
+    def __init__(self, queryset, per_page, ordering=('-created_at', '-pk')):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = tuple(ordering)
+        meta = queryset.model._meta
+        self.fields = [
+            meta.pk if name.lstrip('-') == 'pk' else meta.get_field(name.lstrip('-'))
+            for name in self.ordering
+        ]
+        self.descending = [name.startswith('-') for name in self.ordering]
+
+    def make_cursor(self, direction, obj):
+        values = [_serialize(getattr(obj, field.attname)) for field in self.fields]
+        return signing.dumps([direction, self.ordering, values], salt=CURSOR_SALT, compress=True)
+
+    def _decode(self, cursor):
+        """(направление, значения ключа) или None для первой страницы"""
+        if not cursor:
+            return None
+        try:
+            direction, ordering, values = signing.loads(cursor, salt=CURSOR_SALT)
+        except (signing.BadSignature, TypeError, ValueError):
+            return None
+        if tuple(ordering) != self.ordering or direction not in ('next', 'prev') or len(values) != len(self.fields):
+            return None
+        try:
+            values = [field.to_python(value) for field, value in zip(self.fields, values)]
+        except Exception:
+            return None
+        return direction, values
+
+    def _after(self, values, reverse=False):
+        """Условие «строго после ключа values» в порядке сортировки (или до него при reverse)"""
+        condition = Q()
+        equal = Q()
+        for field, value, descending in zip(self.fields, values, self.descending):
+            lookup = 'lt' if descending != reverse else 'gt'
+            condition |= equal & Q(**{f'{field.name}__{lookup}': value})
+            equal &= Q(**{field.name: value})
+        return condition
+
+    def _reversed_ordering(self):
+        return [name[1:] if name.startswith('-') else f'-{name}' for name in self.ordering]
+
+    def _offset_boundary(self, page_number):
+        """Ключ последней записи перед страницей page_number (для ссылок ?page=N)"""
+        try:
+            page_number = int(page_number)
+        except (TypeError, ValueError):
+            return None
+        if page_number <= 1:
+            return None
+        names = [field.attname for field in self.fields]
+        offset = (page_number - 1) * self.per_page - 1
+        return self.queryset.order_by(*self.ordering).values_list(*names)[offset:offset + 1].first()
+
+    def get_page(self, cursor=None, page_number=None):
+        decoded = self._decode(cursor)
+        if decoded is None and page_number is not None:
+            boundary = self._offset_boundary(page_number)
+            if boundary is not None:
+                decoded = ('next', list(boundary))
+
+        if decoded is None:
+            rows = list(self.queryset.order_by(*self.ordering)[:self.per_page + 1])
+            return KeysetPage(rows[:self.per_page], self, len(rows) > self.per_page, False)
+
+        direction, values = decoded
+        if direction == 'next':
+            rows = list(self.queryset.filter(self._after(values)).order_by(*self.ordering)[:self.per_page + 1])
+            return KeysetPage(rows[:self.per_page], self, len(rows) > self.per_page, True)
+
+        rows = list(
+            self.queryset.filter(self._after(values, reverse=True))
+            .order_by(*self._reversed_ordering())[:self.per_page + 1]
+        )
+        has_previous = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        rows.reverse()
+        if not rows:
+            # Вернулись к началу выборки
+            return self.get_page()
+        return KeysetPage(rows, self, True, has_previous)
+
+
+def _count_key(queryset, cache_name):
+    sql = str(queryset.order_by().query)
+    digest = hashlib.md5(f'{queryset.db}:{sql}'.encode('utf-8')).hexdigest()
+    if cache_name:
+        return versioned_key(cache_name, 'count', digest)
+    return f'count:{digest}'
+
+
+def planner_estimate(queryset):
+    """Оценка числа строк планировщиком PostgreSQL или None для других СУБД"""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def count_rows(queryset):
+    """Точный COUNT(*) или оценка планировщика, если таблица большая"""
+    estimate = planner_estimate(queryset)
+    if estimate is not None and estimate >= getattr(settings, 'COUNT_ESTIMATE_THRESHOLD', 100000):
+        return estimate
+    return queryset.count()
+
+
+def _store_count(key, count):
+    fresh_until = time.time() + getattr(settings, 'COUNT_CACHE_TIMEOUT', 300)
+    cache.set(key, (count, fresh_until), getattr(settings, 'COUNT_CACHE_STALE_TIMEOUT', 60 * 60))
+
+
+def _refresh_count(key, queryset):
+    try:
+        _store_count(key, count_rows(queryset))
+    except Exception:
+        logger.exception('Не удалось пересчитать количество для %s', key)
+    finally:
+        cache.delete(f'{key}:lock')
+        # Соединения фонового потока больше не понадобятся
+        connections.close_all()
+
+
+def cached_count(queryset, cache_name=None):
+    """
+    Количество строк выборки из кеша. cache_name - группа версионированного
+    кеша (main/cache.py), если счетчики нужно сбрасывать сигналами.
+    """
+    try:
+        key = _count_key(queryset, cache_name)
+    except EmptyResultSet:
+        # Выборка заведомо пустая (например, none() - поиск ничего не нашел)
+        return 0
+    entry = cache.get(key)
+    if entry is None:
+        count = count_rows(queryset)
+        _store_count(key, count)
+        return count
+
+    count, fresh_until = entry
+    if fresh_until < time.time() and cache.add(f'{key}:lock', 1, 60):
+        # Отдаем устаревшее значение, пересчитываем один раз на всех
+        if getattr(settings, 'COUNT_CACHE_BACKGROUND', True):
+            threading.Thread(target=_refresh_count, args=(key, queryset.all()), daemon=True).start()
+        else:
+            _store_count(key, count_rows(queryset))
+            cache.delete(f'{key}:lock')
+    return count
+
+
+class CachedCountPaginator(Paginator):
+    """Paginator, у которого count берется из cached_count()"""
+
+    def __init__(self, object_list, per_page, cache_name=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.cache_name = cache_name
+
+    @cached_property
+    def count(self):
+        if hasattr(self.object_list, 'query'):
+            return cached_count(self.object_list, self.cache_name)
+        return super().count
+
+
+class RankedPaginator:
+    """
+    Пагинатор результатов поиска в порядке релевантности. ranked_ids - id от
+    самого релевантного (main/search.py) или функция без аргументов, которая
+    их возвращает (вызывается при первой странице); queryset отсекает объекты,
+    не подходящие под остальные фильтры. Курсор - подписанная позиция в списке,
+    страницы совместимы с KeysetPage и шаблоном main/_cursor_pagination.html.
+    """
+
+    def __init__(self, queryset, per_page, ranked_ids):
+        self.queryset = queryset
+        self.per_page = per_page
+        self._ranked_ids = ranked_ids
+
+    @cached_property
+    def ranked_ids(self):
+        ranked_ids = self._ranked_ids
+        return list(ranked_ids() if callable(ranked_ids) else ranked_ids)
+
+    @cached_property
+    def object_ids(self):
+        allowed = set(self.queryset.filter(pk__in=self.ranked_ids).values_list('pk', flat=True))
+        return [pk for pk in self.ranked_ids if pk in allowed]
+
+    @cached_property
+    def count(self):
+        return len(self.object_ids)
+
+    def make_cursor(self, direction, obj):
+        position = self.object_ids.index(obj.pk)
+        start = position + 1 if direction == 'next' else max(position - self.per_page, 0)
+        return signing.dumps(['ranked', start], salt=CURSOR_SALT, compress=True)
+
+    def _start(self, cursor, page_number):
+        if cursor:
+            try:
+                kind, start = signing.loads(cursor, salt=CURSOR_SALT)
+            except (signing.BadSignature, TypeError, ValueError):
+                return 0
+            return start if kind == 'ranked' and isinstance(start, int) and start >= 0 else 0
+        try:
+            return max(int(page_number) - 1, 0) * self.per_page
+        except (TypeError, ValueError):
+            return 0
+
+    def get_page(self, cursor=None, page_number=None):
+        start = self._start(cursor, page_number)
+        if start >= self.count:
+            start = 0
+        ids = self.object_ids[start:start + self.per_page]
+        objects = self.queryset.in_bulk(ids)
+        rows = [objects[pk] for pk in ids if pk in objects]
+        return KeysetPage(rows, self, start + self.per_page < self.count, start > 0)
@@ -0,0 +1,565 @@
+# main/search.py
+"""
+Полнотекстовый поиск по задачам, услугам и вакансиям с русской морфологией.
+
+Индекс хранится вне моделей, в отдельной таблице текущей базы:
+
+- PostgreSQL: таблица search_document с колонкой tsvector и GIN-индексом;
+  морфология и стоп-слова - конфигурация SEARCH_PG_CONFIG ('russian'),
+  релевантность - ts_rank_cd (заголовок с весом A, описание - B).
+- SQLite: виртуальная таблица FTS5 на каждую модель (rowid = id объекта).
+  Слова приводятся к основе стеммером Snowball для русского языка из этого
+  модуля, стоп-слова отбрасываются; релевантность - bm25 с весом заголовка.
+- Другие СУБД: поиск подстрокой (icontains) без ранжирования.
+
+Для моделей с полем даты (recency) релевантность делится на 1 + возраст
+документа в периодах SEARCH_RECENCY_DAYS: при равной релевантности выше
+свежие. Модели с substring=True дополнительно хранят текст в триграммном
+индексе (pg_trgm в PostgreSQL, токенизатор trigram FTS5 в SQLite): если
+по словам ничего не нашлось, ищется подстрока - часть слова или адреса,
+как раньше делал icontains, но по индексу.
+
+Списки получают SearchMatch (search()): filter() добавляет к выборке
+условие id IN (подзапрос к индексу) без ограничения числа, поэтому фильтры
+списка, явная сортировка и «Найдено N» видят все найденные объекты.
+SEARCH_MAX_RESULTS ограничивает только окно сортировки по релевантности -
+ranked_ids() ранжирует объекты уже отфильтрованной выборки.
+
+В индекс попадают только объекты, видимые в публичном списке (условие
+модели, например PUBLIC_TASKS). Строки обновляются сигналами сохранения
+и удаления (main/signals.py) в той же транзакции, а действия модерации
+в админке, которые меняют записи через update(), вызывают index_objects().
+Таблицы индекса создаются после migrate (сигнал post_migrate) и командой
+rebuild_search_index, которая заодно заполняет индекс существующими данными:
+
+    python manage.py rebuild_search_index
+
+В запросах выполняется только проверка, что таблица есть (один раз на
+процесс); без таблицы поиск идет через icontains, а индекс не обновляется.
+
+Настройки:
+
+    SEARCH_PG_CONFIG = 'russian'   # конфигурация текстового поиска PostgreSQL
+    SEARCH_MAX_RESULTS = 500       # сколько объектов листается по релевантности
+    SEARCH_RECENCY_DAYS = 30       # за сколько дней релевантность падает вдвое
+"""
+import logging
+import re
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connections, router, transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils.functional import cached_property
+
+logger = logging.getLogger(__name__)
+
+# Основы слов для SQLite: упрощенный алгоритм Snowball для русского языка
+_RV = re.compile(r'^(.*?[аеиоуыэюя])(.*)$')
+_PERFECTIVE_GERUND = re.compile(r'((ив|ивши|ившись|ыв|ывши|ывшись)|((?<=[ая])(в|вши|вшись)))$')
+_REFLEXIVE = re.compile(r'(с[яь])$')
+_ADJECTIVE = re.compile(
+    r'(ее|ие|ые|ое|ими|ыми|ей|ий|ый|ой|ем|им|ым|ом|его|ого|ему|ому|их|ых|ую|юю|ая|яя|ою|ею)$'
+)
+_PARTICIPLE = re.compile(r'((ивш|ывш|ующ)|((?<=[ая])(ем|нн|вш|ющ|щ)))$')
+_VERB = re.compile(
+    r'((ила|ыла|ена|ейте|уйте|ите|или|ыли|ей|уй|ил|ыл|им|ым|ен|ило|ыло|ено|ят|ует|уют|ит|ыт|ены|ить|ыть|ишь|ую|ю)'
+    r'|((?<=[ая])(ла|на|ете|йте|ли|й|л|ем|н|ло|но|ет|ют|ны|ть|ешь|нно)))$'
+)
+_NOUN = re.compile(
+    r'(а|ев|ов|ие|ье|е|иями|ями|ами|еи|ии|и|ией|ей|ой|ий|й|иям|ям|ием|ем|ам|ом|о|у|ах|иях|ях|ы|ь|ию|ью|ю|ия|ья|я)$'
+)
+_DERIVATIONAL = re.compile(r'.*[^аеиоуыэюя]+[аеиоуыэюя].*ость?$')
+_WORD = re.compile(r'[0-9a-zа-я]+')
+
+STOP_WORDS = frozenset('''
+а без более бы был была были было быть в вам вас весь во вот все всего всех вы где да даже для до
+его ее ей ему если есть еще же за здесь и из или им их к как ко когда который кто ли либо мне может
+мы на над надо наш не него нее нет ни них но ну о об однако он она они оно от очень по под при с со
+так также такой там те тем то того тоже той только том ты у уже хотя чего чей чем что чтобы чье чья
+эта эти это этого этой этом я
+'''.split())
+
+
+def stem(word):
+    """Основа русского слова; латиница и числа возвращаются как есть"""
+    match = _RV.match(word)
+    if not match or not 'а' <= word[0] <= 'я':
+        return word
+    start, rv = match.groups()
+
+    result = _PERFECTIVE_GERUND.sub('', rv, 1)
+    if result == rv:
+        rv = _REFLEXIVE.sub('', rv, 1)
+        result = _ADJECTIVE.sub('', rv, 1)
+        if result != rv:
+            rv = _PARTICIPLE.sub('', result, 1)
+        else:
+            result = _VERB.sub('', rv, 1)
+            rv = _NOUN.sub('', rv, 1) if result == rv else result
+    else:
+        rv = result
+
+    rv = re.sub('и$', '', rv)
+    if _DERIVATIONAL.match(rv):
+        rv = re.sub('ость?$', '', rv)
+    result = re.sub('ь$', '', rv)
+    if result == rv:
+        rv = re.sub('нн$', 'н', re.sub('ейше?$', '', rv))
+    else:
+        rv = result
+    return start + rv
+
+
+def normalize(text):
+    """Основы значимых слов текста в исходном порядке"""
+    words = _WORD.findall((text or '').lower().replace('ё', 'е'))
+    return [stem(word) for word in words if word not in STOP_WORDS]
+
+
+class SearchableModel:
+    """
+    Модель в индексе: условие публичности, поля заголовка и текста,
+    поле даты для учета свежести в ранжировании и нужен ли поиск подстрокой
+    """
+
+    def __init__(self, model, condition, title, body, recency=None, substring=False):
+        self.model = model
+        self.condition = condition
+        self.title = title
+        self.body = tuple(body)
+        self.recency = recency
+        self.substring = substring
+
+    @property
+    def kind(self):
+        return self.model._meta.label_lower
+
+    @property
+    def table(self):
+        return 'search_' + self.kind.replace('.', '_')
+
+    def documents(self, queryset):
+        """(id, заголовок, текст, дата или None) публичных объектов выборки"""
+        fields = ['pk', self.recency or 'pk', self.title, *self.body]
+        for row in queryset.filter(self.condition).values_list(*fields).iterator():
+            published = row[1] if self.recency else None
+            yield row[0], row[2] or '', ' '.join(part or '' for part in row[3:]), published
+
+
+_registry = {}
+
+
+def register(model, condition=Q(), title='title', body=('description',), recency=None, substring=False):
+    """Добавляет модель в поиск (вызывается при загрузке main/signals.py)"""
+    _registry[model] = SearchableModel(model, condition, title, body, recency, substring)
+
+
+def get_searchable(model):
+    try:
+        return _registry[model]
+    except KeyError:
+        raise LookupError(f'{model._meta.label} не зарегистрирована в поиске') from None
+
+
+def registered_models():
+    return list(_registry)
+
+
+def _recency_days():
+    return getattr(settings, 'SEARCH_RECENCY_DAYS', 30)
+
+
+def _substring_words(query):
+    """Слова запроса для поиска подстрокой: не короче трех букв (длина триграммы)"""
+    words = _WORD.findall((query or '').lower().replace('ё', 'е'))
+    return [word for word in dict.fromkeys(words) if len(word) >= 3]
+
+
+def _within(queryset, column):
+    """Условие SQL, ограничивающее поиск объектами выборки queryset (или пустое)"""
+    if queryset is None:
+        return '', []
+    sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    return f' AND {column} IN ({sql})', list(params)
+
+
+class PostgresBackend:
+    """tsvector + GIN в общей таблице search_document; подстроки - pg_trgm"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.config = getattr(settings, 'SEARCH_PG_CONFIG', 'russian')
+
+    def install(self, searchable):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TABLE IF NOT EXISTS search_document ('
+                ' kind varchar(100) NOT NULL,'
+                ' object_id bigint NOT NULL,'
+                ' document tsvector NOT NULL,'
+                ' published_at timestamp with time zone NULL,'
+                ' content text NULL,'
+                ' PRIMARY KEY (kind, object_id))'
+            )
+            cursor.execute(
+                'CREATE INDEX IF NOT EXISTS search_document_gin ON search_document USING gin (document)'
+            )
+        if searchable.substring:
+            try:
+                # Расширение может создать только владелец базы; без него - обычный поиск
+                with transaction.atomic(using=self.connection.alias), self.connection.cursor() as cursor:
+                    cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+                    cursor.execute(
+                        'CREATE INDEX IF NOT EXISTS search_document_trgm ON search_document'
+                        ' USING gin (content gin_trgm_ops) WHERE content IS NOT NULL'
+                    )
+            except DatabaseError:
+                logger.warning('pg_trgm недоступен, поиск подстрокой отключен', exc_info=True)
+                _no_substring.add(self.connection.settings_dict['NAME'])
+            else:
+                _no_substring.discard(self.connection.settings_dict['NAME'])
+
+    def installed(self, searchable):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT to_regclass('search_document') IS NOT NULL, to_regclass('search_document_trgm') IS NOT NULL"
+            )
+            table, trigram = cursor.fetchone()
+        if searchable.substring and not trigram:
+            _no_substring.add(self.connection.settings_dict['NAME'])
+        return table
+
+    def upsert(self, searchable, documents):
+        rows = [
+            (
+                searchable.kind, pk, self.config, title, self.config, body, published,
+                f'{title} {body}'.lower() if searchable.substring else None,
+            )
+            for pk, title, body, published in documents
+        ]
+        if not rows:
+            return
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                'INSERT INTO search_document (kind, object_id, document, published_at, content) VALUES (%s, %s, '
+                " setweight(to_tsvector(%s::regconfig, %s), 'A') || setweight(to_tsvector(%s::regconfig, %s), 'B'),"
+                ' %s, %s)'
+                ' ON CONFLICT (kind, object_id) DO UPDATE SET document = EXCLUDED.document,'
+                ' published_at = EXCLUDED.published_at, content = EXCLUDED.content',
+                rows,
+            )
+
+    def delete(self, searchable, pks=None):
+        with self.connection.cursor() as cursor:
+            if pks is None:
+                cursor.execute('DELETE FROM search_document WHERE kind = %s', [searchable.kind])
+            else:
+                cursor.execute(
+                    'DELETE FROM search_document WHERE kind = %s AND object_id = ANY(%s)',
+                    [searchable.kind, list(pks)],
+                )
+
+    def matches(self, searchable, query, substring=False):
+        """(SQL, параметры) id всех подходящих объектов или None, если искать нечего"""
+        if not substring:
+            return (
+                'SELECT object_id FROM search_document'
+                ' WHERE kind = %s AND document @@ websearch_to_tsquery(%s::regconfig, %s)',
+                [searchable.kind, self.config, query],
+            )
+        words = _substring_words(query)
+        if not words or self.connection.settings_dict['NAME'] in _no_substring:
+            return None
+        # ILIKE по тексту с GIN-индексом pg_trgm
+        condition = ' AND '.join(['content ILIKE %s'] * len(words))
+        return (
+            f'SELECT object_id FROM search_document WHERE kind = %s AND {condition}',
+            [searchable.kind, *(f'%{word}%' for word in words)],
+        )
+
+    def search(self, searchable, query, limit, within=None):
+        # Релевантность делится на 1 + возраст в периодах SEARCH_RECENCY_DAYS
+        sql, params = _within(within, 'object_id')
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT object_id FROM search_document, websearch_to_tsquery(%s::regconfig, %s) query'
+                f' WHERE kind = %s AND document @@ query{sql}'
+                ' ORDER BY ts_rank_cd(document, query)::float8 / (1 + coalesce('
+                '  extract(epoch FROM now() - published_at)::float8 / 86400, 0) / %s) DESC,'
+                ' object_id DESC LIMIT %s',
+                [self.config, query, searchable.kind, *params, _recency_days(), limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def search_substring(self, searchable, query, limit, within=None):
+        found = self.matches(searchable, query, substring=True)
+        if found is None:
+            return []
+        sql, params = _within(within, 'object_id')
+        # Новые выше
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'{found[0]}{sql} ORDER BY published_at DESC NULLS LAST, object_id DESC LIMIT %s',
+                [*found[1], *params, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class SqliteBackend:
+    """FTS5-таблица на модель; основы слов считаются в Python, подстроки - токенизатор trigram"""
+
+    # Вес заголовка относительно описания в bm25
+    TITLE_WEIGHT = 10.0
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def install(self, searchable):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE VIRTUAL TABLE IF NOT EXISTS {searchable.table} USING fts5('
+                " title, body, published UNINDEXED, tokenize = 'unicode61 remove_diacritics 2')"
+            )
+            if searchable.substring:
+                cursor.execute(
+                    f'CREATE VIRTUAL TABLE IF NOT EXISTS {searchable.table}_trigram USING fts5('
+                    " content, published UNINDEXED, tokenize = 'trigram')"
+                )
+
+    def installed(self, searchable):
+        tables = [searchable.table] + ([f'{searchable.table}_trigram'] if searchable.substring else [])
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT count(*) FROM sqlite_master WHERE name IN ({', '.join(['%s'] * len(tables))})", tables
+            )
+            return cursor.fetchone()[0] == len(tables)
+
+    def upsert(self, searchable, documents):
+        rows = [
+            (
+                pk, ' '.join(normalize(title)), ' '.join(normalize(body)),
+                published.timestamp() if published else None, f'{title} {body}'.lower(),
+            )
+            for pk, title, body, published in documents
+        ]
+        if not rows:
+            return
+        self.delete(searchable, [row[0] for row in rows])
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {searchable.table} (rowid, title, body, published) VALUES (%s, %s, %s, %s)',
+                [row[:4] for row in rows],
+            )
+            if searchable.substring:
+                cursor.executemany(
+                    f'INSERT INTO {searchable.table}_trigram (rowid, published, content) VALUES (%s, %s, %s)',
+                    [(row[0], row[3], row[4]) for row in rows],
+                )
+
+    def delete(self, searchable, pks=None):
+        tables = [searchable.table] + ([f'{searchable.table}_trigram'] if searchable.substring else [])
+        with self.connection.cursor() as cursor:
+            for table in tables:
+                if pks is None:
+                    cursor.execute(f'DELETE FROM {table}')
+                else:
+                    cursor.executemany(f'DELETE FROM {table} WHERE rowid = %s', [(pk,) for pk in pks])
+
+    def matches(self, searchable, query, substring=False):
+        """(SQL, параметры) id всех подходящих объектов или None, если искать нечего"""
+        if substring:
+            words = _substring_words(query)
+            table = f'{searchable.table}_trigram'
+            match = ' '.join(f'"{word}"' for word in words)
+        else:
+            # Все слова запроса обязательны; основа ищется как префикс
+            words = list(dict.fromkeys(normalize(query)))
+            table = searchable.table
+            match = ' '.join(f'"{term}"*' for term in words)
+        if not words:
+            return None
+        return f'SELECT rowid FROM {table} WHERE {table} MATCH %s', [match]
+
+    def search(self, searchable, query, limit, within=None):
+        found = self.matches(searchable, query)
+        if found is None:
+            return []
+        sql, params = _within(within, 'rowid')
+        # bm25 отрицательный: чем меньше, тем лучше; деление на 1 + возраст
+        # в периодах SEARCH_RECENCY_DAYS приближает старые документы к нулю
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'{found[0]}{sql}'
+                f' ORDER BY bm25({searchable.table}, {self.TITLE_WEIGHT}, 1.0)'
+                '  / (1 + coalesce((%s - published) / 86400.0, 0) / %s), rowid DESC LIMIT %s',
+                [*found[1], *params, time.time(), _recency_days(), limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def search_substring(self, searchable, query, limit, within=None):
+        found = self.matches(searchable, query, substring=True)
+        if found is None:
+            return []
+        sql, params = _within(within, 'rowid')
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'{found[0]}{sql} ORDER BY published DESC NULLS LAST, rowid DESC LIMIT %s',
+                [*found[1], *params, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+BACKENDS = {
+    'postgresql': PostgresBackend,
+    'sqlite': SqliteBackend,
+}
+
+# Таблицы индекса, найденные в этом процессе: {(имя базы, kind)}
+_installed = set()
+# Базы PostgreSQL без pg_trgm: {имя базы}
+_no_substring = set()
+
+
+def _backend(model):
+    searchable = get_searchable(model)
+    connection = connections[router.db_for_write(model)]
+    backend_class = BACKENDS.get(connection.vendor)
+    return (backend_class(connection) if backend_class else None), searchable
+
+
+def get_backend(model):
+    """
+    Бэкенд поиска для базы модели и ее описание. None вместо бэкенда, если
+    СУБД не поддерживается или таблицы индекса еще не созданы
+    """
+    backend, searchable = _backend(model)
+    if backend is None:
+        return None, searchable
+    # Ключ - имя базы, а не алиас: тестовая база создается под тем же алиасом
+    key = (backend.connection.settings_dict['NAME'], searchable.kind)
+    if key not in _installed:
+        if not backend.installed(searchable):
+            logger.warning('Нет таблицы поискового индекса %s, выполните rebuild_search_index', searchable.kind)
+            return None, searchable
+        _installed.add(key)
+    return backend, searchable
+
+
+def install(model):
+    """Создает таблицы индекса модели, если их нет (migrate, rebuild_search_index)"""
+    backend, searchable = _backend(model)
+    if backend is not None:
+        backend.install(searchable)
+
+
+def install_all(sender=None, using=None, **kwargs):
+    """Создает таблицы индекса всех моделей; подключен к post_migrate"""
+    for model in registered_models():
+        if using is None or router.db_for_write(model) == using:
+            install(model)
+
+
+def index_objects(model, pks):
+    """Обновляет строки индекса объектов: публичные добавляются, остальные удаляются"""
+    backend, searchable = get_backend(model)
+    if backend is None:
+        return
+    pks = list(pks)
+    documents = list(searchable.documents(model._default_manager.filter(pk__in=pks)))
+    found = {document[0] for document in documents}
+    backend.upsert(searchable, documents)
+    backend.delete(searchable, [pk for pk in pks if pk not in found])
+
+
+def remove_objects(model, pks):
+    """Удаляет строки индекса объектов"""
+    backend, searchable = get_backend(model)
+    if backend is not None:
+        backend.delete(searchable, list(pks))
+
+
+def rebuild_index(model, chunk_size=1000):
+    """Перестраивает индекс модели целиком, возвращает число проиндексированных объектов"""
+    install(model)
+    backend, searchable = get_backend(model)
+    if backend is None:
+        return 0
+    backend.delete(searchable)
+    total = 0
+    chunk = []
+    for document in searchable.documents(model._default_manager.all()):
+        chunk.append(document)
+        if len(chunk) >= chunk_size:
+            backend.upsert(searchable, chunk)
+            total += len(chunk)
+            chunk = []
+    backend.upsert(searchable, chunk)
+    return total + len(chunk)
+
+
+class SearchMatch:
+    """
+    Объекты, найденные по запросу. filter() оставляет в выборке все найденные
+    (без ограничения SEARCH_MAX_RESULTS: на этом строятся фильтры, сортировка
+    и счетчики), ranked_ids() - самые релевантные из них.
+
+    Если по словам ничего нет, а модель зарегистрирована с substring=True -
+    поиск подстрокой по триграммному индексу, новые выше. Без поддержки
+    полнотекстового поиска в СУБД - icontains, новые выше.
+    """
+
+    def __init__(self, model, query):
+        self.model = model
+        self.query = (query or '').strip()
+        self.backend, self.searchable = get_backend(model)
+        self.mode = None
+        if not self.query:
+            return
+        if self.backend is None:
+            self.mode = 'icontains'
+        elif self.backend.search(self.searchable, self.query, 1):
+            self.mode = 'words'
+        # Ничего не нашлось по словам - ищем подстроку (часть слова, номер, адрес)
+        elif self.searchable.substring and self.backend.search_substring(self.searchable, self.query, 1):
+            self.mode = 'substring'
+
+    @cached_property
+    def found(self):
+        if self.mode == 'icontains':
+            return bool(self.ranked_ids(limit=1))
+        return self.mode is not None
+
+    def filter(self, queryset):
+        """Выборка queryset, ограниченная найденными объектами"""
+        if self.mode is None:
+            return queryset.none()
+        if self.mode == 'icontains':
+            condition = Q()
+            for field in (self.searchable.title, *self.searchable.body):
+                condition |= Q(**{f'{field}__icontains': self.query})
+            return queryset.filter(self.searchable.condition).filter(condition)
+        sql, params = self.backend.matches(self.searchable, self.query, self.mode == 'substring')
+        return queryset.filter(pk__in=RawSQL(sql, params))
+
+    def ranked_ids(self, queryset=None, limit=None):
+        """id найденных объектов выборки queryset (по умолчанию всех), от самых релевантных"""
+        limit = limit or getattr(settings, 'SEARCH_MAX_RESULTS', 500)
+        if self.mode is None:
+            return []
+        if self.mode == 'icontains':
+            queryset = self.filter(queryset if queryset is not None else self.model._default_manager.all())
+            return list(queryset.order_by('-pk').values_list('pk', flat=True)[:limit])
+        search = self.backend.search_substring if self.mode == 'substring' else self.backend.search
+        return search(self.searchable, self.query, limit, within=queryset)
+
+
+def search(model, query):
+    """Поиск по запросу: SearchMatch"""
+    return SearchMatch(model, query)
+
+
+def search_ids(model, query, limit=None):
+    """id публичных объектов, подходящих под запрос, от самых релевантных (не больше limit)"""
+    return search(model, query).ranked_ids(limit=limit)
@@ -0,0 +1,169 @@
+# main/signals.py
+from django.db.models import F, Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from articles.models import Article
+from articles.models import Category as ArticleCategory
+from categories.catalog import invalidate_catalog as invalidate_category_tree
+from categories.models import Category, CategorySection
+from regions.gazetteer import invalidate_gazetteer
+from regions.models import City, Region
+from services.models import PUBLIC_SERVICES, Service, ServiceMessage
+from tasks.models import PUBLIC_TASKS, Message, Task
+from vacancies.models import PUBLIC_VACANCIES, Specialty, Vacancy, VacancyResponse
+
+from .cache import (
+    ARTICLES_LISTING, CATALOG, SERVICES_LISTING, TASKS_LISTING, VACANCIES_LISTING,
+    bump_version,
+)
+from .context_processors import FOOTER_CACHE
+from .counters import register as register_counter
+from .inbox import (
+    register_service_message, register_task_message, unregister_service_message, unregister_task_message,
+)
+from .page_cache import purge_surrogate_keys, surrogate_key
+from .search import index_objects, register, remove_objects
+
+
+# Полнотекстовый поиск по публичным задачам, услугам и вакансиям (main/search.py)
+register(Task, PUBLIC_TASKS)
+register(Service, PUBLIC_SERVICES)
+register(Vacancy, PUBLIC_VACANCIES, body=('description', 'location'), recency='created_at', substring=True)
+
+# Денормализованные счетчики (main/counters.py): отклики на вакансию (выводятся в списке
+# вакансий) и заказчики, написавшие автору услуги (только в кабинете автора - списки
+# услуг не сбрасываются, только страницы самой услуги)
+register_counter('responses_count', VacancyResponse, 'vacancy', invalidate=(VACANCIES_LISTING,))
+register_counter(
+    'orders_count', ServiceMessage, 'service',
+    condition=~Q(sender=F('service__author')),
+    when=lambda message: message.sender_id != message.service.author_id,
+    distinct='sender',
+)
+
+# Сохранения только счетчика просмотров (detail-страницы) кеш списков не сбрасывают
+VIEWS_ONLY = frozenset({'views'})
+
+
+def _only_views_changed(kwargs):
+    update_fields = kwargs.get('update_fields')
+    return bool(update_fields) and set(update_fields) <= VIEWS_ONLY
+
+
+@receiver([post_save, post_delete], sender=City)
+@receiver([post_save, post_delete], sender=Article)
+def invalidate_footer(sender, **kwargs):
+    """Сбрасывает кеш футера при изменении городов и статей (разделы берутся из каталога)"""
+    if not _only_views_changed(kwargs):
+        bump_version(FOOTER_CACHE)
+
+
+@receiver([post_save, post_delete], sender=Task)
+def invalidate_task_listing(sender, **kwargs):
+    """Сбрасывает кеш списка задач"""
+    if not _only_views_changed(kwargs):
+        bump_version(TASKS_LISTING)
+
+
+@receiver([post_save, post_delete], sender=Service)
+def invalidate_service_listing(sender, **kwargs):
+    """Сбрасывает кеш списка услуг и главной страницы"""
+    if not _only_views_changed(kwargs):
+        bump_version(SERVICES_LISTING)
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_save, sender=Service)
+@receiver(post_save, sender=Vacancy)
+def update_search_index(sender, instance, **kwargs):
+    """Переиндексирует объект; снятый с публикации убирается из индекса"""
+    if not _only_views_changed(kwargs):
+        index_objects(sender, [instance.pk])
+
+
+@receiver(post_delete, sender=Task)
+@receiver(post_delete, sender=Service)
+@receiver(post_delete, sender=Vacancy)
+def remove_from_search_index(sender, instance, **kwargs):
+    """Удаляет объект из поискового индекса"""
+    remove_objects(sender, [instance.pk])
+
+
+@receiver([post_save, post_delete], sender=Vacancy)
+@receiver([post_save, post_delete], sender=Specialty)
+def invalidate_vacancy_listing(sender, **kwargs):
+    """Сбрасывает кеш списка вакансий"""
+    if not _only_views_changed(kwargs):
+        bump_version(VACANCIES_LISTING)
+
+
+@receiver([post_save, post_delete], sender=Article)
+@receiver([post_save, post_delete], sender=ArticleCategory)
+def invalidate_article_listing(sender, **kwargs):
+    """Сбрасывает кеш сайдбара статей"""
+    if not _only_views_changed(kwargs):
+        bump_version(ARTICLES_LISTING)
+
+
+@receiver([post_save, post_delete], sender=City)
+@receiver([post_save, post_delete], sender=CategorySection)
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_catalog(sender, **kwargs):
+    """Сбрасывает кеш фильтров по разделам, категориям и городам"""
+    bump_version(CATALOG)
+
+
+@receiver([post_save, post_delete], sender=CategorySection)
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_category_catalog(sender, **kwargs):
+    """Перечитывает каталог категорий в памяти процессов"""
+    invalidate_category_tree()
+
+
+@receiver([post_save, post_delete], sender=Region)
+@receiver([post_save, post_delete], sender=City)
+def invalidate_region_gazetteer(sender, **kwargs):
+    """Перечитывает справочник регионов и городов в памяти процессов"""
+    invalidate_gazetteer()
+
+
+@receiver([post_save, post_delete], sender=Task)
+@receiver([post_save, post_delete], sender=Service)
+@receiver([post_save, post_delete], sender=Vacancy)
+@receiver([post_save, post_delete], sender=Article)
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=Specialty)
+@receiver([post_save, post_delete], sender=City)
+def purge_object_pages(sender, instance, **kwargs):
+    """Сбрасывает закешированные страницы, помеченные ключом объекта"""
+    if not _only_views_changed(kwargs):
+        purge_surrogate_keys(surrogate_key(instance))
+
+
+@receiver(post_save, sender=Message)
+def count_task_message(sender, instance, created, **kwargs):
+    """Увеличивает счетчик непрочитанных получателя сообщения по задаче"""
+    if created and not instance.is_read:
+        register_task_message(instance)
+
+
+@receiver(post_save, sender=ServiceMessage)
+def count_service_message(sender, instance, created, **kwargs):
+    """Увеличивает счетчик непрочитанных получателя сообщения по услуге"""
+    if created and not instance.is_read:
+        register_service_message(instance)
+
+
+@receiver(post_delete, sender=Message)
+def uncount_task_message(sender, instance, **kwargs):
+    """Уменьшает счетчик непрочитанных получателя удаленного сообщения по задаче"""
+    if not instance.is_read:
+        unregister_task_message(instance)
+
+
+@receiver(post_delete, sender=ServiceMessage)
+def uncount_service_message(sender, instance, **kwargs):
+    """Уменьшает счетчик непрочитанных получателя удаленного сообщения по услуге"""
+    if not instance.is_read:
+        unregister_service_message(instance)
@@ -0,0 +1,274 @@
+# main/spelling.py
+"""
+Исправление поисковых запросов: неверная раскладка и опечатки.
+
+Словарь - слова названий публичных объектов поиска (main/search.py),
+названий разделов и категорий (categories/catalog.py) и специальностей
+вакансий с частотами. Он строится один раз и хранится в памяти процесса
+вместе с индексом удалений (symmetric delete): каждое слово записано под
+собой и под всеми вариантами без одной буквы, а слова длиннее пяти букв -
+и без двух. Кандидаты для слова запроса берутся из индекса по тем же
+удалениям (столько букв, сколько правок допустимо), затем проверяются
+расстоянием Дамерау-Левенштейна; исправление занимает микросекунды и не
+обращается к базе.
+
+Словарь перестраивается, если старше SEARCH_VOCABULARY_TTL секунд или
+после увеличения версии группы SEARCH_VOCABULARY (main/cache.py) командой
+rebuild_search_index; версия сверяется не чаще раза в
+SEARCH_VOCABULARY_CHECK_INTERVAL секунд. Строится он при первом поиске без
+результатов в фоновом потоке, как и перестраивается: пока нового словаря
+нет, запросы исправляются по прежнему. Первая сборка запускается с первым
+запросом процесса (warm_vocabulary), а пока ее нет, запросы не исправляются
+и списки не кешируют страницу «ничего не найдено» (corrections_ready).
+
+Настройки:
+
+    SEARCH_VOCABULARY_TTL = 3600             # время жизни словаря, секунды
+    SEARCH_VOCABULARY_CHECK_INTERVAL = 60    # как часто сверять версию, секунды
+    SEARCH_VOCABULARY_BACKGROUND = True      # строить словарь в фоновом потоке
+"""
+import logging
+import re
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import connections
+
+from categories.catalog import get_catalog
+from vacancies.models import Specialty
+
+from .cache import SEARCH_VOCABULARY, get_version
+from .search import get_searchable, registered_models, search
+
+logger = logging.getLogger(__name__)
+
+# Раскладки ЙЦУКЕН и QWERTY: одни и те же клавиши
+_LATIN_KEYS = "qwertyuiop[]asdfghjkl;'zxcvbnm,.`"
+_CYRILLIC_KEYS = 'йцукенгшщзхъфывапролджэячсмитьбюё'
+_TO_CYRILLIC = str.maketrans(_LATIN_KEYS, _CYRILLIC_KEYS)
+_TO_LATIN = str.maketrans(_CYRILLIC_KEYS, _LATIN_KEYS)
+
+_WORD = re.compile(r'[0-9a-zа-я]+')
+_LETTERS = re.compile(r'[a-zа-я]+')
+
+# Слова короче не исправляются: у них слишком много соседей
+MIN_LENGTH = 3
+
+
+def _words(text):
+    return _WORD.findall((text or '').lower().replace('ё', 'е'))
+
+
+def _deletes(word, depth=1):
+    """Слово и его варианты без одной, ..., depth букв"""
+    found = layer = {word}
+    for _ in range(depth):
+        layer = {variant[:i] + variant[i + 1:] for variant in layer for i in range(len(variant))}
+        found = found | layer
+    return found
+
+
+def _max_distance(word):
+    return 1 if len(word) <= 5 else 2
+
+
+def distance(a, b, limit):
+    """
+    Расстояние Дамерау-Левенштейна (перестановка соседних букв - одна правка);
+    limit + 1, если расстояние больше limit
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def layout_variants(token):
+    """Слово, набранное в другой раскладке: 'ghjuhfvvbcn' -> 'программист'"""
+    variants = []
+    if all(char in _LATIN_KEYS for char in token) and re.search('[a-z]', token):
+        variants.append(token.translate(_TO_CYRILLIC).replace('ё', 'е'))
+    if all(char in _CYRILLIC_KEYS for char in token):
+        variants.append(token.translate(_TO_LATIN))
+    return variants
+
+
+class Vocabulary:
+    """Слова с частотами и индекс удалений"""
+    __slots__ = ('version', 'built_at', 'frequencies', 'deletes')
+
+    def __init__(self, version, frequencies):
+        self.version = version
+        self.built_at = time.monotonic()
+        self.frequencies = frequencies
+        self.deletes = {}
+        for word in frequencies:
+            for deleted in _deletes(word, _max_distance(word)):
+                self.deletes.setdefault(deleted, []).append(word)
+
+    def nearest(self, word):
+        """(расстояние, слово) ближайшего известного слова или None"""
+        limit = _max_distance(word)
+        best = None
+        for key in _deletes(word, limit):
+            for candidate in self.deletes.get(key, ()):
+                found = distance(word, candidate, limit)
+                if found > limit:
+                    continue
+                rank = (found, -self.frequencies[candidate], candidate)
+                if best is None or rank < best:
+                    best = rank
+        return (best[0], best[2]) if best else None
+
+    def correct_word(self, token):
+        """Исправленное слово или None, если слово известно или исправить нечего"""
+        word = token.replace('ё', 'е')
+        if word in self.frequencies:
+            return None
+        variants = layout_variants(token)
+        for variant in variants:
+            if variant in self.frequencies:
+                return variant
+
+        best = None
+        for candidate in (word, *variants):
+            if not _LETTERS.fullmatch(candidate) or len(candidate) < MIN_LENGTH:
+                continue
+            found = self.nearest(candidate)
+            if found and (best is None or found < best):
+                best = found
+        return best[1] if best else None
+
+    def correct(self, query):
+        """Исправленный запрос или None, если исправлять нечего"""
+        tokens = (query or '').lower().split()
+        corrected = [self.correct_word(token) for token in tokens]
+        if not any(corrected):
+            return None
+        return ' '.join(fixed or token for token, fixed in zip(tokens, corrected))
+
+
+EMPTY_VOCABULARY = Vocabulary(None, {})
+
+
+def build_vocabulary(version=None):
+    """Считает слова названий объектов поиска, категорий и специальностей"""
+    frequencies = Counter()
+    for model in registered_models():
+        searchable = get_searchable(model)
+        titles = model._default_manager.filter(searchable.condition).values_list(searchable.title, flat=True)
+        for title in titles.iterator(chunk_size=2000):
+            frequencies.update(_words(title))
+    for section in get_catalog().sections:
+        frequencies.update(_words(section.name))
+        for category in section.categories:
+            frequencies.update(_words(category.name))
+    for name in Specialty.objects.values_list('name', flat=True):
+        frequencies.update(_words(name))
+    return Vocabulary(version, {word: count for word, count in frequencies.items() if len(word) >= MIN_LENGTH})
+
+
+_vocabulary = None
+_checked_at = 0.0
+_building = False
+_lock = threading.Lock()
+
+
+def _build(version, background):
+    global _vocabulary, _building
+    try:
+        _vocabulary = build_vocabulary(version)
+    except Exception:
+        logger.exception('Не удалось построить словарь исправления запросов')
+    finally:
+        _building = False
+        if background:
+            # Соединения фонового потока больше не понадобятся
+            connections.close_all()
+
+
+def _start_build(version):
+    """Запускает сборку словаря, если она еще не идет"""
+    global _building
+    with _lock:
+        if _building:
+            return
+        _building = True
+    if getattr(settings, 'SEARCH_VOCABULARY_BACKGROUND', True):
+        threading.Thread(target=_build, args=(version, True), daemon=True).start()
+    else:
+        _build(version, False)
+
+
+def get_vocabulary():
+    """
+    Словарь текущего процесса; по времени жизни или версии перестраивается
+    в фоне, а до тех пор отдается прежний (пустой до первой сборки)
+    """
+    global _checked_at
+    now = time.monotonic()
+    vocabulary = _vocabulary
+    interval = getattr(settings, 'SEARCH_VOCABULARY_CHECK_INTERVAL', 60)
+    if vocabulary is not None and now - _checked_at < interval:
+        return vocabulary
+
+    version = get_version(SEARCH_VOCABULARY)
+    ttl = getattr(settings, 'SEARCH_VOCABULARY_TTL', 60 * 60)
+    if vocabulary is None or vocabulary.version != version or now - vocabulary.built_at > ttl:
+        _start_build(version)
+        vocabulary = _vocabulary
+    _checked_at = now
+    return vocabulary if vocabulary is not None else EMPTY_VOCABULARY
+
+
+def loaded_vocabulary():
+    """Словарь, уже построенный в процессе, без сверки версии и сборки"""
+    vocabulary = _vocabulary
+    return vocabulary if vocabulary is not None else EMPTY_VOCABULARY
+
+
+def corrections_ready():
+    """Построен ли в процессе словарь: без него запросы не исправляются"""
+    return _vocabulary is not None
+
+
+def warm_vocabulary(**kwargs):
+    """Запускает первую сборку словаря; подключен к request_started"""
+    request_started.disconnect(dispatch_uid='spelling:warm')
+    get_vocabulary()
+
+
+def suggest(query):
+    """Исправленный запрос (раскладка, опечатки) или None"""
+    return get_vocabulary().correct(query)
+
+
+def search_with_correction(model, query):
+    """
+    (SearchMatch, исправленный запрос или None): если по запросу ничего не
+    нашлось, ищет по исправленному
+    """
+    found = search(model, query)
+    if found.found or not (query or '').strip():
+        return found, None
+    corrected = suggest(query)
+    if corrected is None:
+        return found, None
+    corrected_found = search(model, corrected)
+    if not corrected_found.found:
+        return found, None
+    return corrected_found, corrected
@@ -0,0 +1,60 @@
+# main/templatetags/fragments.py
+"""
+Теги для раздельного кеширования страниц.
+
+{% personal_navbar %} - персональная часть навбара из кеша пользователя;
+ключ зависит от версий его сообщений и уведомлений.
+
+{% cache_version "listing:tasks" "catalog" as version %} - составная версия
+групп кеша для {% cache %}, чтобы фрагменты сбрасывались сигналами моделей.
+"""
+import hashlib
+
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from main.cache import get_version, inbox_cache_name
+from users.notification_summary import summary_cache_name
+
+register = template.Library()
+
+NAVBAR_TEMPLATE = 'main/_navbar_user.html'
+
+
+def navbar_cache_key(user):
+    """Ключ кеша навбара: версии входящих и уведомлений плюс отображаемые поля пользователя"""
+    profile = '|'.join((
+        user.username,
+        user.get_full_name(),
+        user.avatar.name if user.avatar else '',
+        '1' if user.is_staff else '0',
+    ))
+    profile_hash = hashlib.md5(profile.encode('utf-8')).hexdigest()[:12]
+    return 'navbar:{}:{}:{}:{}'.format(
+        user.pk,
+        get_version(inbox_cache_name(user.pk)),
+        get_version(summary_cache_name(user.pk)),
+        profile_hash,
+    )
+
+
+@register.simple_tag(takes_context=True)
+def personal_navbar(context):
+    """Персональная часть навбара (уведомления, сообщения, меню пользователя)"""
+    request = context['request']
+    key = navbar_cache_key(request.user)
+    html = cache.get(key)
+    if html is None:
+        html = render_to_string(NAVBAR_TEMPLATE, {'user': request.user}, request=request)
+        # В выпадающем списке есть «N минут назад», поэтому таймаут небольшой
+        cache.set(key, html, getattr(settings, 'NAVBAR_CACHE_TIMEOUT', 60))
+    return mark_safe(html)
+
+
+@register.simple_tag
+def cache_version(*names):
+    """Составная версия нескольких групп кеша, например "listing:tasks" и "catalog" """
+    return '.'.join(str(get_version(name)) for name in names)
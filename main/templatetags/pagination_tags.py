@@ -0,0 +1,13 @@
+# main/templatetags/pagination_tags.py
+from django import template
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def cursor_query(context, cursor):
+    """Строка запроса текущей страницы с другим курсором: фильтры и сортировка сохраняются"""
+    query = context['request'].GET.copy()
+    query.pop('page', None)
+    query['cursor'] = cursor
+    return query.urlencode()
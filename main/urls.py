@@ -3,5 +3,6 @@ from . import views
 
 urlpatterns = [
     path('', views.home, name='home'),
+    path('ajax/autocomplete/', views.autocomplete, name='autocomplete'),
     # другие URL вашего приложения main
 ]
\ No newline at end of file
@@ -0,0 +1,131 @@
+# main/view_anomalies.py
+"""
+Поиск накруток просмотров по дневным рядам (main/view_series.py).
+
+Просмотры объекта за день сравниваются с его обычными просмотрами за
+VIEW_ANOMALY_BASELINE_DAYS предыдущих дней. Ряд сравнения начинается с
+первого дня, когда у объекта были просмотры: дни до публикации объявления
+(или до начала записи рядов) - не нули, а отсутствие данных. Объекты, у
+которых таких дней меньше VIEW_ANOMALY_MIN_HISTORY_DAYS, не проверяются.
+Оценка устойчива к редким выбросам: медиана и медианное абсолютное
+отклонение (MAD) вместо среднего и стандартного отклонения. День попадает
+на проверку модератору (ViewAnomaly в админке), если просмотров не меньше
+VIEW_ANOMALY_MIN_VIEWS и отклонение от медианы больше
+VIEW_ANOMALY_THRESHOLD масштабов MAD.
+
+Ряды читаются потоком, упорядоченными по объекту, поэтому память не
+зависит от числа объектов. Запуск раз в сутки за вчерашний день:
+
+    python manage.py detect_view_anomalies
+    python manage.py detect_view_anomalies --day 2026-10-16
+
+Настройки:
+
+    VIEW_ANOMALY_BASELINE_DAYS = 28      # с какими днями сравнивать
+    VIEW_ANOMALY_MIN_VIEWS = 50          # меньше просмотров за день не проверяем
+    VIEW_ANOMALY_THRESHOLD = 6           # порог отклонения, в масштабах MAD
+    VIEW_ANOMALY_MIN_HISTORY_DAYS = 7    # меньше дней с данными для сравнения не проверяем
+"""
+import datetime
+from itertools import groupby
+from statistics import median
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import ViewAnomaly, ViewSeries
+from .view_series import place
+
+# MAD нормального распределения в стандартных отклонениях
+MAD_SCALE = 1.4826
+
+
+def anomaly_score(views, baseline):
+    """(медиана, отклонение views от медианы ряда baseline в масштабах MAD)"""
+    middle = median(baseline)
+    spread = MAD_SCALE * median(abs(value - middle) for value in baseline)
+    # Единица в знаменателе: у ровного ряда MAD нулевой, а +1-2 просмотра - не всплеск
+    return middle, (views - middle) / (spread + 1)
+
+
+def _first_view(values):
+    """Номер первого дня с просмотрами или None"""
+    return next((index for index, count in enumerate(values) if count), None)
+
+
+def detect_anomalies(day=None, batch_size=1000):
+    """Находит всплески просмотров за день day (по умолчанию вчера); возвращает число новых"""
+    day = day or timezone.localdate() - datetime.timedelta(days=1)
+    baseline_days = getattr(settings, 'VIEW_ANOMALY_BASELINE_DAYS', 28)
+    min_views = getattr(settings, 'VIEW_ANOMALY_MIN_VIEWS', 50)
+    threshold = getattr(settings, 'VIEW_ANOMALY_THRESHOLD', 6)
+    min_history = getattr(settings, 'VIEW_ANOMALY_MIN_HISTORY_DAYS', 7)
+    start = day - datetime.timedelta(days=baseline_days)
+    # Ряд читается с начала месяца: просмотры до start значат, что объект уже был
+    first_month = start.replace(day=1)
+    offset = (start - first_month).days
+
+    def check(label, object_id, values, first):
+        baseline = values[max(first, offset):-1]
+        if len(baseline) < min_history:
+            return None
+        middle, score = anomaly_score(values[-1], baseline)
+        if score < threshold:
+            return None
+        return ViewAnomaly(
+            model=label, object_id=object_id, day=day,
+            views=values[-1], baseline=middle, score=round(score, 1),
+        )
+
+    def check_new(candidates):
+        """Объекты без просмотров до start: ряд с начала записи, если нет более ранних месяцев"""
+        earlier = set()
+        for label in {candidate[0] for candidate in candidates}:
+            ids = [object_id for model, object_id, _, _ in candidates if model == label]
+            earlier.update(
+                (label, object_id) for object_id in ViewSeries.objects.filter(
+                    model=label, object_id__in=ids, month__lt=first_month,
+                ).values_list('object_id', flat=True).distinct()
+            )
+        return [
+            check(label, object_id, values, offset if (label, object_id) in earlier else first)
+            for label, object_id, values, first in candidates
+        ]
+
+    rows = (
+        ViewSeries.objects.filter(month__gte=first_month, month__lte=day)
+        .order_by('model', 'object_id', 'month')
+        .values_list('model', 'object_id', 'month', 'days')
+        .iterator(chunk_size=batch_size)
+    )
+    found = []
+    new = []
+    created = 0
+    for (label, object_id), group in groupby(rows, key=lambda row: (row[0], row[1])):
+        values = [0] * ((day - first_month).days + 1)
+        for _, _, month, data in group:
+            place(values, first_month, month, data)
+        if values[-1] < min_views:
+            continue
+        first = _first_view(values[:-1])
+        if first is not None and first < offset:
+            found.append(check(label, object_id, values, first))
+        else:
+            new.append((label, object_id, values, len(values) - 1 if first is None else first))
+        if len(new) >= batch_size:
+            found.extend(check_new(new))
+            new = []
+        if len(found) >= batch_size:
+            created += _save([anomaly for anomaly in found if anomaly])
+            found = []
+    found.extend(check_new(new))
+    return created + _save([anomaly for anomaly in found if anomaly])
+
+
+def _save(anomalies):
+    if not anomalies:
+        return 0
+    # Повторный запуск за тот же день не создает дублей и не сбрасывает решение модератора
+    before = ViewAnomaly.objects.filter(day=anomalies[0].day).count()
+    ViewAnomaly.objects.bulk_create(anomalies, ignore_conflicts=True)
+    return ViewAnomaly.objects.filter(day=anomalies[0].day).count() - before
@@ -0,0 +1,193 @@
+# main/view_counts.py
+"""
+Отложенная запись счетчиков просмотров (write-behind).
+
+Детальные страницы задач, услуг, вакансий и статей не пишут в базу:
+record_view() увеличивает счетчик объекта в общем кеше (атомарный incr),
+а команда flush_view_counts переносит накопленное в базу пачками
+UPDATE ... SET views = views + n, сгруппированными по n.
+
+Ключи счетчиков содержат номер эпохи. Первый просмотр объекта в эпохе
+записывается в журнал эпохи, чтобы обработчик знал, какие ключи читать.
+flush_views() увеличивает номер эпохи, ждет VIEW_COUNTS_GRACE секунд
+(запоздавшие приращения старой эпохи успевают записаться), переносит
+старую эпоху в базу и удаляет ее ключи. Приращения не теряются и не
+считаются дважды при любом числе процессов, если кеш общий (Redis,
+Memcached); с локальным кешем (LocMemCache) обработчик видит только свой
+процесс.
+
+Счетчики в кеше ведутся по дням: обработчик заодно пополняет просмотры
+по дням (main/view_series.py). Через тот же буфер идут уникальные
+посетители (main/visitors.py): новая в эпохе пара (регистр, ранг)
+посетителя для объекта и дня попадает в журнал, и обработчик поднимает
+регистры дневных скетчей.
+
+Запуск обработчика (постоянно или раз в минуту из cron):
+
+    python manage.py flush_view_counts --interval 60
+    python manage.py flush_view_counts
+
+Настройки:
+
+    VIEW_COUNTS_GRACE = 2             # ожидание перед переносом эпохи, секунды
+    VIEW_COUNTS_TIMEOUT = 24 * 3600   # время жизни непереданных счетчиков, секунды
+"""
+import datetime
+import logging
+import time
+from collections import defaultdict
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+from .view_filter import should_count
+from .view_series import add_daily_views
+from .visitors import apply_day_registers, day_period, visitor_register
+
+logger = logging.getLogger(__name__)
+
+EPOCH_KEY = 'views:epoch'
+
+# Сколько слагов в одном UPDATE ... WHERE slug IN (...)
+BATCH_SIZE = 500
+
+
+def _timeout():
+    return getattr(settings, 'VIEW_COUNTS_TIMEOUT', 24 * 60 * 60)
+
+
+def _incr(key, delta=1):
+    """Атомарное увеличение с созданием ключа"""
+    cache.add(key, 0, _timeout())
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        # Ключ вытеснен между add и incr
+        cache.add(key, 0, _timeout())
+        return cache.incr(key, delta)
+
+
+def _current_epoch():
+    epoch = cache.get(EPOCH_KEY)
+    if epoch is None:
+        cache.add(EPOCH_KEY, 1, None)
+        epoch = cache.get(EPOCH_KEY)
+    return epoch
+
+
+def _journal(epoch, entry):
+    index = _incr(f'views:{epoch}:size')
+    cache.set(f'views:{epoch}:journal:{index}', entry, _timeout())
+
+
+def _visitor_key(epoch, label, slug, day, register, rank):
+    return f'views:{epoch}:visitor:{label}:{slug}:{day}:{register}:{rank}'
+
+
+def _add_views(label, slug, day, count):
+    epoch = _current_epoch()
+    key = f'views:{epoch}:{label}:{slug}:{day}'
+    if cache.add(key, count, _timeout()):
+        # Первый просмотр объекта за день в эпохе - в журнал для обработчика
+        _journal(epoch, ('views', label, slug, day))
+    else:
+        _incr(key, count)
+
+
+def _add_visitor(label, slug, day, register, rank):
+    epoch = _current_epoch()
+    # Пара уже в журнале эпохи - повторный визит ничего не меняет
+    if cache.add(_visitor_key(epoch, label, slug, day, register, rank), 1, _timeout()):
+        _journal(epoch, ('visitor', label, slug, day, register, rank))
+
+
+def record_view(model, slug, request=None, author_id=None):
+    """
+    Учитывает просмотр объекта модели со слагом slug (без запросов к базе).
+    С request просмотр проходит фильтр роботов, автора author_id и повторов
+    (main/view_filter.py) и считается в уникальных посетителях.
+    """
+    label = model._meta.label_lower
+    if request is not None and not should_count(label, slug, request, author_id):
+        return
+    day = day_period()
+    _add_views(label, slug, day, 1)
+    if request is not None:
+        _add_visitor(label, slug, day, *visitor_register(request))
+
+
+def _object_ids(objects):
+    """{(модель, слаг): id} для пар (модель, слаг)"""
+    slugs = defaultdict(list)
+    for label, slug in objects:
+        slugs[label].append(slug)
+    ids = {}
+    for label, chunk in slugs.items():
+        manager = apps.get_model(label)._default_manager
+        for start in range(0, len(chunk), BATCH_SIZE):
+            for slug, pk in manager.filter(slug__in=chunk[start:start + BATCH_SIZE]).values_list('slug', 'pk'):
+                ids[label, slug] = pk
+    return ids
+
+
+def flush_views(grace=None):
+    """Переносит накопленные просмотры в базу; возвращает их число"""
+    if grace is None:
+        grace = getattr(settings, 'VIEW_COUNTS_GRACE', 2)
+    _current_epoch()
+    epoch = cache.incr(EPOCH_KEY) - 1
+    if grace:
+        time.sleep(grace)
+
+    size = cache.get(f'views:{epoch}:size') or 0
+    journal_keys = [f'views:{epoch}:journal:{index}' for index in range(1, size + 1)]
+    entries = list(cache.get_many(journal_keys).values())
+    counter_keys = {
+        f'views:{epoch}:{label}:{slug}:{day}': (label, slug, day)
+        for kind, label, slug, day, *_ in entries if kind == 'views'
+    }
+    visitors = [tuple(entry[1:]) for entry in entries if entry[0] == 'visitor']
+    counts = {counter_keys[key]: count for key, count in cache.get_many(list(counter_keys)).items() if count}
+    cache.delete_many([
+        f'views:{epoch}:size', *journal_keys, *counter_keys,
+        *(_visitor_key(epoch, *visitor) for visitor in visitors),
+    ])
+    if not counts and not visitors:
+        return 0
+
+    totals = defaultdict(int)
+    for (label, slug, _), count in counts.items():
+        totals[label, slug] += count
+    groups = defaultdict(lambda: defaultdict(list))
+    for (label, slug), count in totals.items():
+        groups[label][count].append(slug)
+    try:
+        with transaction.atomic():
+            for label, by_count in groups.items():
+                manager = apps.get_model(label)._default_manager
+                for count, slugs in by_count.items():
+                    for start in range(0, len(slugs), BATCH_SIZE):
+                        manager.filter(slug__in=slugs[start:start + BATCH_SIZE]).update(views=F('views') + count)
+            ids = _object_ids({(label, slug) for label, slug, *_ in (*counts, *visitors)})
+            add_daily_views({
+                (label, ids[label, slug], datetime.date.fromisoformat(day)): count
+                for (label, slug, day), count in counts.items() if (label, slug) in ids
+            })
+            registers = defaultdict(dict)
+            for label, slug, day, register, rank in visitors:
+                if (label, slug) in ids:
+                    day_registers = registers[label, ids[label, slug], day]
+                    day_registers[register] = max(rank, day_registers.get(register, 0))
+            apply_day_registers(registers)
+    except Exception:
+        # Не записалось - возвращаем просмотры в текущую эпоху до следующего запуска
+        logger.exception('Не удалось записать просмотры, возвращаем в буфер')
+        for (label, slug, day), count in counts.items():
+            _add_views(label, slug, day, count)
+        for visitor in visitors:
+            _add_visitor(*visitor)
+        raise
+    return sum(counts.values())
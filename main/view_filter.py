@@ -0,0 +1,84 @@
+# main/view_filter.py
+"""
+Фильтр просмотров перед счетчиками (main/view_counts.py).
+
+Не считаются:
+- поисковые и прочие роботы: User-Agent сверяется с одним заранее
+  скомпилированным регулярным выражением из известных подстрок;
+- просмотры автором своего объявления;
+- частые просмотры одного объекта с одного IP: скользящее окно
+  VIEW_RATE_WINDOW секунд, не больше VIEW_RATE_LIMIT просмотров.
+  Окно приближается двумя счетчиками в кеше - текущего и прошлого
+  интервала, прошлый учитывается с весом непрошедшей части окна.
+
+Всплески, которые прошли фильтр, ищет команда detect_view_anomalies
+(main/view_anomalies.py).
+
+Настройки:
+
+    VIEW_FILTER_BOT_PATTERNS = ()   # дополнительные регулярные выражения User-Agent роботов
+    VIEW_RATE_LIMIT = 3             # просмотров объекта с одного IP за окно
+    VIEW_RATE_WINDOW = 600          # длина окна, секунды
+"""
+import re
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .visitors import client_ip
+
+# Подстроки User-Agent роботов, без учета регистра
+BOT_PATTERNS = (
+    # Телефоны Cubot - не роботы
+    r'(?<!cu)bot', r'crawl', r'spider', r'slurp', r'scrape', r'archiver', r'fetcher',
+    r'yandex(?!browser)', r'mediapartners', r'facebookexternalhit', r'embedly', r'preview',
+    r'headless', r'phantomjs', r'selenium', r'lighthouse', r'pingdom', r'uptime', r'monitor',
+    r'python-requests', r'python-urllib', r'aiohttp', r'httpx', r'go-http-client', r'okhttp',
+    r'java/', r'libwww', r'curl/', r'wget/', r'httpie', r'axios', r'node-fetch', r'scrapy',
+)
+
+
+@lru_cache(maxsize=1)
+def bot_matcher():
+    patterns = BOT_PATTERNS + tuple(getattr(settings, 'VIEW_FILTER_BOT_PATTERNS', ()))
+    return re.compile('|'.join(f'(?:{pattern})' for pattern in patterns), re.IGNORECASE)
+
+
+def is_crawler(user_agent):
+    # Браузеры всегда передают User-Agent
+    return not user_agent or bot_matcher().search(user_agent) is not None
+
+
+def _count_in_window(key, window):
+    """Увеличивает счетчик интервала и возвращает оценку числа событий за скользящее окно"""
+    now = time.time()
+    interval = int(now // window)
+    current_key = f'{key}:{interval}'
+    cache.add(current_key, 0, window * 2)
+    try:
+        current = cache.incr(current_key)
+    except ValueError:
+        # Ключ вытеснен между add и incr
+        cache.add(current_key, 1, window * 2)
+        current = 1
+    previous = cache.get(f'{key}:{interval - 1}') or 0
+    return current + previous * (1 - (now % window) / window)
+
+
+def is_repeated(label, slug, request):
+    """Просмотр объекта с IP сверх VIEW_RATE_LIMIT за окно"""
+    limit = getattr(settings, 'VIEW_RATE_LIMIT', 3)
+    window = getattr(settings, 'VIEW_RATE_WINDOW', 600)
+    return _count_in_window(f'views:rate:{label}:{slug}:{client_ip(request)}', window) > limit
+
+
+def should_count(label, slug, request, author_id=None):
+    """Учитывать ли просмотр объекта в счетчиках"""
+    if is_crawler(request.META.get('HTTP_USER_AGENT', '')):
+        return False
+    user = getattr(request, 'user', None)
+    if author_id is not None and user is not None and user.is_authenticated and user.pk == author_id:
+        return False
+    return not is_repeated(label, slug, request)
@@ -0,0 +1,113 @@
+# main/view_series.py
+"""
+Просмотры задач, услуг, вакансий и статей по дням.
+
+Строка ViewSeries - один объект за один месяц: 31 счетчик uint32
+little-endian, упакованный в 124 байта. Год истории объекта - 12 строк,
+90 дней для графика - не больше 4 строк на объект, и все строки автора
+читаются одним запросом на модель.
+
+Счетчики пополняет обработчик буфера просмотров (main/view_counts.py)
+в той же транзакции, что и поле views.
+
+Настройки:
+
+    VIEW_STATS_DAYS = 90   # за сколько дней показывать статистику автору
+"""
+import datetime
+import sys
+from array import array
+
+from django.conf import settings
+
+from .models import ViewSeries
+
+DAYS_IN_ROW = 31
+
+
+def stats_days():
+    return getattr(settings, 'VIEW_STATS_DAYS', 90)
+
+
+def pack(counts):
+    days = array('I', counts)
+    if sys.byteorder != 'little':
+        days.byteswap()
+    return days.tobytes()
+
+
+def unpack(data):
+    days = array('I')
+    if data:
+        days.frombytes(bytes(data))
+        if sys.byteorder != 'little':
+            days.byteswap()
+    if len(days) < DAYS_IN_ROW:
+        days.extend([0] * (DAYS_IN_ROW - len(days)))
+    return days
+
+
+def add_daily_views(counts):
+    """
+    Прибавляет просмотры к дневным счетчикам.
+    counts - {(модель, id объекта, дата): число}; вызывается внутри транзакции.
+    """
+    by_row = {}
+    for (label, object_id, day), count in counts.items():
+        by_row.setdefault((label, object_id, day.replace(day=1)), []).append((day.day, count))
+
+    for label in {label for label, _, _ in by_row}:
+        rows = {key: days for key, days in by_row.items() if key[0] == label}
+        existing = {
+            (label, series.object_id, series.month): series
+            for series in ViewSeries.objects.select_for_update().filter(
+                model=label,
+                object_id__in={object_id for _, object_id, _ in rows},
+                month__in={month for _, _, month in rows},
+            )
+        }
+        changed, created = [], []
+        for key, days in rows.items():
+            series = existing.get(key)
+            if series is None:
+                series = ViewSeries(model=label, object_id=key[1], month=key[2])
+                created.append(series)
+            else:
+                changed.append(series)
+            values = unpack(series.days)
+            for day, count in days:
+                values[day - 1] += count
+            series.days = pack(values)
+        ViewSeries.objects.bulk_update(changed, ['days'])
+        ViewSeries.objects.bulk_create(created)
+
+
+def daily_views(queryset, start, end):
+    """
+    Просмотры объектов queryset по дням с start по end включительно:
+    {id объекта: [число за каждый день]}. Один запрос.
+    """
+    length = (end - start).days + 1
+    result = {}
+    rows = ViewSeries.objects.filter(
+        model=queryset.model._meta.label_lower,
+        object_id__in=queryset.values('pk'),
+        month__gte=start.replace(day=1),
+        month__lte=end,
+    ).values_list('object_id', 'month', 'days')
+    for object_id, month, data in rows:
+        place(result.setdefault(object_id, [0] * length), start, month, data)
+    return result
+
+
+def place(values, start, month, data):
+    """Добавляет счетчики строки месяца month в values - просмотры по дням начиная с start"""
+    offset = (month - start).days
+    for index, count in enumerate(unpack(data)):
+        position = offset + index
+        if count and 0 <= position < len(values):
+            values[position] += count
+
+
+def date_range(start, end):
+    return [start + datetime.timedelta(days=index) for index in range((end - start).days + 1)]
@@ -1,36 +1,57 @@
+from django.conf import settings
+from django.http import JsonResponse
 from django.shortcuts import render
-from categories.models import CategorySection, Category
-from services.models import Service
+from django.utils.cache import patch_cache_control
+from django.utils.functional import SimpleLazyObject
+from django.views.decorators.http import require_GET
+from categories.catalog import get_catalog
+from services.models import PUBLIC_SERVICES, Service
+
+from . import autocomplete as autocomplete_index
+from .cache import CATALOG, SERVICES_LISTING
+from .page_cache import cache_anonymous_page
 
 # Create your views here.
+def _sections_with_categories():
+    # Активные разделы с активными категориями из каталога в памяти;
+    # показываем только разделы, в которых есть категории
+    return [
+        {'section': section, 'categories': section.categories}
+        for section in get_catalog().sections_with_categories()
+    ]
+
+
+@cache_anonymous_page(SERVICES_LISTING, CATALOG)
 def home(request):
-    # Получаем все активные разделы категорий с их активными категориями
-    sections = CategorySection.objects.filter(
-        is_active=True
-    ).prefetch_related(
-        'categories'
-    ).order_by('name')
-    
-    # Для каждого раздела получаем его активные категории
-    sections_with_categories = []
-    for section in sections:
-        categories = section.categories.filter(is_active=True).order_by('name')
-        if categories.exists():  # Показываем только разделы с категориями
-            sections_with_categories.append({
-                'section': section,
-                'categories': categories
-            })
+    # Данные вычисляются лениво: при попадании в кеш фрагмента шаблона запросов нет
+    sections_with_categories = SimpleLazyObject(_sections_with_categories)
     
     # Получаем последние услуги (только проверенные модератором и активные)
     latest_services = Service.objects.select_related(
         'category', 'city', 'author', 'category__section'
-    ).filter(
-        is_active=True,
-        is_moderated=True
-    ).order_by('-created_at')[:6]
+    ).filter(PUBLIC_SERVICES).order_by('-created_at', '-id')[:6]
     
     context = {
         'sections_with_categories': sections_with_categories,
         'latest_services': latest_services
     }
-    return render(request, 'main/home.html', context)
\ No newline at end of file
+    return render(request, 'main/home.html', context)
+
+@require_GET
+def autocomplete(request):
+    """
+    AJAX endpoint подсказок для фильтров и поиска (main/autocomplete.py).
+    ?q=начало строки&kinds=category,city,specialty,term&limit=10
+    """
+    kinds = [kind for kind in request.GET.get('kinds', '').split(',') if kind in autocomplete_index.KINDS]
+    try:
+        limit = int(request.GET.get('limit', 10))
+    except ValueError:
+        limit = 10
+    suggestions = autocomplete_index.suggest(
+        request.GET.get('q', ''), kinds or autocomplete_index.KINDS, limit
+    )
+    response = JsonResponse({'suggestions': [suggestion.as_json() for suggestion in suggestions]})
+    # Подсказки одинаковы для всех пользователей и меняются медленно
+    patch_cache_control(response, public=True, max_age=getattr(settings, 'AUTOCOMPLETE_MAX_AGE', 60))
+    return response
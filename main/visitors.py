@@ -0,0 +1,178 @@
+# main/visitors.py
+"""
+Уникальные посетители страниц задач, услуг, вакансий и статей.
+
+Посетитель - отпечаток (пользователь или IP + User-Agent + язык,
+подписанные SECRET_KEY; сами данные не хранятся), из которого получается
+пара (регистр, ранг) скетча HyperLogLog (main/hyperloglog.py). Просмотр
+с новой для объекта и дня парой попадает в буфер просмотров
+(main/view_counts.py), и обработчик flush_view_counts поднимает регистры
+дневного скетча (VisitorSketch) без потерь при любом числе процессов.
+
+Команда merge_visitor_sketches объединяет изменившиеся дневные скетчи
+в недельные (неделя ISO) и общие, пересчитывает оценки и удаляет дневные
+скетчи старше VISITOR_SKETCH_DAYS дней. Страницы показывают оценки
+недельного и общего скетчей рядом со счетчиком просмотров.
+
+Настройки:
+
+    VISITOR_SKETCH_DAYS = 35                 # сколько дней хранить дневные скетчи
+    VISITORS_TRUST_FORWARDED_FOR = False     # брать IP из X-Forwarded-For (за прокси)
+"""
+import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.crypto import salted_hmac
+
+from .hyperloglog import HyperLogLog, register_rank
+from .models import VisitorSketch
+
+
+def client_ip(request):
+    if getattr(settings, 'VISITORS_TRUST_FORWARDED_FOR', False):
+        forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '')
+        if forwarded:
+            return forwarded.split(',')[0].strip()
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def visitor_fingerprint(request):
+    """64-битный отпечаток посетителя"""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        value = f'user:{user.pk}'
+    else:
+        value = '|'.join((
+            client_ip(request),
+            request.META.get('HTTP_USER_AGENT', ''),
+            request.META.get('HTTP_ACCEPT_LANGUAGE', ''),
+        ))
+    return int.from_bytes(salted_hmac('main.visitors', value).digest()[:8], 'big')
+
+
+def visitor_register(request):
+    """(регистр, ранг) посетителя в скетче"""
+    return register_rank(visitor_fingerprint(request))
+
+
+def day_period(day=None):
+    return (day or timezone.localdate()).isoformat()
+
+
+def week_period(day):
+    year, week, _ = day.isocalendar()
+    return f'{year}-W{week:02d}'
+
+
+def apply_day_registers(updates):
+    """
+    Поднимает регистры дневных скетчей.
+    updates - {(модель, id объекта, день): {регистр: ранг}}; вызывается внутри транзакции.
+    """
+    for label in {label for label, _, _ in updates}:
+        wanted = {
+            (object_id, day): registers
+            for (row_label, object_id, day), registers in updates.items()
+            if row_label == label
+        }
+        existing = {
+            (sketch.object_id, sketch.period): sketch
+            for sketch in VisitorSketch.objects.select_for_update().filter(
+                model=label,
+                kind=VisitorSketch.Kind.DAY,
+                object_id__in={object_id for object_id, _ in wanted},
+                period__in={day for _, day in wanted},
+            )
+        }
+        changed, created = [], []
+        for (object_id, day), registers in wanted.items():
+            sketch = existing.get((object_id, day))
+            if sketch is None:
+                sketch = VisitorSketch(model=label, object_id=object_id, kind=VisitorSketch.Kind.DAY, period=day)
+                created.append(sketch)
+            else:
+                changed.append(sketch)
+            hll = HyperLogLog(sketch.registers)
+            for register, rank in registers.items():
+                hll.update(register, rank)
+            sketch.registers = hll.to_bytes()
+            sketch.estimate = hll.count()
+            sketch.dirty = True
+            sketch.updated_at = timezone.now()
+        VisitorSketch.objects.bulk_update(changed, ['registers', 'estimate', 'dirty', 'updated_at'])
+        VisitorSketch.objects.bulk_create(created)
+
+
+def merge_sketches(batch_size=500):
+    """Добавляет изменившиеся дневные скетчи в недельные и общие; возвращает число дневных"""
+    merged = 0
+    while True:
+        with transaction.atomic():
+            days = list(
+                VisitorSketch.objects.select_for_update()
+                .filter(kind=VisitorSketch.Kind.DAY, dirty=True)
+                .order_by('pk')[:batch_size]
+            )
+            if not days:
+                break
+            targets = {}
+            for day in days:
+                week = week_period(datetime.date.fromisoformat(day.period))
+                targets.setdefault((day.model, day.object_id, VisitorSketch.Kind.WEEK, week), []).append(day)
+                targets.setdefault((day.model, day.object_id, VisitorSketch.Kind.TOTAL, ''), []).append(day)
+
+            lookup = Q()
+            for model, object_id, kind, period in targets:
+                lookup |= Q(model=model, object_id=object_id, kind=kind, period=period)
+            existing = {
+                (sketch.model, sketch.object_id, sketch.kind, sketch.period): sketch
+                for sketch in VisitorSketch.objects.select_for_update().filter(lookup)
+            }
+            changed, created = [], []
+            for key, sources in targets.items():
+                sketch = existing.get(key)
+                if sketch is None:
+                    model, object_id, kind, period = key
+                    sketch = VisitorSketch(model=model, object_id=object_id, kind=kind, period=period)
+                    created.append(sketch)
+                else:
+                    changed.append(sketch)
+                hll = HyperLogLog(sketch.registers)
+                for source in sources:
+                    hll.merge(HyperLogLog(source.registers))
+                sketch.registers = hll.to_bytes()
+                sketch.estimate = hll.count()
+                sketch.updated_at = timezone.now()
+            VisitorSketch.objects.bulk_update(changed, ['registers', 'estimate', 'updated_at'])
+            VisitorSketch.objects.bulk_create(created)
+            VisitorSketch.objects.filter(pk__in=[day.pk for day in days]).update(dirty=False)
+            merged += len(days)
+    return merged
+
+
+def delete_old_days():
+    """Удаляет объединенные дневные скетчи старше VISITOR_SKETCH_DAYS дней"""
+    keep = getattr(settings, 'VISITOR_SKETCH_DAYS', 35)
+    oldest = day_period(timezone.localdate() - datetime.timedelta(days=keep))
+    deleted, _ = VisitorSketch.objects.filter(
+        kind=VisitorSketch.Kind.DAY, dirty=False, period__lt=oldest,
+    ).delete()
+    return deleted
+
+
+def visitor_stats(obj):
+    """Оценки уникальных посетителей объекта: {'week': ..., 'total': ...}"""
+    rows = VisitorSketch.objects.filter(
+        model=obj._meta.label_lower,
+        object_id=obj.pk,
+    ).filter(
+        Q(kind=VisitorSketch.Kind.WEEK, period=week_period(timezone.localdate()))
+        | Q(kind=VisitorSketch.Kind.TOTAL, period='')
+    ).values_list('kind', 'estimate')
+    stats = {'week': 0, 'total': 0}
+    for kind, estimate in rows:
+        stats[kind] = estimate
+    return stats
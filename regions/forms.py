@@ -0,0 +1,18 @@
+from django import forms
+
+from .gazetteer import get_gazetteer
+
+
+class RegionChoiceField(forms.ChoiceField):
+    """Выбор активного региона из справочника в памяти; в cleaned_data - узел региона"""
+
+    def __init__(self, *, empty_label='---------', **kwargs):
+        self.gazetteer = get_gazetteer()
+        choices = [('', empty_label)] + [(region.id, region.name) for region in self.gazetteer.regions]
+        super().__init__(choices=choices, **kwargs)
+
+    def clean(self, value):
+        value = super().clean(value)
+        if value in self.empty_values:
+            return None
+        return self.gazetteer.region(value)
@@ -0,0 +1,165 @@
+# regions/gazetteer.py
+"""
+Справочник активных регионов и городов в памяти процесса.
+
+Устроен как каталог категорий (categories/catalog.py): дерево
+Region → City читается двумя запросами, хранится в процессе как
+неизменяемые узлы с индексами по id и сверяется с версией группы
+REGIONS (main/cache.py) не чаще раза в GAZETTEER_CHECK_INTERVAL секунд.
+Сигналы регионов и городов (main/signals.py) после фиксации транзакции
+увеличивают версию.
+
+Кроме номера версии у справочника есть хеш содержимого (etag): он
+одинаков во всех процессах и служит ETag ответов AJAX (regions/views.py).
+
+Настройки:
+
+    GAZETTEER_CHECK_INTERVAL = 5  # как часто сверять версию, секунды
+"""
+import hashlib
+import json
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+
+from main.cache import REGIONS, bump_version, get_version
+
+from .models import City, Region
+
+
+class CityNode:
+    """Активный город"""
+    __slots__ = ('id', 'name', 'slug', 'region_id', 'region')
+
+    def __init__(self, city, region):
+        self.id = city.id
+        self.name = city.name
+        self.slug = city.slug
+        self.region_id = city.region_id
+        self.region = region
+
+    @property
+    def pk(self):
+        return self.id
+
+    def __repr__(self):
+        return f'<CityNode: {self.name}>'
+
+    def __str__(self):
+        return f'{self.name} ({self.region.name})'
+
+    def get_full_name(self):
+        return f'{self.name}, {self.region.name}'
+
+
+class RegionNode:
+    """Активный регион с активными городами, отсортированными по названию"""
+    __slots__ = ('id', 'name', 'slug', 'cities')
+
+    def __init__(self, region):
+        self.id = region.id
+        self.name = region.name
+        self.slug = region.slug
+        self.cities = ()
+
+    @property
+    def pk(self):
+        return self.id
+
+    def __repr__(self):
+        return f'<RegionNode: {self.name}>'
+
+    def __str__(self):
+        return self.name
+
+
+class Gazetteer:
+    """Дерево активных регионов и городов с индексами по id и хешем содержимого"""
+    __slots__ = ('version', 'etag', 'regions', 'regions_by_id', 'cities_by_id')
+
+    def __init__(self, version, regions):
+        self.version = version
+        self.regions = tuple(regions)
+        self.regions_by_id = {region.id: region for region in self.regions}
+        self.cities_by_id = {city.id: city for region in self.regions for city in region.cities}
+        self.etag = hashlib.md5(
+            json.dumps(self.as_json(), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        ).hexdigest()
+
+    def region(self, pk):
+        """Регион по id (число или строка из запроса) или None"""
+        try:
+            return self.regions_by_id.get(int(pk))
+        except (TypeError, ValueError):
+            return None
+
+    def city(self, pk):
+        """Город по id (число или строка из запроса) или None"""
+        try:
+            return self.cities_by_id.get(int(pk))
+        except (TypeError, ValueError):
+            return None
+
+    def region_cities(self, pk):
+        """Города региона для выпадающего списка: [{'id': ..., 'name': ...}]"""
+        region = self.region(pk)
+        if region is None:
+            return []
+        return [{'id': city.id, 'name': city.name} for city in region.cities]
+
+    def as_json(self):
+        """Все дерево одним объектом для форм"""
+        return [
+            {'id': region.id, 'name': region.name, 'cities': self.region_cities(region.id)}
+            for region in self.regions
+        ]
+
+
+def build_gazetteer(version=None):
+    """Читает дерево из базы (два запроса)"""
+    regions = [RegionNode(region) for region in Region.objects.filter(is_active=True).order_by('name')]
+    by_id = {region.id: region for region in regions}
+    children = {region.id: [] for region in regions}
+    cities = City.objects.filter(is_active=True, region_id__in=list(by_id)).order_by('name')
+    for city in cities:
+        children[city.region_id].append(CityNode(city, by_id[city.region_id]))
+    for region in regions:
+        region.cities = tuple(children[region.id])
+    return Gazetteer(version, regions)
+
+
+_gazetteer = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def get_gazetteer():
+    """Справочник текущего процесса; перечитывается после изменения регионов или городов"""
+    global _gazetteer, _checked_at
+    now = time.monotonic()
+    interval = getattr(settings, 'GAZETTEER_CHECK_INTERVAL', 5)
+    gazetteer = _gazetteer
+    if gazetteer is not None and now - _checked_at < interval:
+        return gazetteer
+
+    version = get_version(REGIONS)
+    if gazetteer is None or gazetteer.version != version:
+        with _lock:
+            if _gazetteer is None or _gazetteer.version != version:
+                _gazetteer = build_gazetteer(version)
+            gazetteer = _gazetteer
+    _checked_at = now
+    return gazetteer
+
+
+def _reset():
+    global _gazetteer
+    bump_version(REGIONS)
+    _gazetteer = None
+
+
+def invalidate_gazetteer():
+    """Сбрасывает справочник во всех процессах после фиксации транзакции"""
+    transaction.on_commit(_reset)
@@ -1,3 +1,10 @@
-from django.urls import URLPattern
+from django.urls import path
 
-urlpatterns: list[URLPattern] = []
+from . import views
+
+app_name = "regions"
+
+urlpatterns = [
+    path("ajax/cities/", views.cities_by_region, name="cities_by_region"),
+    path("ajax/regions/", views.gazetteer_bundle, name="gazetteer_bundle"),
+]
@@ -1,3 +1,33 @@
-from django.shortcuts import render
+from django.conf import settings
+from django.http import JsonResponse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition, require_GET
 
-# Create your views here.
+from .gazetteer import get_gazetteer
+
+
+def _etag(request, *args, **kwargs):
+    # Ответ зависит только от содержимого справочника и запрошенного региона
+    return f"{get_gazetteer().etag}-{request.GET.get('region_id', '')}"
+
+
+def _cacheable(response):
+    """Списки меняются редко: браузеры и прокси кешируют их и перепроверяют по ETag"""
+    patch_cache_control(response, public=True, max_age=getattr(settings, 'GAZETTEER_MAX_AGE', 60 * 60))
+    return response
+
+
+@require_GET
+@condition(etag_func=_etag)
+def cities_by_region(request):
+    """AJAX endpoint для получения городов по региону"""
+    cities = get_gazetteer().region_cities(request.GET.get('region_id'))
+    return _cacheable(JsonResponse({'cities': cities}))
+
+
+@require_GET
+@condition(etag_func=_etag)
+def gazetteer_bundle(request):
+    """Все активные регионы с городами одним ответом (для форм без запросов на каждый регион)"""
+    gazetteer = get_gazetteer()
+    return _cacheable(JsonResponse({'version': gazetteer.etag, 'regions': gazetteer.as_json()}))
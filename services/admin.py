@@ -1,6 +1,9 @@
 from django.contrib import admin
 from django.utils.html import format_html
 from slugify import slugify
+from main.cache import SERVICES_LISTING
+from main.page_cache import purge_surrogate_keys, surrogate_key
+from main.search import index_objects
 from .models import Service, ServiceMessage
 
 
@@ -8,6 +11,9 @@ from .models import Service, ServiceMessage
 def approve_services(modeladmin, request, queryset):
     """Одобрить услуги для публикации"""
     updated = queryset.update(is_moderated=True)
+    # update() не вызывает сигналы - сбрасываем кеши и обновляем поисковый индекс вручную
+    purge_surrogate_keys(SERVICES_LISTING, *(surrogate_key(obj) for obj in queryset.only('pk')))
+    index_objects(Service, queryset.values_list('pk', flat=True))
     modeladmin.message_user(request, f"Одобрено услуг: {updated}")
 
 
@@ -15,6 +21,9 @@ def approve_services(modeladmin, request, queryset):
 def send_to_moderation(modeladmin, request, queryset):
     """Отправить услуги на модерацию"""
     updated = queryset.update(is_moderated=False)
+    # update() не вызывает сигналы - сбрасываем кеши и обновляем поисковый индекс вручную
+    purge_surrogate_keys(SERVICES_LISTING, *(surrogate_key(obj) for obj in queryset.only('pk')))
+    index_objects(Service, queryset.values_list('pk', flat=True))
     modeladmin.message_user(request, f"Отправлено на модерацию услуг: {updated}")
 
 
@@ -2,8 +2,12 @@ from django import forms
 from django.forms import ModelChoiceField
 from slugify import slugify
 from .models import Service, ServiceMessage
-from categories.models import Category, CategorySection
-from regions.models import City, Region
+from categories.catalog import get_catalog
+from categories.forms import SectionChoiceField
+from categories.models import Category
+from regions.forms import RegionChoiceField
+from regions.gazetteer import get_gazetteer
+from regions.models import City
 
 
 class ServiceForm(forms.ModelForm):
@@ -59,8 +63,7 @@ class ServiceForm(forms.ModelForm):
         super().__init__(*args, **kwargs)
         
         # Добавляем поле раздела перед полем категории
-        self.fields['section'] = forms.ModelChoiceField(
-            queryset=CategorySection.objects.filter(is_active=True).order_by('name'),
+        self.fields['section'] = SectionChoiceField(
             required=True,
             label='Раздел',
             help_text='Сначала выберите раздел, затем категорию',
@@ -83,7 +86,7 @@ class ServiceForm(forms.ModelForm):
             if self.instance and self.instance.pk and hasattr(self.instance, 'category'):
                 if self.instance.category:
                     category_field.queryset = Category.objects.filter(
-                        section=self.instance.category.section,
+                        section_id=self.instance.category.section_id,
                         is_active=True
                     ).select_related('section')
                 else:
@@ -95,13 +98,14 @@ class ServiceForm(forms.ModelForm):
                     section_id = args[0].get('section')
                 
                 if section_id:
-                    try:
-                        section_obj = CategorySection.objects.get(pk=section_id, is_active=True)
+                    # Раздел проверяется по каталогу в памяти, без запроса к базе
+                    section_obj = get_catalog().section(section_id)
+                    if section_obj:
                         category_field.queryset = Category.objects.filter(
-                            section=section_obj,
+                            section_id=section_obj.id,
                             is_active=True
                         ).select_related('section')
-                    except (CategorySection.DoesNotExist, ValueError):
+                    else:
                         category_field.queryset = Category.objects.none()
                 else:
                     category_field.queryset = Category.objects.none()
@@ -113,8 +117,7 @@ class ServiceForm(forms.ModelForm):
             category_field.empty_label = 'Сначала выберите раздел'
         
         # Добавляем поле региона перед полем города
-        self.fields['region'] = forms.ModelChoiceField(
-            queryset=Region.objects.filter(is_active=True).order_by('name'),
+        self.fields['region'] = RegionChoiceField(
             required=False,
             label='Регион',
             help_text='Сначала выберите регион, затем город',
@@ -137,7 +140,7 @@ class ServiceForm(forms.ModelForm):
             if self.instance and self.instance.pk and hasattr(self.instance, 'city'):
                 if self.instance.city:
                     city_field.queryset = City.objects.filter(
-                        region=self.instance.city.region,
+                        region_id=self.instance.city.region_id,
                         is_active=True
                     ).select_related('region')
                 else:
@@ -149,13 +152,14 @@ class ServiceForm(forms.ModelForm):
                     region_id = args[0].get('region')
                 
                 if region_id:
-                    try:
-                        region_obj = Region.objects.get(pk=region_id, is_active=True)
+                    # Регион проверяется по справочнику в памяти, без запроса к базе
+                    region_obj = get_gazetteer().region(region_id)
+                    if region_obj:
                         city_field.queryset = City.objects.filter(
-                            region=region_obj,
+                            region_id=region_obj.id,
                             is_active=True
                         ).select_related('region')
-                    except (Region.DoesNotExist, ValueError):
+                    else:
                         city_field.queryset = City.objects.none()
                 else:
                     city_field.queryset = City.objects.none()
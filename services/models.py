@@ -1,10 +1,14 @@
 from django.conf import settings
 from django.db import models
+from django.db.models import Q
 from django.urls import reverse
 
 from categories.models import Category
 from regions.models import City
 
+# Условие публичного списка услуг; по нему построены частичные индексы
+PUBLIC_SERVICES = Q(is_active=True, is_moderated=True)
+
 
 class Service(models.Model):
     class LocationType(models.TextChoices):
@@ -89,6 +93,19 @@ class Service(models.Model):
         verbose_name = "Услуга"
         verbose_name_plural = "Услуги"
         ordering = ("-created_at",)
+        indexes = [
+            # Публичный список: сортировка по (created_at, id) как у KeysetPaginator
+            models.Index(fields=["-created_at", "-id"], condition=PUBLIC_SERVICES, name="service_public_created_idx"),
+            models.Index(
+                fields=["category", "-created_at", "-id"], condition=PUBLIC_SERVICES, name="service_public_category_idx"
+            ),
+            models.Index(
+                fields=["city", "-created_at", "-id"], condition=PUBLIC_SERVICES, name="service_public_city_idx"
+            ),
+            models.Index(
+                fields=["author", "-created_at", "-id"], condition=PUBLIC_SERVICES, name="service_public_author_idx"
+            ),
+        ]
 
     def __str__(self) -> str:
         return self.title
@@ -6,7 +6,6 @@ from .views import (
     create_service,
     edit_service,
     get_categories_by_section,
-    get_cities_by_region,
     send_service_message,
     service_messages,
 )
@@ -21,5 +20,4 @@ urlpatterns = [
     path("<slug:slug>/messages/", service_messages, name="service_messages"),
     path("<slug:slug>/send-message/", send_service_message, name="send_service_message"),
     path("ajax/categories/", get_categories_by_section, name="get_categories_by_section"),
-    path("ajax/cities/", get_cities_by_region, name="get_cities_by_region"),
 ]
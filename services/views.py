@@ -4,51 +4,39 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.views.decorators.http import require_POST
 from django.db.models import Q, Max, Count
-from django.db import models
+from django.db import models, transaction
 from django.urls import reverse
-from django.core.paginator import Paginator
+from django.utils.functional import SimpleLazyObject
 
-from .models import Service, ServiceMessage
+from .models import PUBLIC_SERVICES, Service, ServiceMessage
 from .forms import ServiceForm, ServiceMessageForm
-from categories.models import CategorySection, Category
-from regions.models import City, Region
+from categories.catalog import get_catalog
+from regions.gazetteer import get_gazetteer
+from main.cache import CATALOG, SERVICES_LISTING
+from main.facets import build_sidebar, facet_table
+from main.inbox import mark_service_read
+from main.page_cache import add_surrogate_keys, cache_anonymous_page, skip_page_cache, surrogate_key
+from main.pagination import KeysetPaginator, RankedPaginator, cached_count
+from main.spelling import corrections_ready, search_with_correction
+from main.view_counts import record_view
+from main.visitors import visitor_stats
 
 
+def _sidebar(services, selected_author, search_query, selected_section, selected_category, selected_city):
+    """Разделы и города сайдбара со счетчиками услуг для текущего выбора"""
+    facets = facet_table(services, SERVICES_LISTING, selected_author.pk if selected_author else None, search_query)
+    sections, cities = build_sidebar(facets, selected_section, selected_category, selected_city)
+    return {"sections": sections, "cities": cities}
+
+
+@cache_anonymous_page(SERVICES_LISTING, CATALOG)
 def service_list(request):
     """Список услуг"""
     services = (
         Service.objects.select_related("category", "city", "author", "category__section")
-        .filter(
-            is_active=True,
-            is_moderated=True  # Показываем только проверенные модератором услуги
-        )
+        .filter(PUBLIC_SERVICES)  # Только активные проверенные модератором услуги
     )
     
-    # Фильтрация по разделу
-    section_slug = request.GET.get("section")
-    if section_slug:
-        services = services.filter(category__section__slug=section_slug)
-    
-    # Фильтрация по категории
-    category_slug = request.GET.get("category")
-    selected_category_obj = None
-    if category_slug:
-        try:
-            selected_category_obj = Category.objects.get(slug=category_slug, is_active=True)
-            services = services.filter(category__slug=category_slug)
-        except Category.DoesNotExist:
-            pass
-    
-    # Фильтрация по городу
-    city_id = request.GET.get("city")
-    selected_city = None
-    if city_id:
-        try:
-            selected_city = City.objects.get(pk=int(city_id), is_active=True)
-            services = services.filter(city=selected_city)
-        except (ValueError, City.DoesNotExist):
-            pass
-    
     # Фильтрация по автору
     author_username = request.GET.get("author")
     selected_author = None
@@ -60,38 +48,76 @@ def service_list(request):
         except CustomUser.DoesNotExist:
             pass
     
-    services = services.order_by("-created_at")
-    
-    # Пагинация
-    paginator = Paginator(services, 15)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    
-    # Получаем все активные разделы с категориями
-    sections = CategorySection.objects.filter(
-        is_active=True
-    ).prefetch_related(
-        'categories'
-    ).order_by('name')
+    # Полнотекстовый поиск (main/search.py): условие по индексу без ограничения числа
+    # найденных, порядок - по релевантности. Если ничего не нашлось - поиск по
+    # исправленному запросу (раскладка, опечатки)
+    search_query = request.GET.get("q", "").strip()
+    found = None
+    corrected_query = None
+    # Проверяется до поиска: словарь может достроиться, пока идет запрос
+    can_correct = corrections_ready()
+    if search_query:
+        found, corrected_query = search_with_correction(Service, search_query)
+        if not found.found and not can_correct:
+            # Словарь исправлений еще строится: «ничего не найдено» без исправления не кешируем
+            skip_page_cache(request)
+        services = found.filter(services)
+    
+    # Выборка без фильтров сайдбара - по ней считаются счетчики фасетов
+    facet_base = services
+    
+    # Разделы и категории ищутся в каталоге в памяти (categories/catalog.py)
+    catalog = get_catalog()
     
-    # Получаем активные категории для каждого раздела
-    for section in sections:
-        section.categories_list = section.categories.filter(is_active=True).order_by('name')  # type: ignore[attr-defined]
+    # Фильтрация по разделу
+    section_slug = request.GET.get("section")
+    if section_slug:
+        section = catalog.section_by_slug(section_slug)
+        if section:
+            services = services.filter(category__section_id=section.id)
+        else:
+            services = services.filter(category__section__slug=section_slug)
     
-    # Получаем все активные города
-    cities_with_services = City.objects.filter(
-        is_active=True,
-        services__is_active=True,
-        services__is_moderated=True
-    ).distinct()
+    # Фильтрация по категории
+    category_slug = request.GET.get("category")
+    selected_category_obj = None
+    if category_slug:
+        selected_category_obj = catalog.category_by_slug(category_slug)
+        if selected_category_obj:
+            services = services.filter(category_id=selected_category_obj.id)
     
-    if cities_with_services.exists():
-        cities = cities_with_services.select_related('region').order_by('name')
+    # Фильтрация по городу
+    city_id = request.GET.get("city")
+    selected_city = None
+    if city_id:
+        selected_city = get_gazetteer().city(city_id)
+        if selected_city:
+            services = services.filter(city_id=selected_city.id)
+    
+    # Пагинация по курсору (created_at, id). Список, разделы и города вычисляются
+    # лениво: при попадании в кеш фрагмента шаблона (см. main/templatetags/fragments.py)
+    # запросов к ним нет
+    if found is None:
+        paginator = KeysetPaginator(services, 15, ordering=("-created_at", "-pk"))
     else:
-        cities = City.objects.filter(is_active=True).select_related('region').order_by('name')
+        # Результаты поиска - по релевантности среди отфильтрованных
+        paginator = RankedPaginator(services, 15, lambda: found.ranked_ids(services))
+    cursor = request.GET.get('cursor')
+    page_number = request.GET.get('page')
+    page_obj = SimpleLazyObject(lambda: paginator.get_page(cursor, page_number))
+    # Итог по фильтрам (и всем найденным) из кеша счетчиков, без COUNT(*) на каждый запрос
+    results_count = SimpleLazyObject(lambda: cached_count(services, SERVICES_LISTING))
+    sidebar = SimpleLazyObject(lambda: _sidebar(
+        facet_base, selected_author, corrected_query or search_query, section_slug, selected_category_obj, selected_city
+    ))
+    sections = SimpleLazyObject(lambda: sidebar["sections"])
+    cities = SimpleLazyObject(lambda: sidebar["cities"])
     
     context = {
         "services": page_obj,
+        "results_count": results_count,
+        "search_query": search_query,
+        "corrected_query": corrected_query,
         "page_obj": page_obj,
         "sections": sections,
         "selected_section": section_slug,
@@ -147,6 +173,12 @@ def edit_service(request, slug: str):
     return render(request, "services/create_service.html", {"form": form, "service": service, "is_edit": True})
 
 
+def _count_service_view(request, slug):
+    """Учитывает просмотр страницы услуги, отданной из кеша"""
+    record_view(Service, slug, request)
+
+
+@cache_anonymous_page(on_hit=_count_service_view)
 def service_detail(request, slug: str):
     """Детальная страница услуги"""
     # Получаем услугу, проверяя права доступа
@@ -161,10 +193,13 @@ def service_detail(request, slug: str):
         if not request.user.is_authenticated or request.user != service.author:
             messages.error(request, "Эта услуга находится на модерации и пока недоступна для просмотра.")
             return redirect("services:service_list")
+    keys = [surrogate_key(service), surrogate_key(service.category)]
+    if service.city_id:
+        keys.append(surrogate_key(service.city))
+    add_surrogate_keys(request, *keys)
     
-    # Увеличиваем счетчик просмотров
-    service.views += 1
-    service.save(update_fields=['views'])
+    # Учитываем просмотр; в базу счетчик попадает пачкой (main/view_counts.py)
+    record_view(Service, service.slug, request, author_id=service.author_id)
     
     # Форма для отправки сообщения (только для авторизованных пользователей, которые не являются автором)
     message_form = None
@@ -209,6 +244,7 @@ def service_detail(request, slug: str):
         "message_form": message_form,
         "conversations": conversations,
         "user_messages": user_messages,
+        "visitors": visitor_stats(service),
     }
     return render(request, "services/service_detail.html", context)
 
@@ -220,39 +256,14 @@ def get_categories_by_section(request):
     if not section_id:
         return JsonResponse({'categories': []})
     
-    try:
-        section = CategorySection.objects.get(pk=section_id, is_active=True)
-        categories = Category.objects.filter(
-            section=section,
-            is_active=True
-        ).order_by('name').values('id', 'name')
-        
-        return JsonResponse({
-            'categories': list(categories)
-        })
-    except CategorySection.DoesNotExist:
+    # Категории берутся из каталога в памяти, без запросов к базе
+    section = get_catalog().section(section_id)
+    if section is None:
         return JsonResponse({'categories': []})
-
-
-def get_cities_by_region(request):
-    """AJAX endpoint для получения городов по региону"""
-    region_id = request.GET.get('region_id')
-    
-    if not region_id:
-        return JsonResponse({'cities': []})
-    
-    try:
-        region = Region.objects.get(pk=region_id, is_active=True)
-        cities = City.objects.filter(
-            region=region,
-            is_active=True
-        ).order_by('name').values('id', 'name')
-        
-        return JsonResponse({
-            'cities': list(cities)
-        })
-    except Region.DoesNotExist:
-        return JsonResponse({'cities': []})
+    
+    return JsonResponse({
+        'categories': [{'id': category.id, 'name': category.name} for category in section.categories]
+    })
 
 
 @login_required
@@ -275,7 +286,9 @@ def send_service_message(request, slug: str):
         message.service = service
         message.sender = request.user
         message.recipient = service.author
-        message.save()
+        # Счетчик заказчиков услуги увеличивается в той же транзакции (main/counters.py)
+        with transaction.atomic():
+            message.save()
         
         # Получаем полное имя отправителя
         sender_name = message.sender.get_full_name() or message.sender.username
@@ -371,6 +384,7 @@ def service_messages(request, slug: str):
         service=service,
         recipient=request.user
     ).exclude(sender=request.user).update(is_read=True)
+    mark_service_read(request.user, service)
     
     # Определяем собеседника
     if conversation_user:
@@ -421,7 +435,8 @@ def service_messages(request, slug: str):
                 else:
                     # Обычный пользователь - отправляем автору услуги
                     message.recipient = service.author
-            message.save()
+            with transaction.atomic():
+                message.save()
             messages.success(request, "Сообщение отправлено!")
             # Редиректим обратно в тот же диалог, если был указан конкретный пользователь
             if conversation_user:
@@ -2,6 +2,10 @@ from django.contrib import admin
 from django.utils.html import format_html
 from slugify import slugify
 
+from main.cache import TASKS_LISTING
+from main.page_cache import purge_surrogate_keys, surrogate_key
+from main.search import index_objects
+
 from .models import Task, TaskResponse, Message, Review
 
 
@@ -9,6 +13,9 @@ from .models import Task, TaskResponse, Message, Review
 def approve_tasks(modeladmin, request, queryset):
     """Одобрить задачи для публикации"""
     updated = queryset.update(is_moderated=True)
+    # update() не вызывает сигналы - сбрасываем кеши и обновляем поисковый индекс вручную
+    purge_surrogate_keys(TASKS_LISTING, *(surrogate_key(obj) for obj in queryset.only('pk')))
+    index_objects(Task, queryset.values_list('pk', flat=True))
     modeladmin.message_user(request, f"Одобрено задач: {updated}")
 
 
@@ -16,6 +23,9 @@ def approve_tasks(modeladmin, request, queryset):
 def send_to_moderation(modeladmin, request, queryset):
     """Отправить задачи на модерацию"""
     updated = queryset.update(is_moderated=False)
+    # update() не вызывает сигналы - сбрасываем кеши и обновляем поисковый индекс вручную
+    purge_surrogate_keys(TASKS_LISTING, *(surrogate_key(obj) for obj in queryset.only('pk')))
+    index_objects(Task, queryset.values_list('pk', flat=True))
     modeladmin.message_user(request, f"Отправлено на модерацию задач: {updated}")
 
 
@@ -2,8 +2,12 @@ from django import forms
 from django.forms import ModelChoiceField
 from slugify import slugify
 from .models import Task, TaskResponse, Message, Review
-from categories.models import Category, CategorySection
-from regions.models import City, Region
+from categories.catalog import get_catalog
+from categories.forms import SectionChoiceField
+from categories.models import Category
+from regions.forms import RegionChoiceField
+from regions.gazetteer import get_gazetteer
+from regions.models import City
 
 
 class TaskForm(forms.ModelForm):
@@ -59,8 +63,7 @@ class TaskForm(forms.ModelForm):
         super().__init__(*args, **kwargs)
         
         # Добавляем поле раздела перед полем категории
-        self.fields['section'] = forms.ModelChoiceField(
-            queryset=CategorySection.objects.filter(is_active=True).order_by('name'),
+        self.fields['section'] = SectionChoiceField(
             required=True,
             label='Раздел',
             help_text='Сначала выберите раздел, затем категорию',
@@ -83,7 +86,7 @@ class TaskForm(forms.ModelForm):
             if self.instance and self.instance.pk and hasattr(self.instance, 'category'):
                 if self.instance.category:
                     category_field.queryset = Category.objects.filter(
-                        section=self.instance.category.section,
+                        section_id=self.instance.category.section_id,
                         is_active=True
                     ).select_related('section')
                 else:
@@ -96,13 +99,14 @@ class TaskForm(forms.ModelForm):
                     section_id = args[0].get('section')
                 
                 if section_id:
-                    try:
-                        section_obj = CategorySection.objects.get(pk=section_id, is_active=True)
+                    # Раздел проверяется по каталогу в памяти, без запроса к базе
+                    section_obj = get_catalog().section(section_id)
+                    if section_obj:
                         category_field.queryset = Category.objects.filter(
-                            section=section_obj,
+                            section_id=section_obj.id,
                             is_active=True
                         ).select_related('section')
-                    except (CategorySection.DoesNotExist, ValueError):
+                    else:
                         category_field.queryset = Category.objects.none()
                 else:
                     # При создании новой задачи категории не показываем до выбора раздела
@@ -116,8 +120,7 @@ class TaskForm(forms.ModelForm):
         
         # Добавляем поле региона перед полем города (только если выбран тип работы "У себя" или "У заказчика")
         # Поле региона будет показываться только когда location_type = SELF или CUSTOMER
-        self.fields['region'] = forms.ModelChoiceField(
-            queryset=Region.objects.filter(is_active=True).order_by('name'),
+        self.fields['region'] = RegionChoiceField(
             required=False,
             label='Регион',
             help_text='Сначала выберите регион, затем город',
@@ -140,7 +143,7 @@ class TaskForm(forms.ModelForm):
             if self.instance and self.instance.pk and hasattr(self.instance, 'city'):
                 if self.instance.city:
                     city_field.queryset = City.objects.filter(
-                        region=self.instance.city.region,
+                        region_id=self.instance.city.region_id,
                         is_active=True
                     ).select_related('region')
                 else:
@@ -153,13 +156,14 @@ class TaskForm(forms.ModelForm):
                     region_id = args[0].get('region')
                 
                 if region_id:
-                    try:
-                        region_obj = Region.objects.get(pk=region_id, is_active=True)
+                    # Регион проверяется по справочнику в памяти, без запроса к базе
+                    region_obj = get_gazetteer().region(region_id)
+                    if region_obj:
                         city_field.queryset = City.objects.filter(
-                            region=region_obj,
+                            region_id=region_obj.id,
                             is_active=True
                         ).select_related('region')
-                    except (Region.DoesNotExist, ValueError):
+                    else:
                         city_field.queryset = City.objects.none()
                 else:
                     # При создании новой задачи города не показываем до выбора региона
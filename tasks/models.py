@@ -1,10 +1,19 @@
 from django.conf import settings
 from django.db import models
+from django.db.models import Q
 from django.urls import reverse
 
 from categories.models import Category
 from regions.models import City
 
+# Условие публичного списка задач. По нему построены частичные индексы,
+# поэтому списки должны фильтровать именно этим Q: иначе СУБД не сможет
+# доказать, что условие запроса покрывается условием индекса.
+# Статусы - значения Task.Status (IN_PROGRESS, AWAITING_CONFIRMATION, COMPLETED).
+PUBLIC_TASKS = Q(is_active=True, is_moderated=True) & ~Q(
+    status__in=["in_progress", "awaiting_confirmation", "completed"]
+)
+
 
 class Task(models.Model):
     class LocationType(models.TextChoices):
@@ -98,6 +107,16 @@ class Task(models.Model):
         verbose_name = "Задача"
         verbose_name_plural = "Задачи"
         ordering = ("-created_at",)
+        indexes = [
+            # Публичный список: сортировка по (created_at, id) как у KeysetPaginator
+            models.Index(fields=["-created_at", "-id"], condition=PUBLIC_TASKS, name="task_public_created_idx"),
+            models.Index(
+                fields=["category", "-created_at", "-id"], condition=PUBLIC_TASKS, name="task_public_category_idx"
+            ),
+            models.Index(fields=["city", "-created_at", "-id"], condition=PUBLIC_TASKS, name="task_public_city_idx"),
+            # Кабинет и профиль: задачи автора по статусу
+            models.Index(fields=["author", "status"], name="task_author_status_idx"),
+        ]
 
     def __str__(self) -> str:
         return self.title
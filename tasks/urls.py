@@ -13,7 +13,6 @@ from .views import (
     accept_task_completion,
     create_review,
     get_categories_by_section,
-    get_cities_by_region,
 )
 
 app_name = "tasks"
@@ -31,5 +30,4 @@ urlpatterns = [
     path("responses/<int:response_id>/send-message/", send_message, name="send_message"),
     path("responses/<int:response_id>/update-status/", update_response_status, name="update_response_status"),
     path("ajax/categories/", get_categories_by_section, name="get_categories_by_section"),
-    path("ajax/cities/", get_cities_by_region, name="get_cities_by_region"),
 ]
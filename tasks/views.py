@@ -1,92 +1,111 @@
 from django.http import Http404, JsonResponse
 from django.shortcuts import get_object_or_404, render, redirect
-from django.core.paginator import Paginator
 from django.contrib.auth.decorators import login_required
+from django.utils.functional import SimpleLazyObject
 from django.contrib.auth import get_user_model
 from django.contrib import messages
 from django.views.decorators.http import require_POST
 
-from .models import Task, TaskResponse, Message, Review
+from .models import PUBLIC_TASKS, Task, TaskResponse, Message, Review
 from .forms import TaskForm, TaskResponseForm, MessageForm, ReviewForm  # type: ignore[import]
-from categories.models import CategorySection, Category
-from regions.models import City, Region
+from categories.catalog import get_catalog
+from regions.gazetteer import get_gazetteer
+from main.cache import CATALOG, TASKS_LISTING
+from main.facets import build_sidebar, facet_table
+from main.inbox import mark_task_response_read
+from main.page_cache import add_surrogate_keys, cache_anonymous_page, skip_page_cache, surrogate_key
+from main.pagination import KeysetPaginator, RankedPaginator, cached_count
+from main.spelling import corrections_ready, search_with_correction
+from main.view_counts import record_view
+from main.visitors import visitor_stats
 
-__all__ = ["task_list", "task_detail", "create_task", "edit_task", "create_response", "response_detail", "send_message", "update_response_status", "complete_task", "accept_task_completion", "create_review", "get_categories_by_section", "get_cities_by_region"]
+__all__ = ["task_list", "task_detail", "create_task", "edit_task", "create_response", "response_detail", "send_message", "update_response_status", "complete_task", "accept_task_completion", "create_review", "get_categories_by_section"]
 
 
+def _sidebar(tasks, search_query, selected_section, selected_category, selected_city):
+    """Разделы и города сайдбара со счетчиками задач для текущего выбора"""
+    facets = facet_table(tasks, TASKS_LISTING, search_query)
+    sections, cities = build_sidebar(facets, selected_section, selected_category, selected_city)
+    return {"sections": sections, "cities": cities}
+
+
+@cache_anonymous_page(TASKS_LISTING, CATALOG)
 def task_list(request):
     tasks = (
         Task.objects.select_related("category", "city", "author", "category__section")
-        .filter(
-            is_active=True,
-            is_moderated=True  # Показываем только проверенные модератором задачи
-        )
-        .exclude(
-            status__in=[Task.Status.IN_PROGRESS, Task.Status.AWAITING_CONFIRMATION, Task.Status.COMPLETED]
-        )
+        # Только активные проверенные задачи без исполнителя (условие частичных индексов)
+        .filter(PUBLIC_TASKS)
     )
+    # Полнотекстовый поиск (main/search.py): условие по индексу без ограничения числа
+    # найденных, порядок - по релевантности. Если ничего не нашлось - поиск по
+    # исправленному запросу (раскладка, опечатки)
+    search_query = request.GET.get("q", "").strip()
+    found = None
+    corrected_query = None
+    # Проверяется до поиска: словарь может достроиться, пока идет запрос
+    can_correct = corrections_ready()
+    if search_query:
+        found, corrected_query = search_with_correction(Task, search_query)
+        if not found.found and not can_correct:
+            # Словарь исправлений еще строится: «ничего не найдено» без исправления не кешируем
+            skip_page_cache(request)
+        tasks = found.filter(tasks)
+    
+    # Выборка без фильтров сайдбара - по ней считаются счетчики фасетов
+    facet_base = tasks
+    
+    # Разделы и категории ищутся в каталоге в памяти (categories/catalog.py)
+    catalog = get_catalog()
     
     # Фильтрация по разделу
     section_slug = request.GET.get("section")
     if section_slug:
-        tasks = tasks.filter(category__section__slug=section_slug)
+        section = catalog.section_by_slug(section_slug)
+        if section:
+            tasks = tasks.filter(category__section_id=section.id)
+        else:
+            tasks = tasks.filter(category__section__slug=section_slug)
     
     # Фильтрация по категории
     category_slug = request.GET.get("category")
     selected_category_obj = None
     if category_slug:
-        try:
-            selected_category_obj = Category.objects.get(slug=category_slug, is_active=True)
-            tasks = tasks.filter(category__slug=category_slug)
-        except Category.DoesNotExist:
-            pass
+        selected_category_obj = catalog.category_by_slug(category_slug)
+        if selected_category_obj:
+            tasks = tasks.filter(category_id=selected_category_obj.id)
     
     # Фильтрация по городу
     city_id = request.GET.get("city")
     selected_city = None
     if city_id:
-        try:
-            selected_city = City.objects.get(pk=int(city_id), is_active=True)
-            tasks = tasks.filter(city=selected_city)
-        except (ValueError, City.DoesNotExist):
-            pass
-    
-    tasks = tasks.order_by("-created_at")
-    
-    # Пагинация
-    paginator = Paginator(tasks, 15)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    
-    # Получаем все активные разделы с категориями
-    sections = CategorySection.objects.filter(
-        is_active=True
-    ).prefetch_related(
-        'categories'
-    ).order_by('name')
-    
-    # Получаем активные категории для каждого раздела
-    for section in sections:
-        section.categories_list = section.categories.filter(is_active=True).order_by('name')  # type: ignore[attr-defined]
-    
-    # Получаем все активные города
-    # Показываем города, которые используются в открытых задачах, или все активные города
-    cities_with_tasks = City.objects.filter(
-        is_active=True,
-        tasks__is_active=True,
-        tasks__is_moderated=True  # Только проверенные задачи
-    ).exclude(
-        tasks__status__in=[Task.Status.IN_PROGRESS, Task.Status.AWAITING_CONFIRMATION, Task.Status.COMPLETED]
-    ).distinct()
-    
-    # Если есть города с задачами, показываем их, иначе показываем все активные города
-    if cities_with_tasks.exists():
-        cities = cities_with_tasks.select_related('region').order_by('name')
+        selected_city = get_gazetteer().city(city_id)
+        if selected_city:
+            tasks = tasks.filter(city_id=selected_city.id)
+    
+    # Пагинация по курсору (created_at, id). Список, разделы и города вычисляются
+    # лениво: при попадании в кеш фрагмента шаблона (см. main/templatetags/fragments.py)
+    # запросов к ним нет
+    if found is None:
+        paginator = KeysetPaginator(tasks, 15, ordering=("-created_at", "-pk"))
     else:
-        cities = City.objects.filter(is_active=True).select_related('region').order_by('name')
+        # Результаты поиска - по релевантности среди отфильтрованных
+        paginator = RankedPaginator(tasks, 15, lambda: found.ranked_ids(tasks))
+    cursor = request.GET.get('cursor')
+    page_number = request.GET.get('page')
+    page_obj = SimpleLazyObject(lambda: paginator.get_page(cursor, page_number))
+    # Итог по фильтрам (и всем найденным) из кеша счетчиков, без COUNT(*) на каждый запрос
+    results_count = SimpleLazyObject(lambda: cached_count(tasks, TASKS_LISTING))
+    sidebar = SimpleLazyObject(lambda: _sidebar(
+        facet_base, corrected_query or search_query, section_slug, selected_category_obj, selected_city
+    ))
+    sections = SimpleLazyObject(lambda: sidebar["sections"])
+    cities = SimpleLazyObject(lambda: sidebar["cities"])
     
     context = {
         "tasks": page_obj,
+        "results_count": results_count,
+        "search_query": search_query,
+        "corrected_query": corrected_query,
         "page_obj": page_obj,
         "sections": sections,
         "selected_section": section_slug,
@@ -154,6 +173,12 @@ def edit_task(request, slug: str):
     return render(request, "tasks/create_task.html", {"form": form, "task": task, "is_edit": True})
 
 
+def _count_task_view(request, slug):
+    """Учитывает просмотр страницы задачи, отданной из кеша"""
+    record_view(Task, slug, request)
+
+
+@cache_anonymous_page(on_hit=_count_task_view)
 def task_detail(request, slug: str):
     # Получаем задачу, проверяя права доступа
     task = get_object_or_404(
@@ -167,6 +192,10 @@ def task_detail(request, slug: str):
         if not request.user.is_authenticated or request.user != task.author:
             messages.error(request, "Эта задача находится на модерации и пока недоступна для просмотра.")
             return redirect("tasks:task_list")
+    keys = [surrogate_key(task), surrogate_key(task.category)]
+    if task.city_id:
+        keys.append(surrogate_key(task.city))
+    add_surrogate_keys(request, *keys)
     
     # Проверяем права доступа для задач в работе или выполненных
     # Такие задачи видны только заказчику, исполнителю и администратору
@@ -193,9 +222,9 @@ def task_detail(request, slug: str):
             messages.error(request, "У вас нет доступа к этой задаче.")
             return redirect("tasks:task_list")
     else:
-        # Увеличиваем счетчик просмотров только для публичных задач (не в работе, не выполненных)
-        task.views += 1
-        task.save(update_fields=['views'])
+        # Учитываем просмотр только для публичных задач (не в работе, не выполненных);
+        # в базу счетчик попадает пачкой (main/view_counts.py)
+        record_view(Task, task.slug, request, author_id=task.author_id)
     
     # Получаем отклики на задачу
     responses = None
@@ -272,6 +301,7 @@ def task_detail(request, slug: str):
         "can_review_author": can_review_author,
         "executor_review": executor_review,
         "author_review": author_review,
+        "visitors": visitor_stats(task),
     }
     return render(request, "tasks/task_detail.html", context)
 
@@ -341,6 +371,7 @@ def response_detail(request, response_id: int):
     Message.objects.filter(
         task_response=response
     ).exclude(sender=request.user).update(is_read=True)
+    mark_task_response_read(request.user, response)
     
     # Проверяем, является ли пользователь исполнителем (кандидатом с принятым откликом)
     is_executor = (
@@ -652,36 +683,11 @@ def get_categories_by_section(request):
     if not section_id:
         return JsonResponse({'categories': []})
     
-    try:
-        section = CategorySection.objects.get(pk=section_id, is_active=True)
-        categories = Category.objects.filter(
-            section=section,
-            is_active=True
-        ).order_by('name').values('id', 'name')
-        
-        return JsonResponse({
-            'categories': list(categories)
-        })
-    except CategorySection.DoesNotExist:
+    # Категории берутся из каталога в памяти, без запросов к базе
+    section = get_catalog().section(section_id)
+    if section is None:
         return JsonResponse({'categories': []})
-
-
-def get_cities_by_region(request):
-    """AJAX endpoint для получения городов по региону"""
-    region_id = request.GET.get('region_id')
-    
-    if not region_id:
-        return JsonResponse({'cities': []})
-    
-    try:
-        region = Region.objects.get(pk=region_id, is_active=True)
-        cities = City.objects.filter(
-            region=region,
-            is_active=True
-        ).order_by('name').values('id', 'name')
-        
-        return JsonResponse({
-            'cities': list(cities)
-        })
-    except Region.DoesNotExist:
-        return JsonResponse({'cities': []})
+    
+    return JsonResponse({
+        'categories': [{'id': category.id, 'name': category.name} for category in section.categories]
+    })
@@ -0,0 +1,30 @@
+# users/backends.py
+"""
+Бэкенд аутентификации, который берет пользователя сессии из кеша.
+
+Подключение (settings.py):
+
+    AUTHENTICATION_BACKENDS = [
+        'users.backends.CachedModelBackend',
+        # Старые сессии ссылаются на ModelBackend - оставляем до их истечения
+        'django.contrib.auth.backends.ModelBackend',
+    ]
+    # Сессии читаются из кеша, в базу - только запись
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
+Вместе с реестром банов (users/bans.py) это дает аутентификацию
+без SQL-запросов при теплом кеше.
+"""
+from django.contrib.auth.backends import ModelBackend
+
+from .user_cache import get_cached_user
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend, у которого get_user() читает снимок пользователя из кеша"""
+
+    def get_user(self, user_id):
+        user = get_cached_user(user_id)
+        if user is None or not self.user_can_authenticate(user):
+            return None
+        return user
@@ -0,0 +1,53 @@
+# users/bans.py
+"""
+Реестр активных банов для BanCheckMiddleware.
+
+Для каждого пользователя в кеше хранится его активный бан или отметка
+«бана нет». Запись о временном бане истекает ровно в момент ban_until,
+а сигналы UserBan (users/signals.py) сбрасывают запись при изменениях.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+
+from main.cache import bump_version, versioned_key
+
+from .models import UserBan
+
+NO_BAN = 'no-ban'
+
+
+def ban_cache_name(user_id):
+    return f'active_ban:{user_id}'
+
+
+def invalidate_ban(user_id):
+    """Сбрасывает запись реестра для пользователя"""
+    if user_id:
+        bump_version(ban_cache_name(user_id))
+
+
+def get_active_ban(user_id):
+    """Активный бан пользователя или None (без обращения к базе при теплом кеше)"""
+    key = versioned_key(ban_cache_name(user_id))
+    cached = cache.get(key)
+    if cached == NO_BAN:
+        return None
+    if cached is not None and not cached.is_expired():
+        return cached
+
+    now = timezone.now()
+    ban = UserBan.objects.filter(
+        user_id=user_id,
+        is_active=True
+    ).filter(
+        Q(ban_until__isnull=True) | Q(ban_until__gt=now)
+    ).first()
+
+    timeout = getattr(settings, 'BAN_REGISTRY_TIMEOUT', 60 * 60)
+    if ban is not None and ban.ban_until is not None:
+        # Запись истекает вместе с баном
+        timeout = min(timeout, max(1, int((ban.ban_until - now).total_seconds()) + 1))
+    cache.set(key, ban if ban is not None else NO_BAN, timeout)
+    return ban
@@ -3,6 +3,8 @@ from django.shortcuts import redirect
 from django.http import HttpResponse
 from django.utils import timezone
 
+from .bans import get_active_ban
+
 
 class BanCheckMiddleware:
     """
@@ -21,9 +23,9 @@ class BanCheckMiddleware:
     def __call__(self, request):
         # Проверяем только аутентифицированных пользователей
         if request.user.is_authenticated and not request.user.is_staff:
-            # Проверяем, не забанен ли пользователь
-            if request.user.is_banned():
-                ban = request.user.get_active_ban()
+            # Проверяем, не забанен ли пользователь (через кеш, см. users/bans.py)
+            ban = get_active_ban(request.user.pk)
+            if ban:
                 # Разрешаем доступ к некоторым путям
                 if not any(request.path.startswith(path) for path in self.allowed_paths):
                     # Формируем информацию о бане
@@ -60,6 +60,14 @@ class CustomUser(AbstractUser):
     def __str__(self):
         return self.username
     
+    def get_session_auth_hash(self):
+        # Пользователь из кеша (users/user_cache.py) загружен без хеша пароля,
+        # но с готовым хешем сессии; после set_password() хеш считается заново
+        cached = self.__dict__.get('cached_session_auth_hash')
+        if cached and 'password' not in self.__dict__:
+            return cached
+        return super().get_session_auth_hash()
+    
     @property
     def age(self):
         """Рассчитывает возраст пользователя на основе даты рождения"""
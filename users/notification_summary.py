@@ -0,0 +1,85 @@
+# users/notification_summary.py
+"""
+Сводка уведомлений пользователя для навбара.
+
+Четыре счетчика (предупреждения, баны, ответы на жалобы, отклики на вакансии)
+считаются один раз и хранятся в кеше под версией пользователя. Версию
+увеличивают сигналы из users/signals.py при любых изменениях исходных данных.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+
+from main.cache import bump_version, versioned_key
+from vacancies.models import VacancyResponse
+
+from .models import UserBan, UserComplaint, UserWarning
+
+
+def summary_cache_name(user_id):
+    return f'notifications:{user_id}'
+
+
+def invalidate_notification_summary(user_id):
+    """Сбрасывает закешированную сводку уведомлений пользователя"""
+    if user_id:
+        bump_version(summary_cache_name(user_id))
+
+
+def build_notification_summary(user):
+    """Считает уведомления пользователя по базе. Возвращает (сводка, таймаут кеша)."""
+    timeout = getattr(settings, 'NOTIFICATION_SUMMARY_TIMEOUT', 60 * 60)
+    now = timezone.now()
+
+    # Получаем непрочитанные предупреждения
+    warnings_count = UserWarning.objects.filter(
+        user=user,
+        is_active=True,
+        is_read=False
+    ).count()
+
+    # Получаем активные баны (считаем важными). Сводка должна истечь
+    # вместе с ближайшим временным баном
+    ban_ends = list(UserBan.objects.filter(
+        user=user,
+        is_active=True
+    ).filter(
+        Q(ban_until__isnull=True) | Q(ban_until__gt=now)
+    ).values_list('ban_until', flat=True))
+    for ban_until in ban_ends:
+        if ban_until is not None:
+            timeout = min(timeout, max(1, int((ban_until - now).total_seconds()) + 1))
+
+    # Получаем непрочитанные ответы на жалобы
+    complaint_responses_count = UserComplaint.objects.filter(
+        complainant=user,
+        admin_comment__isnull=False
+    ).exclude(admin_comment='').filter(
+        is_read_by_complainant=False
+    ).count()
+
+    # Получаем непрочитанные отклики на вакансии пользователя
+    vacancy_responses_count = VacancyResponse.objects.filter(
+        vacancy__author=user,
+        is_read=False
+    ).count()
+
+    summary = {
+        'warnings': warnings_count,
+        'bans': len(ban_ends),
+        'complaint_responses': complaint_responses_count,
+        'vacancy_responses': vacancy_responses_count,
+    }
+    summary['total'] = sum(summary.values())
+    return summary, timeout
+
+
+def get_notification_summary(user):
+    """Сводка уведомлений пользователя (из кеша, если он актуален)"""
+    key = versioned_key(summary_cache_name(user.pk))
+    summary = cache.get(key)
+    if summary is None:
+        summary, timeout = build_notification_summary(user)
+        cache.set(key, summary, timeout)
+    return summary
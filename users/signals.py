@@ -0,0 +1,58 @@
+# users/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from main.cache import COMPLAINTS, bump_version
+from vacancies.models import Vacancy, VacancyResponse
+
+from .bans import invalidate_ban
+from .models import CustomUser, UserBan, UserComplaint, UserWarning
+from .notification_summary import invalidate_notification_summary
+from .user_cache import invalidate_user
+
+
+@receiver([post_save, post_delete], sender=UserWarning)
+@receiver([post_save, post_delete], sender=UserBan)
+def invalidate_user_notifications(sender, instance, **kwargs):
+    """Предупреждения и баны меняют сводку уведомлений пользователя"""
+    invalidate_notification_summary(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=UserBan)
+def invalidate_ban_registry(sender, instance, **kwargs):
+    """Выдача, изменение и снятие бана сбрасывают реестр банов пользователя"""
+    invalidate_ban(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=CustomUser)
+def invalidate_user_snapshot(sender, instance, **kwargs):
+    """Изменение профиля, пароля или активности сбрасывает снимок в кеше"""
+    invalidate_user(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=UserBan)
+def invalidate_banned_user_snapshot(sender, instance, **kwargs):
+    """Бан сбрасывает снимок, чтобы следующий запрос прочитал пользователя заново"""
+    invalidate_user(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=UserComplaint)
+def invalidate_complainant_notifications(sender, instance, **kwargs):
+    """Ответ администратора и прочтение жалобы меняют сводку подавшего жалобу"""
+    invalidate_notification_summary(instance.complainant_id)
+
+
+@receiver([post_save, post_delete], sender=UserComplaint)
+def invalidate_complaint_counts(sender, instance, **kwargs):
+    """Новая жалоба или смена статуса меняют счетчики панели модерации"""
+    bump_version(COMPLAINTS)
+
+
+@receiver([post_save, post_delete], sender=VacancyResponse)
+def invalidate_vacancy_author_notifications(sender, instance, **kwargs):
+    """Новые и прочитанные отклики меняют сводку автора вакансии"""
+    if VacancyResponse.vacancy.is_cached(instance):
+        author_id = instance.vacancy.author_id
+    else:
+        author_id = Vacancy.objects.filter(pk=instance.vacancy_id).values_list('author_id', flat=True).first()
+    invalidate_notification_summary(author_id)
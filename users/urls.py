@@ -14,6 +14,7 @@ urlpatterns = [
     path('profile/my-tasks/', views.my_tasks, name='my_tasks'),
     path('profile/my-services/', views.my_services, name='my_services'),
     path('profile/my-vacancies/', views.user_my_vacancies, name='my_vacancies'),
+    path('profile/statistics/', views.view_statistics, name='view_statistics'),
     path('user/<str:username>/', views.public_profile, name='public_profile'),
     # Жалобы и модерация
     path('complaint/', views.file_complaint, name='file_complaint'),
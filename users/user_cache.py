@@ -0,0 +1,48 @@
+# users/user_cache.py
+"""
+Кеш пользователя для CachedModelBackend.
+
+В кеше хранится компактный снимок строки CustomUser (кортеж значений полей),
+из которого модель собирается без обращения к базе. Хеш пароля в общий кеш
+не попадает: вместо него хранится хеш для проверки сессии
+(get_session_auth_hash), а поле password отложено и при обращении читается
+из базы. Сигналы (users/signals.py) сбрасывают снимок при сохранении и
+удалении пользователя, смене пароля и выдаче бана.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from main.cache import bump_version, versioned_key
+
+from .models import CustomUser
+
+
+def user_cache_name(user_id):
+    return f'user:{user_id}'
+
+
+def invalidate_user(user_id):
+    """Сбрасывает снимок пользователя"""
+    if user_id:
+        bump_version(user_cache_name(user_id))
+
+
+def _field_names():
+    return [field.attname for field in CustomUser._meta.concrete_fields if field.attname != 'password']
+
+
+def get_cached_user(user_id):
+    """Пользователь по pk из снимка в кеше; None, если пользователя нет"""
+    key = versioned_key(user_cache_name(user_id), 'snapshot')
+    field_names = _field_names()
+    snapshot = cache.get(key)
+    if snapshot is None:
+        user = CustomUser.objects.filter(pk=user_id).first()
+        if user is None:
+            return None
+        snapshot = (tuple(getattr(user, name) for name in field_names), user.get_session_auth_hash())
+        cache.set(key, snapshot, getattr(settings, 'USER_CACHE_TIMEOUT', 60 * 60))
+    values, session_auth_hash = snapshot
+    user = CustomUser.from_db(CustomUser.objects.db, field_names, values)
+    user.cached_session_auth_hash = session_auth_hash
+    return user
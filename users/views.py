@@ -1,4 +1,6 @@
 # users/views.py
+import datetime
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login
 from django.contrib.auth import logout
@@ -6,7 +8,9 @@ from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
 from django.utils import timezone
 from django.db import models
-from django.core.paginator import Paginator
+from main.cache import COMPLAINTS
+from main.pagination import CachedCountPaginator, cached_count
+from main.view_series import date_range, daily_views, stats_days
 from .forms import CustomUserCreationForm, CustomUserChangeForm, ComplaintForm, WarningForm, BanForm
 from .models import CustomUser, UserComplaint, UserWarning, UserBan
 from tasks.models import Task, TaskResponse
@@ -192,6 +196,97 @@ def user_my_vacancies(request):
     }
     return render(request, 'users/my_vacancies.html', context)
 
+# Разделы статистики просмотров: модель, название и страница объекта
+STATS_SECTIONS = {
+    'tasks': (Task, 'Задачи', 'tasks:task_detail'),
+    'services': (Service, 'Услуги', 'services:service_detail'),
+    'vacancies': (Vacancy, 'Вакансии', 'vacancies:vacancy_detail'),
+}
+
+STATS_CHART_WIDTH = 900
+STATS_CHART_HEIGHT = 160
+SPARKLINE_HEIGHT = 24
+
+
+def _bar_chart(days, values):
+    """
+    Столбцы SVG-графика суммарных просмотров по дням. Координаты - готовые
+    строки с точкой: шаблон вывел бы float с запятой русской локали
+    """
+    top = max(values) or 1
+    width = STATS_CHART_WIDTH / len(values)
+    bars = []
+    for index, (day, count) in enumerate(zip(days, values)):
+        height = round(count / top * STATS_CHART_HEIGHT, 1)
+        bars.append({
+            'x': f'{index * width:.1f}',
+            'y': f'{STATS_CHART_HEIGHT - height:.1f}',
+            'width': f'{width * 0.8:.1f}',
+            'height': f'{height:.1f}',
+            'day': day,
+            'count': count,
+        })
+    return bars
+
+
+def _sparkline(values):
+    """Точки SVG-ломаной просмотров объекта по дням"""
+    top = max(values) or 1
+    return ' '.join(
+        f'{index},{round(SPARKLINE_HEIGHT - count / top * SPARKLINE_HEIGHT)}'
+        for index, count in enumerate(values)
+    )
+
+
+@login_required
+def view_statistics(request):
+    """Просмотры задач, услуг или вакансий пользователя по дням"""
+    section = request.GET.get('section', 'services')
+    if section not in STATS_SECTIONS:
+        section = 'services'
+    model, _, detail_url = STATS_SECTIONS[section]
+
+    end = timezone.localdate()
+    start = end - datetime.timedelta(days=stats_days() - 1)
+    days = date_range(start, end)
+    items = model.objects.filter(author=request.user, is_active=True)
+    series = daily_views(items, start, end)
+
+    totals = [0] * len(days)
+    rows = []
+    for pk, title, slug, views in items.values_list('pk', 'title', 'slug', 'views'):
+        values = series.get(pk, [0] * len(days))
+        for index, count in enumerate(values):
+            totals[index] += count
+        rows.append({
+            'title': title,
+            'slug': slug,
+            'views': views,
+            'period_views': sum(values),
+            'week_views': sum(values[-7:]),
+            'sparkline': _sparkline(values),
+        })
+    rows.sort(key=lambda row: (row['period_views'], row['views']), reverse=True)
+
+    context = {
+        'sections': [(key, name) for key, (_, name, _) in STATS_SECTIONS.items()],
+        'section': section,
+        'detail_url': detail_url,
+        'rows': rows,
+        'bars': _bar_chart(days, totals),
+        'chart_width': STATS_CHART_WIDTH,
+        'chart_height': STATS_CHART_HEIGHT,
+        'sparkline_width': len(days) - 1,
+        'sparkline_height': SPARKLINE_HEIGHT,
+        'start': start,
+        'end': end,
+        'period_days': len(days),
+        'period_total': sum(totals),
+        'week_total': sum(totals[-7:]),
+    }
+    return render(request, 'users/view_statistics.html', context)
+
+
 @login_required
 def profile_edit(request):
     if request.method == 'POST':
@@ -450,17 +545,17 @@ def moderation_panel(request):
         complaints = complaints.filter(status=status_filter)
     
     # Пагинация
-    paginator = Paginator(complaints, 20)
+    paginator = CachedCountPaginator(complaints, 20, cache_name=COMPLAINTS)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     
-    # Статистика
+    # Статистика (из кеша счетчиков, сбрасывается сигналом при изменении жалоб)
     stats = {
-        'pending': UserComplaint.objects.filter(status=UserComplaint.Status.PENDING).count(),
-        'reviewed': UserComplaint.objects.filter(status=UserComplaint.Status.REVIEWED).count(),
-        'resolved': UserComplaint.objects.filter(status=UserComplaint.Status.RESOLVED).count(),
-        'rejected': UserComplaint.objects.filter(status=UserComplaint.Status.REJECTED).count(),
-        'total': UserComplaint.objects.count(),
+        'pending': cached_count(UserComplaint.objects.filter(status=UserComplaint.Status.PENDING), COMPLAINTS),
+        'reviewed': cached_count(UserComplaint.objects.filter(status=UserComplaint.Status.REVIEWED), COMPLAINTS),
+        'resolved': cached_count(UserComplaint.objects.filter(status=UserComplaint.Status.RESOLVED), COMPLAINTS),
+        'rejected': cached_count(UserComplaint.objects.filter(status=UserComplaint.Status.REJECTED), COMPLAINTS),
+        'total': cached_count(UserComplaint.objects.all(), COMPLAINTS),
     }
     
     context = {
@@ -3,7 +3,9 @@ from django.utils.text import slugify
 from django.forms import ModelChoiceField
 from .models import Vacancy, VacancyResponse, Specialty
 from slugify import slugify as slugify_extended
-from regions.models import City, Region
+from regions.forms import RegionChoiceField
+from regions.gazetteer import get_gazetteer
+from regions.models import City
 
 
 class VacancyForm(forms.ModelForm):
@@ -85,8 +87,7 @@ class VacancyForm(forms.ModelForm):
         self.fields['other_conditions'].required = False
         
         # Добавляем поле региона перед полем города
-        self.fields['region'] = forms.ModelChoiceField(
-            queryset=Region.objects.filter(is_active=True).order_by('name'),
+        self.fields['region'] = RegionChoiceField(
             required=False,
             label='Регион',
             help_text='Сначала выберите регион, затем город',
@@ -109,7 +110,7 @@ class VacancyForm(forms.ModelForm):
             if self.instance and self.instance.pk and hasattr(self.instance, 'city'):
                 if self.instance.city:
                     city_field.queryset = City.objects.filter(
-                        region=self.instance.city.region,
+                        region_id=self.instance.city.region_id,
                         is_active=True
                     ).select_related('region')
                 else:
@@ -121,13 +122,14 @@ class VacancyForm(forms.ModelForm):
                     region_id = args[0].get('region')
                 
                 if region_id:
-                    try:
-                        region_obj = Region.objects.get(pk=region_id, is_active=True)
+                    # Регион проверяется по справочнику в памяти, без запроса к базе
+                    region_obj = get_gazetteer().region(region_id)
+                    if region_obj:
                         city_field.queryset = City.objects.filter(
-                            region=region_obj,
+                            region_id=region_obj.id,
                             is_active=True
                         ).select_related('region')
-                    except (Region.DoesNotExist, ValueError):
+                    else:
                         city_field.queryset = City.objects.none()
                 else:
                     city_field.queryset = City.objects.none()
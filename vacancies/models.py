@@ -1,10 +1,14 @@
 from django.db import models
+from django.db.models import Q
 from django.utils.text import slugify
 from django.urls import reverse
 from django.conf import settings
 from slugify import slugify as slugify_extended
 from regions.models import City
 
+# Условие публичного списка вакансий; по нему построены частичные индексы
+PUBLIC_VACANCIES = Q(is_active=True, is_moderated=True)
+
 
 class Specialty(models.Model):
     """Модель специальности"""
@@ -118,12 +122,21 @@ class Vacancy(models.Model):
         verbose_name = "Вакансия"
         verbose_name_plural = "Вакансии"
         ordering = ['-created_at']
+        # Отдельные индексы по specialty и author не нужны: их создает ForeignKey,
+        # а по is_active/is_moderated - бесполезны из-за низкой селективности.
+        # По views индекса нет намеренно: счетчик меняется при каждом просмотре.
         indexes = [
             models.Index(fields=['-created_at']),
-            models.Index(fields=['specialty']),
-            models.Index(fields=['is_active']),
-            models.Index(fields=['is_moderated']),
-            models.Index(fields=['author']),
+            # Публичный список: сортировки KeysetPaginator (created_at, id) и (salary, id)
+            models.Index(fields=['-created_at', '-id'], condition=PUBLIC_VACANCIES, name='vacancy_public_created_idx'),
+            models.Index(
+                fields=['specialty', '-created_at', '-id'], condition=PUBLIC_VACANCIES,
+                name='vacancy_public_specialty_idx',
+            ),
+            models.Index(fields=['salary', 'id'], condition=PUBLIC_VACANCIES, name='vacancy_public_salary_idx'),
+            models.Index(
+                fields=['author', '-created_at', '-id'], condition=PUBLIC_VACANCIES, name='vacancy_public_author_idx'
+            ),
         ]
 
     def __str__(self):
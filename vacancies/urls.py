@@ -32,5 +32,4 @@ urlpatterns = [
     path("favorite/<slug:slug>/", views.toggle_favorite_vacancy, name="toggle_favorite_vacancy"),
     
     # AJAX для загрузки городов
-    path("ajax/cities/", views.get_cities_by_region, name="get_cities_by_region"),
 ]
\ No newline at end of file
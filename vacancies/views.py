@@ -1,35 +1,45 @@
-from django.http import Http404, JsonResponse
+from django.http import Http404
 from django.shortcuts import get_object_or_404, render, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.views.decorators.http import require_POST
-from django.db.models import Q, Count
-from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Count
+from django.utils.functional import SimpleLazyObject
 from django.urls import reverse
 
-from .models import Vacancy, VacancyResponse, Specialty, FavoriteVacancy
+from .models import PUBLIC_VACANCIES, Vacancy, VacancyResponse, Specialty, FavoriteVacancy
 from .forms import VacancyForm, VacancyResponseForm
-from regions.models import City, Region
+from main.cache import VACANCIES_LISTING
+from main.page_cache import add_surrogate_keys, cache_anonymous_page, skip_page_cache, surrogate_key
+from main.pagination import KeysetPaginator, RankedPaginator, cached_count
+from main.spelling import corrections_ready, search_with_correction
+from main.view_counts import record_view
+from main.visitors import visitor_stats
 
 
+@cache_anonymous_page(VACANCIES_LISTING)
 def vacancy_list(request):
     """Список вакансий"""
     vacancies = (
         Vacancy.objects.select_related("specialty", "author", "city", "city__region")
-        .filter(
-            is_active=True,
-            is_moderated=True  # Показываем только проверенные модератором вакансии
-        )
+        .filter(PUBLIC_VACANCIES)  # Только активные проверенные модератором вакансии
     )
     
-    # Поиск по названию и описанию
-    search_query = request.GET.get("search")
+    # Поиск по названию, описанию и месту работы (main/search.py): условие по индексу
+    # без ограничения числа найденных. Если ничего не нашлось - поиск по исправленному
+    # запросу (раскладка, опечатки)
+    search_query = request.GET.get("search", "").strip()
+    found = None
+    corrected_query = None
+    # Проверяется до поиска: словарь может достроиться, пока идет запрос
+    can_correct = corrections_ready()
     if search_query:
-        vacancies = vacancies.filter(
-            Q(title__icontains=search_query) |
-            Q(description__icontains=search_query) |
-            Q(location__icontains=search_query)
-        )
+        found, corrected_query = search_with_correction(Vacancy, search_query)
+        if not found.found and not can_correct:
+            # Словарь исправлений еще строится: «ничего не найдено» без исправления не кешируем
+            skip_page_cache(request)
+        vacancies = found.filter(vacancies)
     
     # Фильтрация по специальности
     specialty_slug = request.GET.get("specialty")
@@ -64,27 +74,40 @@ def vacancy_list(request):
     
     # Сортировка
     sort_by = request.GET.get("sort", "-created_at")
-    if sort_by in ["-created_at", "created_at", "-salary", "salary", "-views", "views"]:
-        vacancies = vacancies.order_by(sort_by)
+    if sort_by not in ["-created_at", "created_at", "-salary", "salary", "-views", "views"]:
+        sort_by = "-created_at"
+    # Результаты поиска без явной сортировки - по релевантности с учетом свежести
+    by_relevance = found is not None and not request.GET.get("sort")
+    # id в том же направлении делает порядок строгим для курсора
+    ordering = (sort_by, "-pk" if sort_by.startswith("-") else "pk")
+    
+    # Пагинация по курсору. Список и специальности вычисляются лениво: при попадании
+    # в кеш фрагмента шаблона (см. main/templatetags/fragments.py) запросов к ним нет
+    if not by_relevance:
+        paginator = KeysetPaginator(vacancies, 15, ordering=ordering)
     else:
-        vacancies = vacancies.order_by("-created_at")
-    
-    # Пагинация
-    paginator = Paginator(vacancies, 15)
+        # Релевантность считается среди отфильтрованных
+        paginator = RankedPaginator(vacancies, 15, lambda: found.ranked_ids(vacancies))
+    cursor = request.GET.get('cursor')
     page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = SimpleLazyObject(lambda: paginator.get_page(cursor, page_number))
+    # Итог по фильтрам (и всем найденным) из кеша счетчиков, без COUNT(*) на каждый запрос
+    results_count = SimpleLazyObject(lambda: cached_count(vacancies, VACANCIES_LISTING))
     
     # Получаем все специальности
     specialties = Specialty.objects.all().order_by('name')
     
     context = {
         "vacancies": page_obj,
+        "results_count": results_count,
         "page_obj": page_obj,
         "specialties": specialties,
         "selected_specialty": selected_specialty,
         "selected_experience": experience,
         "selected_employment_type": employment_type,
         "selected_author": selected_author,
+        "search_query": search_query,
+        "corrected_query": corrected_query,
         "experience_choices": Vacancy.EXPERIENCE_CHOICES,
         "employment_type_choices": Vacancy.EMPLOYMENT_TYPE_CHOICES,
     }
@@ -134,11 +157,17 @@ def edit_vacancy(request, slug: str):
     return render(request, "vacancies/edit_vacancy.html", {"form": form, "vacancy": vacancy})
 
 
+def _count_vacancy_view(request, slug):
+    """Учитывает просмотр страницы вакансии, отданной из кеша"""
+    record_view(Vacancy, slug, request)
+
+
+@cache_anonymous_page(on_hit=_count_vacancy_view)
 def vacancy_detail(request, slug: str):
     """Детальная страница вакансии"""
     # Получаем вакансию по слаг
     vacancy = get_object_or_404(
-        Vacancy.objects.select_related("specialty", "author"),
+        Vacancy.objects.select_related("specialty", "author", "city", "city__region"),
         slug=slug,
         is_active=True,
     )
@@ -148,10 +177,13 @@ def vacancy_detail(request, slug: str):
         if not request.user.is_authenticated or request.user != vacancy.author:
             messages.error(request, "Эта вакансия находится на модерации и пока недоступна для просмотра.")
             return redirect("vacancies:vacancy_list")
+    keys = [surrogate_key(vacancy), surrogate_key(vacancy.specialty)]
+    if vacancy.city_id:
+        keys.append(surrogate_key(vacancy.city))
+    add_surrogate_keys(request, *keys)
     
-    # Увеличиваем счетчик просмотров
-    vacancy.views += 1
-    vacancy.save(update_fields=['views'])
+    # Учитываем просмотр; в базу счетчик попадает пачкой (main/view_counts.py)
+    record_view(Vacancy, vacancy.slug, request, author_id=vacancy.author_id)
     
     # Форма для отклика (только для авторизованных пользователей, которые не являются автором)
     response_form = None
@@ -197,6 +229,7 @@ def vacancy_detail(request, slug: str):
         "new_responses_count": new_responses_count,
         "similar_vacancies": similar_vacancies,
         "is_favorite": is_favorite,
+        "visitors": visitor_stats(vacancy),
     }
     return render(request, "vacancies/vacancy_detail.html", context)
 
@@ -234,11 +267,9 @@ def send_vacancy_response(request, slug: str):
         response = form.save(commit=False)
         response.vacancy = vacancy
         response.applicant = request.user
-        response.save()
-        
-        # Увеличиваем счетчик откликов
-        vacancy.responses_count += 1
-        vacancy.save(update_fields=['responses_count'])
+        # Счетчик откликов увеличивается в той же транзакции (main/counters.py)
+        with transaction.atomic():
+            response.save()
         
         messages.success(request, "Ваш отклик успешно отправлен!")
         return redirect("vacancies:vacancy_detail", slug=vacancy.slug)
@@ -353,24 +384,3 @@ def favorite_vacancies(request):
         "favorites": favorites,
     }
     return render(request, "vacancies/favorite_vacancies.html", context)
-
-
-def get_cities_by_region(request):
-    """AJAX endpoint для получения городов по региону"""
-    region_id = request.GET.get('region_id')
-    
-    if not region_id:
-        return JsonResponse({'cities': []})
-    
-    try:
-        region = Region.objects.get(pk=region_id, is_active=True)
-        cities = City.objects.filter(
-            region=region,
-            is_active=True
-        ).order_by('name').values('id', 'name')
-        
-        return JsonResponse({
-            'cities': list(cities)
-        })
-    except Region.DoesNotExist:
-        return JsonResponse({'cities': []})